@@ -2,8 +2,55 @@
 
 # Hook
 VARIABLE_NAME = "SMARTSHEET_ACCESS_TOKEN"
+API_BASE_ENV = "SMARTSHEET_API_BASE"
+VERSION_VARIABLE_PREFIX = "SMARTSHEET_VERSION_"
+DEFAULT_RATE_LIMIT = 300
+DEFAULT_RATE_PERIOD = 60
+MIN_RATE_FACTOR = 0.1
+RATE_RECOVERY_STEP = 0.02
+MAX_RETRIES = 6
+RETRY_ERROR_CODES = (4001, 4002, 4003, 4004)
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+CIRCUIT_FAILURE_THRESHOLD = 10
+CIRCUIT_RESET_TIMEOUT = 60.0
+DEFAULT_PAGE_SIZE = 5000
+TOKEN_CACHE_TTL = 300
+MAX_CACHED_CLIENTS = 16
+DEFAULT_CACHE_MAX_BYTES = 2 ** 30
 
 # Operator
 DEFAULT_PG_CONN = "etl_postgres"
 DEFAULT_PG_DB = "etl"
 DEFAULT_PG_SCHEMA = "public"
+DEFAULT_STATE_TABLE = "smartsheet_sync_state"
+INCREMENTAL_OVERLAP = 60
+SKIPPED_UNCHANGED = "skipped: unchanged"
+DEFAULT_BULK_WORKERS = 4
+DEFAULT_EXPORT_WORKERS = 4
+DEFAULT_WRITEBACK_WORKERS = 2
+MAX_WRITE_ROWS = 500
+MAX_DELETE_ROWS = 300
+DEFAULT_FETCH_SIZE = 2000
+DEFAULT_PREP_BATCHES = 1
+DEFAULT_ROW_GROUP_SIZE = 10000
+PROFILE_TOP_FUNCTIONS = 25
+STATS_PREFIX = "smartsheet"
+
+# Sensor
+WATERMARK_VARIABLE_PREFIX = "SMARTSHEET_WATERMARK_"
+WATERMARK_OVERLAP = 60
+WEBHOOK_DEBOUNCE = 30
+WEBHOOK_MAX_DELAY = 300
+
+# Webhook
+WEBHOOK_SECRET_VARIABLE = "SMARTSHEET_WEBHOOK_SECRET"
+DEFAULT_WEBHOOK_TABLE = "smartsheet_webhook_events"
+WEBHOOK_MAX_ROWS = 1000
+WEBHOOK_ROW_BATCH = 100
+WEBHOOK_CLAIM_TIMEOUT = 3600
+
+# Trigger
+DOWNLOAD_CHUNK_SIZE = 2 ** 16
+TRIGGER_CONNECT_TIMEOUT = 30.0
+TRIGGER_READ_TIMEOUT = 300.0
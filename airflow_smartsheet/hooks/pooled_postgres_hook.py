@@ -0,0 +1,93 @@
+# Hooks used to share PostgreSQL connections between threads.
+
+import threading
+
+from airflow.hooks.postgres_hook import PostgresHook
+
+
+class PooledPostgresHook(PostgresHook):
+    """A PostgreSQL hook that hands out connections from a bounded, thread-safe pool.
+    Closing a connection returns it to the pool instead of disconnecting.
+    """
+
+    def __init__(self, max_connections=1, *args, **kwargs):
+        """Initializes a pooled PostgreSQL hook.
+
+        Keyword Arguments:
+            max_connections {int} -- Maximum number of open connections. (default: {1})
+        """
+
+        super().__init__(*args, **kwargs)
+
+        self.max_connections = max_connections
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+    def get_conn(self):
+        """Takes an idle connection from the pool, connecting if none is idle.
+        Blocks while all connections are in use.
+
+        Returns:
+            _PooledConnection -- The pooled connection.
+        """
+
+        self._slots.acquire()
+        try:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None or conn.closed:
+                conn = super().get_conn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        return _PooledConnection(self, conn)
+
+    def _release(self, conn):
+        """Returns a connection to the pool, discarding any uncommitted work.
+
+        Arguments:
+            conn {connection} -- The psycopg2 connection.
+        """
+
+        try:
+            if not conn.closed:
+                conn.rollback()
+                conn.autocommit = False
+                with self._lock:
+                    self._idle.append(conn)
+        finally:
+            self._slots.release()
+
+    def close_all(self):
+        """Closes all idle connections.
+        """
+
+        with self._lock:
+            idle, self._idle = self._idle, []
+
+        for conn in idle:
+            conn.close()
+
+
+class _PooledConnection:
+    """A psycopg2 connection proxy that returns the connection to its pool when closed.
+    """
+
+    def __init__(self, pool, conn):
+        object.__setattr__(self, "_pool", pool)
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_released", False)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    def close(self):
+        if self._released:
+            return
+        object.__setattr__(self, "_released", True)
+        self._pool._release(self._conn)
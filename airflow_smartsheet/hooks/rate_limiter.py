@@ -0,0 +1,125 @@
+# Rate limiter used to keep Smartsheet API calls under the account limit.
+
+import threading
+import time
+
+from airflow_smartsheet.consts import *
+
+
+class RateLimiter:
+    """A thread-safe token bucket limiting how often requests can be sent.
+    Threads block on acquire while coroutines wait on acquire_async, sharing the same bucket.
+    The rate adapts to throttling: it halves when the API throttles a request
+    and recovers step by step with every successful request.
+    """
+
+    def __init__(self, rate=None, period=None):
+        """Initializes a rate limiter with a full bucket.
+
+        Keyword Arguments:
+            rate {int} -- Maximum number of requests per period. (default: {None})
+            period {float} -- Length of the period in seconds. (default: {None})
+        """
+
+        self.rate = rate if rate is not None else DEFAULT_RATE_LIMIT
+        self.period = period if period is not None else DEFAULT_RATE_PERIOD
+
+        self._tokens = float(self.rate)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._factor = 1.0
+        self._lock = threading.Lock()
+
+    @property
+    def current_rate(self):
+        """The rate currently allowed after adapting to throttling.
+        """
+
+        return self.rate * self._factor
+
+    def _refill(self, now):
+        """Adds the tokens earned since the last update.
+
+        Arguments:
+            now {float} -- The current monotonic time.
+        """
+
+        earned = (now - self._updated_at) * self.current_rate / self.period
+        self._tokens = min(float(self.rate), self._tokens + earned)
+        self._updated_at = now
+
+    def try_acquire(self):
+        """Takes one token from the bucket if one is available, without blocking.
+
+        Returns:
+            float -- 0.0 if a token was taken, otherwise seconds until one may be available.
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+
+            return (1 - self._tokens) * self.period / self.current_rate
+
+    def acquire(self):
+        """Takes one token from the bucket, blocking until one is available.
+
+        Returns:
+            float -- Seconds spent waiting for a token.
+        """
+
+        waited = 0.0
+        while True:
+            delay = self.try_acquire()
+            if delay <= 0:
+                return waited
+
+            time.sleep(delay)
+            waited += delay
+
+    async def acquire_async(self):
+        """Takes one token from the bucket, waiting on the event loop until one is available.
+
+        Returns:
+            float -- Seconds spent waiting for a token.
+        """
+
+        # Only the triggerer needs asyncio
+        import asyncio
+
+        waited = 0.0
+        while True:
+            delay = self.try_acquire()
+            if delay <= 0:
+                return waited
+
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def penalize(self, pause=0.0):
+        """Slows down after a throttled request.
+        Halves the rate, empties the bucket and pauses every caller for the specified time.
+
+        Keyword Arguments:
+            pause {float} -- Seconds no requests may be sent, e.g. from a Retry-After header. (default: {0.0})
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._factor = max(MIN_RATE_FACTOR, self._factor / 2)
+            self._tokens = 0.0
+            self._paused_until = max(self._paused_until, now + pause)
+
+    def reward(self):
+        """Recovers part of the rate after a successful request.
+        """
+
+        with self._lock:
+            if self._factor < 1.0:
+                self._factor = min(1.0, self._factor + RATE_RECOVERY_STEP)
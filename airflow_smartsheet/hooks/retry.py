@@ -0,0 +1,164 @@
+# Retry engine used to recover from throttled and failed Smartsheet API calls.
+
+import random
+import threading
+import time
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from airflow_smartsheet.consts import *
+
+
+class ApiCounters:
+    """Thread-safe counters of Smartsheet API activity.
+    """
+
+    NAMES = ("calls", "throttles", "retries", "failures", "retry_wait", "limiter_wait", "api_time", "bytes")
+
+    def __init__(self):
+        self._values = dict.fromkeys(self.NAMES, 0)
+        self._lock = threading.Lock()
+
+    def increment(self, name, value=1):
+        """Adds to a counter.
+
+        Arguments:
+            name {str} -- The counter name.
+
+        Keyword Arguments:
+            value {float} -- The amount to add. (default: {1})
+        """
+
+        with self._lock:
+            self._values[name] += value
+
+    def snapshot(self):
+        """Copies the current counter values.
+
+        Returns:
+            dict -- Counter values by name.
+        """
+
+        with self._lock:
+            return dict(self._values)
+
+
+class CircuitBreaker:
+    """Stops sending requests after too many consecutive failures.
+    After a cooldown one trial request is let through; its outcome closes or reopens the circuit.
+    """
+
+    def __init__(self, failure_threshold=None, reset_timeout=None):
+        """Initializes a closed circuit breaker.
+
+        Keyword Arguments:
+            failure_threshold {int} -- Consecutive failures that open the circuit. (default: {None})
+            reset_timeout {float} -- Seconds the circuit stays open before a trial request. (default: {None})
+        """
+
+        self.failure_threshold = failure_threshold if failure_threshold is not None else CIRCUIT_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout if reset_timeout is not None else CIRCUIT_RESET_TIMEOUT
+
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Determines whether a request may be sent.
+
+        Returns:
+            bool -- False while the circuit is open.
+        """
+
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+
+            # Half-open; let one trial request through
+            self._trial = True
+            return True
+
+    def record_success(self):
+        """Closes the circuit.
+        """
+
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        """Counts a failure, opening the circuit at the threshold or after a failed trial.
+        """
+
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+
+def backoff_delay(attempt):
+    """Computes a jittered exponential backoff delay.
+
+    Arguments:
+        attempt {int} -- The number of the retry, starting at 1.
+
+    Returns:
+        float -- Seconds to wait, drawn uniformly up to the capped exponential delay.
+    """
+
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def should_retry(status_code, error_code=None):
+    """Determines whether a failed request is worth retrying.
+
+    Arguments:
+        status_code {int} -- The HTTP status code.
+
+    Keyword Arguments:
+        error_code {int} -- Optional Smartsheet error code of the response body. (default: {None})
+
+    Returns:
+        bool -- Whether the request was throttled, failed on the server or hit a busy sheet.
+    """
+
+    if status_code == 429 or status_code >= 500:
+        return True
+
+    # Concurrent writes to a sheet fail with a retryable error code
+    return error_code in RETRY_ERROR_CODES
+
+
+def retry_after(response):
+    """Reads the Retry-After header of an HTTP response.
+
+    Arguments:
+        response {Response} -- The HTTP response.
+
+    Returns:
+        float -- Seconds to wait, or None if the header is absent or invalid.
+    """
+
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
@@ -0,0 +1,265 @@
+# Paginated row iterator used to stream large sheets from the Smartsheet API.
+
+import smartsheet
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from airflow.exceptions import AirflowException
+
+from airflow_smartsheet.consts import *
+
+
+# A compact sheet row; values are ordered like SheetRowIterator.columns
+SheetRow = namedtuple("SheetRow", ["id", "row_number", "modified_at", "values"])
+
+
+class SheetRowIterator:
+    """Iterates over the rows of a sheet one page at a time.
+    The first page is fetched on construction so that sheet metadata and columns are
+    available before iterating; only one or two pages are held in memory at once.
+    """
+
+    def __init__(self, client, sheet_id, page_size=None, prefetch=False, display_values=True, on_page=None, sheet=None,
+                 **kwargs):
+        """Initializes a row iterator and fetches the first page.
+        Other keyword arguments are passed on to Sheets.get_sheet.
+
+        Arguments:
+            client {Smartsheet} -- The Smartsheet API session.
+            sheet_id {int} -- Sheet ID to fetch.
+
+        Keyword Arguments:
+            page_size {int} -- Number of rows per page. (default: {None})
+            prefetch {bool} -- Whether to fetch the next page on a background thread while a page is consumed. (default: {False})
+            display_values {bool} -- Whether to yield cell values as displayed rather than raw values. (default: {True})
+            on_page {callable} -- Optional callback receiving every fetched page before its rows are yielded. (default: {None})
+            sheet {Sheet} -- Optional sheet with every row, such as a cached payload, iterated as the only page. (default: {None})
+        """
+
+        self.client = client
+        self.sheet_id = sheet_id
+        self.page_size = page_size if page_size is not None else DEFAULT_PAGE_SIZE
+        self.prefetch = prefetch
+        self.display_values = display_values
+        self.on_page = on_page
+        self.kwargs = kwargs
+
+        # Response bytes and rows received, including rows hidden by a sheet filter
+        self.bytes_fetched = 0
+        self.rows_fetched = 0
+
+        self._complete = sheet is not None
+        self.sheet = sheet if sheet is not None else self._get_page(1)
+        self.columns = sorted(self.sheet.columns, key=lambda column: column.index)
+        self._column_ids = [self.column_key(column) for column in self.columns]
+        self._consumed = False
+        self._pages = None
+
+        # Columns always yielding raw values by column key; may be set before iterating
+        self.raw_column_ids = set()
+
+    def column_key(self, column):
+        """Gets the key that cells of a column refer to.
+
+        Arguments:
+            column {Column} -- The column.
+
+        Returns:
+            int -- The column ID.
+        """
+
+        return column.id
+
+    def _cell_key(self, cell):
+        """Gets the key of the column a cell belongs to.
+
+        Arguments:
+            cell {Cell} -- The cell.
+
+        Returns:
+            int -- The column ID.
+        """
+
+        return cell.column_id
+
+    def _fetch(self, page):
+        """Requests one page from the API.
+
+        Arguments:
+            page {int} -- The page number, starting at 1.
+
+        Returns:
+            Sheet -- The sheet with the rows of the page, or an Error.
+        """
+
+        return self.client.Sheets.get_sheet(
+            self.sheet_id,
+            page_size=self.page_size,
+            page=page,
+            **self.kwargs)
+
+    def _get_page(self, page):
+        """Fetches one page of the sheet.
+
+        Arguments:
+            page {int} -- The page number, starting at 1.
+
+        Raises:
+            AirflowException: Raised when the API returns an error.
+            AirflowException: Raised when the sheet changed since the first page was fetched.
+
+        Returns:
+            Sheet -- The sheet with the rows of the page.
+        """
+
+        sheet = self._fetch(page)
+        if isinstance(sheet, smartsheet.models.Error):
+            raise AirflowException(
+                f"Fetching page {page} of sheet {self.sheet_id} was unsuccessful; message is {sheet.result.message}.")
+
+        if hasattr(self.client, "response_bytes"):
+            self.bytes_fetched += self.client.response_bytes()
+
+        if page > 1 and getattr(sheet, "version", None) != getattr(self.sheet, "version", None):
+            raise AirflowException(
+                f"Sheet {self.sheet_id} changed from version {self.sheet.version} to {sheet.version} while paging.")
+
+        return sheet
+
+    def _is_last(self, page, sheet):
+        """Determines whether a page is the last page.
+
+        Arguments:
+            page {int} -- The page number, starting at 1.
+            sheet {Sheet} -- The sheet with the rows of the page.
+
+        Returns:
+            bool -- Whether no further pages exist.
+        """
+
+        if self._complete:
+            return True
+
+        return len(sheet.rows) < self.page_size or page * self.page_size >= (sheet.total_row_count or 0)
+
+    def _records(self, sheet):
+        """Converts the rows of a page to compact records.
+
+        Arguments:
+            sheet {Sheet} -- The sheet with the rows of the page.
+
+        Returns:
+            list -- SheetRow records of the page.
+        """
+
+        records = []
+        raw_column_ids = self.raw_column_ids
+        cell_key = self._cell_key
+        self.rows_fetched += len(sheet.rows)
+        for row in sheet.rows:
+            # Rows hidden by the filter_id sheet filter are still returned
+            if getattr(row, "filtered_out", False):
+                continue
+            if self.display_values:
+                values = {
+                    cell_key(cell): cell.value if cell_key(cell) in raw_column_ids else cell_value(cell)
+                    for cell in row.cells}
+            else:
+                values = {cell_key(cell): cell.value for cell in row.cells}
+            records.append(SheetRow(
+                row.id,
+                row.row_number,
+                row.modified_at,
+                tuple(values.get(column_id) for column_id in self._column_ids)))
+
+        return records
+
+    def close(self):
+        """Stops iterating, shutting down the prefetch thread and releasing the fetched page.
+        Iterators left unconsumed should be closed.
+        """
+
+        self._consumed = True
+        self.sheet.rows = []
+        if self._pages is not None:
+            self._pages.close()
+
+    def __iter__(self):
+        if self._consumed:
+            raise AirflowException(
+                f"Rows of sheet {self.sheet_id} can only be iterated once.")
+        self._consumed = True
+        self._pages = self._iter_pages()
+
+        return self._pages
+
+    def _iter_pages(self):
+        """Yields the records of every page, fetching the next page ahead if prefetching.
+        """
+
+        executor = ThreadPoolExecutor(max_workers=1) if self.prefetch else None
+        try:
+            page, sheet = 1, self.sheet
+            while sheet is not None:
+                following = None
+                if not self._is_last(page, sheet):
+                    if executor is not None:
+                        following = executor.submit(self._get_page, page + 1)
+                    else:
+                        following = page + 1
+
+                if self.on_page is not None:
+                    self.on_page(sheet)
+                records = self._records(sheet)
+
+                # Release the page models before yielding its records
+                sheet = None
+                if page == 1:
+                    self.sheet.rows = []
+                yield from records
+                records = None
+
+                if following is None:
+                    break
+                page += 1
+                sheet = following.result() if executor is not None else self._get_page(following)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+
+class ReportRowIterator(SheetRowIterator):
+    """Iterates over the rows of a report one page at a time.
+    Report columns are keyed by their virtual column IDs; rows keep the IDs of their source sheet rows.
+    """
+
+    def column_key(self, column):
+        return column.virtual_id
+
+    def _cell_key(self, cell):
+        return cell.virtual_column_id
+
+    def _fetch(self, page):
+        return self.client.Reports.get_report(
+            self.sheet_id,
+            page_size=self.page_size,
+            page=page,
+            **self.kwargs)
+
+
+def cell_value(cell):
+    """Selects the value of a Smartsheet cell as it appears in a CSV export.
+
+    Arguments:
+        cell {Cell} -- The Smartsheet cell.
+
+    Returns:
+        object -- The display value if present, otherwise the raw value.
+    """
+
+    if cell.display_value is not None:
+        return cell.display_value
+    if isinstance(cell.value, bool):
+        return "true" if cell.value else "false"
+    return cell.value
@@ -0,0 +1,163 @@
+# On-disk cache of sheet exports and payloads shared by tasks on the same machine.
+
+import logging
+import os
+import shutil
+import tempfile
+
+from airflow_smartsheet.consts import *
+
+
+class SheetCache:
+    """A size-bounded on-disk cache of sheet contents keyed by sheet ID, version and format.
+    Entries are written atomically and evicted least recently used first; a cache hit
+    refreshes the modification time of its entry.
+    """
+
+    def __init__(self, cache_dir, max_bytes=None):
+        """Initializes a sheet cache. The directory is created on first write.
+
+        Arguments:
+            cache_dir {str} -- The cache directory.
+
+        Keyword Arguments:
+            max_bytes {int} -- Maximum total size of cached entries. (default: {None})
+        """
+
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes if max_bytes is not None else DEFAULT_CACHE_MAX_BYTES
+
+    def path(self, sheet_id, version, fmt):
+        """Builds the path of a cache entry.
+
+        Arguments:
+            sheet_id {int} -- The sheet ID.
+            version {int} -- The sheet version.
+            fmt {str} -- The content format.
+
+        Returns:
+            str -- Path to the cache entry.
+        """
+
+        return os.path.join(self.cache_dir, f"{sheet_id}_{version}.{fmt.lower()}")
+
+    def open(self, sheet_id, version, fmt, mode="rb"):
+        """Opens a cache entry for reading.
+
+        Arguments:
+            sheet_id {int} -- The sheet ID.
+            version {int} -- The sheet version.
+            fmt {str} -- The content format.
+
+        Keyword Arguments:
+            mode {str} -- The file mode. (default: {"rb"})
+
+        Returns:
+            file -- The open cache entry, or None on a cache miss.
+        """
+
+        path = self.path(sheet_id, version, fmt)
+        try:
+            file = open(path, mode)
+        except OSError:
+            return None
+
+        # Opened entries stay readable even if evicted meanwhile
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        logging.info(f"Serving {fmt} of sheet {sheet_id} at version {version} from cache.")
+        return file
+
+    def fetch(self, sheet_id, version, fmt, destination):
+        """Atomically copies a cache entry to a destination path.
+
+        Arguments:
+            sheet_id {int} -- The sheet ID.
+            version {int} -- The sheet version.
+            fmt {str} -- The content format.
+            destination {str} -- Path to copy the entry to.
+
+        Returns:
+            bool -- Whether the entry was cached.
+        """
+
+        source = self.open(sheet_id, version, fmt)
+        if source is None:
+            return False
+
+        with source:
+            _atomic_copy(source, destination)
+
+        return True
+
+    def put(self, sheet_id, version, fmt, source_path):
+        """Atomically stores a copy of a file as a cache entry, then evicts entries over the size limit.
+
+        Arguments:
+            sheet_id {int} -- The sheet ID.
+            version {int} -- The sheet version.
+            fmt {str} -- The content format.
+            source_path {str} -- Path to the file to be cached.
+        """
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(source_path, "rb") as source:
+            _atomic_copy(source, self.path(sheet_id, version, fmt))
+
+        self.evict()
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits its size limit.
+        Entries being written by other tasks are never removed.
+        """
+
+        entries = []
+        try:
+            with os.scandir(self.cache_dir) as scan:
+                for entry in scan:
+                    if entry.name.startswith(".") or not entry.is_file():
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            return
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # Removed by another task
+                pass
+            total -= size
+
+
+def _atomic_copy(source, destination):
+    """Copies a file object to a path through a temporary file in the same directory.
+
+    Arguments:
+        source {file} -- The binary file object to copy.
+        destination {str} -- The destination path.
+    """
+
+    fd, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(destination) or ".",
+        prefix=".")
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            shutil.copyfileobj(source, temp_file)
+        os.replace(temp_path, destination)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
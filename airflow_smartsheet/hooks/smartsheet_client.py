@@ -0,0 +1,163 @@
+# Smartsheet SDK session used by the Smartsheet hook, with rate limiting and retries.
+
+import logging
+import smartsheet
+import threading
+import time
+
+from smartsheet.exceptions import HttpError, UnexpectedRequestError
+from smartsheet.smartsheet import OperationErrorResult
+
+from airflow.exceptions import AirflowException
+
+from airflow_smartsheet.hooks.retry import backoff_delay, retry_after, should_retry
+from airflow_smartsheet.consts import *
+
+
+class SmartsheetClient(smartsheet.Smartsheet):
+    """Smartsheet API session with rate limiting and retries.
+    Every request waits on the rate limiter; throttled and failed requests are retried
+    with Retry-After or jittered exponential backoff, behind a circuit breaker.
+    """
+
+    rate_limiter = None
+    circuit_breaker = None
+    counters = None
+    max_retries = MAX_RETRIES
+
+    # Size of the last response body of every thread
+    _responses = threading.local()
+
+    def response_bytes(self):
+        """Gets the size of the last successful response body received on the current thread.
+
+        Returns:
+            int -- The response body size in bytes.
+        """
+
+        return getattr(self._responses, "bytes", 0)
+
+    def _request(self, prepped_request, operation):
+        """Sends a single API request once the rate limiter allows it.
+        """
+
+        if self.rate_limiter is not None:
+            waited = self.rate_limiter.acquire()
+            if self.counters is not None:
+                self.counters.increment("limiter_wait", waited)
+        if self.counters is None:
+            return super()._request(prepped_request, operation)
+
+        self.counters.increment("calls")
+        started = time.monotonic()
+        try:
+            return super()._request(prepped_request, operation)
+        finally:
+            self.counters.increment("api_time", time.monotonic() - started)
+
+    def request_with_retry(self, prepped_request, operation):
+        """Sends an API request, retrying throttled requests, server errors and connection errors.
+
+        Arguments:
+            prepped_request {Request} -- The prepared request.
+            operation {dict} -- The SDK operation details.
+
+        Raises:
+            AirflowException: Raised when the circuit breaker is open.
+
+        Returns:
+            OperationResult -- The result of the last attempt.
+        """
+
+        attempt = 0
+        # The access token is redacted from sent requests; keep a copy to resend
+        pre_redact_request = prepped_request.copy()
+        while True:
+            if self.circuit_breaker is not None and not self.circuit_breaker.allow():
+                raise AirflowException(
+                    "Smartsheet API circuit is open after repeated failures; not sending request.")
+
+            error = None
+            wait = None
+            try:
+                result = self._request(prepped_request, operation)
+            except (HttpError, UnexpectedRequestError) as ex:
+                error = ex
+            else:
+                if not isinstance(result, OperationErrorResult) or not _should_retry(result.resp):
+                    # Successful or not worth retrying; the service itself is healthy
+                    self._responses.bytes = _body_size(result.resp)
+                    if self.counters is not None:
+                        self.counters.increment("bytes", self._responses.bytes)
+                    if self.circuit_breaker is not None:
+                        self.circuit_breaker.record_success()
+                    if self.rate_limiter is not None and not isinstance(result, OperationErrorResult):
+                        self.rate_limiter.reward()
+                    return result
+
+                wait = retry_after(result.resp)
+                if result.resp.status_code == 429:
+                    if self.counters is not None:
+                        self.counters.increment("throttles")
+                    if self.rate_limiter is not None:
+                        self.rate_limiter.penalize(wait or 0.0)
+
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record_failure()
+
+            attempt += 1
+            if attempt > self.max_retries:
+                if self.counters is not None:
+                    self.counters.increment("failures")
+                if error is not None:
+                    raise error
+                return result
+
+            if wait is None:
+                wait = backoff_delay(attempt)
+            if self.counters is not None:
+                self.counters.increment("retries")
+                self.counters.increment("retry_wait", wait)
+
+            logging.info(
+                f"Smartsheet API request failed ({error if error is not None else result.resp.status_code}); "
+                f"retry {attempt} of {self.max_retries} in {wait:.1f} seconds.")
+            time.sleep(wait)
+            prepped_request = pre_redact_request.copy()
+
+
+def _body_size(response):
+    """Measures a response body without consuming streamed downloads.
+
+    Arguments:
+        response {Response} -- The HTTP response.
+
+    Returns:
+        int -- The decoded body size in bytes, or the Content-Length of streamed responses.
+    """
+
+    if getattr(response, "_content_consumed", False):
+        return len(response.content or b"")
+
+    try:
+        return int(response.headers.get("Content-Length", 0))
+    except (AttributeError, TypeError, ValueError):
+        return 0
+
+
+def _should_retry(response):
+    """Determines whether a failed request is worth retrying.
+
+    Arguments:
+        response {Response} -- The HTTP response.
+
+    Returns:
+        bool -- Whether the request was throttled, failed on the server or hit a busy sheet.
+    """
+
+    try:
+        error_code = response.json().get("errorCode")
+    except (AttributeError, ValueError):
+        error_code = None
+
+    return should_retry(response.status_code, error_code)
@@ -1,26 +1,50 @@
 # Hooks used to interface with Smartsheet SDK.
 
-import smartsheet
+import os
+import threading
+import time
 
 from airflow.hooks.base_hook import BaseHook
 from airflow.models import Variable
 from airflow.exceptions import AirflowException
 
+from airflow_smartsheet.hooks.rate_limiter import RateLimiter
+from airflow_smartsheet.hooks.retry import ApiCounters, CircuitBreaker
 from airflow_smartsheet.consts import *
 
 
 class SmartsheetHook(BaseHook):
     """Interact with Smartsheet using Smartsheet's Python SDK.
+    Authenticated API sessions and the default token are cached per worker process,
+    so hooks in the same process reuse HTTP connections.
+    Requests made with the same token share a rate limiter, circuit breaker and counters.
     """
 
-    def __init__(self, token=None):
+    # Process-wide caches shared by every hook
+    _clients = {}
+    _api_states = {}
+    _default_token = None
+    _default_token_expires_at = 0.0
+    _cache_lock = threading.RLock()
+
+    def __init__(self, token=None, rate_limiter=None, max_connections=None, api_base=None):
         """Initializes the hook with Smartsheet SDK.
 
         Keyword Arguments:
             token {str} -- Optional token that overrrides the token stored in Airflow variables. (default: {None})
+            rate_limiter {RateLimiter} -- Optional rate limiter overriding the one shared by the token. (default: {None})
+            max_connections {int} -- Optional HTTP connection pool size. (default: {None})
+            api_base {str} -- Optional API base URL, such as a regional endpoint;
+                read from the SMARTSHEET_API_BASE environment variable if unspecified. (default: {None})
         """
 
         self.token = self.__get_token(token)
+        self.rate_limiter = rate_limiter
+        self.max_connections = max_connections
+        self.api_base = api_base
+
+        if api_base is None:
+            self.api_base = os.environ.get(API_BASE_ENV)
 
     def __get_token(self, token=None):
         """Select either the user-specified token or the default token from Airflow variables.
@@ -40,20 +64,147 @@ class SmartsheetHook(BaseHook):
         if token is not None:
             # Use override token
             return token
-        else:
-            # Use token in variables
-            default_token = Variable.get(VARIABLE_NAME)
-            if default_token is None:
-                raise AirflowException(
-                    f"Failed initializing Smartsheet hook; variable {VARIABLE_NAME} does not exist.")
 
-            return default_token
+        # Use cached token in variables
+        cls = SmartsheetHook
+        with cls._cache_lock:
+            if cls._default_token is not None and time.monotonic() < cls._default_token_expires_at:
+                return cls._default_token
+
+        # Use token in variables
+        default_token = Variable.get(VARIABLE_NAME)
+        if default_token is None:
+            raise AirflowException(
+                f"Failed initializing Smartsheet hook; variable {VARIABLE_NAME} does not exist.")
+
+        with cls._cache_lock:
+            if cls._default_token is not None and cls._default_token != default_token:
+                # Token rotated; sessions of the old token are stale
+                cls.invalidate_cache(cls._default_token)
+            cls._default_token = default_token
+            cls._default_token_expires_at = time.monotonic() + TOKEN_CACHE_TTL
+
+        return default_token
+
+    @classmethod
+    def invalidate_cache(cls, token=None):
+        """Drops cached API sessions and the cached default token.
+        Call this after the access token rotates.
+
+        Keyword Arguments:
+            token {str} -- Optional token whose sessions are dropped; drops all sessions if unspecified. (default: {None})
+        """
+
+        with cls._cache_lock:
+            if token is None or token == cls._default_token:
+                cls._default_token = None
+                cls._default_token_expires_at = 0.0
+
+            for key in list(cls._clients):
+                if token is None or key[0] == token:
+                    del cls._clients[key]
+
+    def _get_api_state(self):
+        """Gets the rate limiter, circuit breaker and counters shared by the token.
+
+        Returns:
+            tuple -- The shared rate limiter, circuit breaker and counters.
+        """
+
+        cls = SmartsheetHook
+        with cls._cache_lock:
+            state = cls._api_states.get(self.token)
+            if state is None:
+                state = (RateLimiter(), CircuitBreaker(), ApiCounters())
+                cls._api_states[self.token] = state
+
+        return state
+
+    def get_stats(self):
+        """Reports API activity of every session using the token in this process.
+
+        Returns:
+            dict -- Counts of calls, throttles, retries and failures, and seconds spent waiting.
+        """
+
+        return self._get_api_state()[2].snapshot()
 
     def get_conn(self):
         """Authenticates with the Smartsheet API and returns the session object.
+        Sessions are shared by hooks with the same token, pool size, rate limiter and API base URL.
 
         Returns:
             Smartsheet -- The Smartsheet API session.
         """
 
-        return smartsheet.Smartsheet(self.token)
+        # The SDK loads on first use rather than when DAG files import the hook
+        from airflow_smartsheet.hooks.smartsheet_client import SmartsheetClient
+
+        key = (self.token, self.max_connections, self.rate_limiter, self.api_base)
+        cls = SmartsheetHook
+        with cls._cache_lock:
+            client = cls._clients.get(key)
+            if client is not None:
+                return client
+
+            options = {}
+            if self.max_connections is not None:
+                options["max_connections"] = self.max_connections
+            if self.api_base is not None:
+                options["api_base"] = self.api_base
+            client = SmartsheetClient(self.token, **options)
+            shared_limiter, client.circuit_breaker, client.counters = self._get_api_state()
+            client.rate_limiter = self.rate_limiter if self.rate_limiter is not None else shared_limiter
+
+            # Evict the oldest session when the cache is full
+            if len(cls._clients) >= MAX_CACHED_CLIENTS:
+                del cls._clients[next(iter(cls._clients))]
+            cls._clients[key] = client
+
+        return client
+
+    def iter_rows(self, sheet_id, page_size=None, prefetch=False, **kwargs):
+        """Iterates over the rows of a sheet one page at a time.
+        Other keyword arguments are passed on to SheetRowIterator and Sheets.get_sheet.
+
+        Arguments:
+            sheet_id {int} -- Sheet ID to fetch.
+
+        Keyword Arguments:
+            page_size {int} -- Number of rows per page. (default: {None})
+            prefetch {bool} -- Whether to fetch the next page on a background thread. (default: {False})
+
+        Returns:
+            SheetRowIterator -- Iterable of SheetRow records with the sheet metadata and columns.
+        """
+
+        from airflow_smartsheet.hooks.row_iterator import SheetRowIterator
+
+        return SheetRowIterator(
+            self.get_conn(), sheet_id,
+            page_size=page_size,
+            prefetch=prefetch,
+            **kwargs)
+
+    def iter_report_rows(self, report_id, page_size=None, prefetch=False, **kwargs):
+        """Iterates over the rows of a report one page at a time.
+        Other keyword arguments are passed on to ReportRowIterator and Reports.get_report.
+
+        Arguments:
+            report_id {int} -- Report ID to fetch.
+
+        Keyword Arguments:
+            page_size {int} -- Number of rows per page. (default: {None})
+            prefetch {bool} -- Whether to fetch the next page on a background thread. (default: {False})
+
+        Returns:
+            ReportRowIterator -- Iterable of SheetRow records with the report metadata and columns.
+        """
+
+        from airflow_smartsheet.hooks.row_iterator import ReportRowIterator
+
+        return ReportRowIterator(
+            self.get_conn(), report_id,
+            page_size=page_size,
+            prefetch=prefetch,
+            **kwargs)
@@ -0,0 +1,273 @@
+# Operators used to load many Smartsheet sheets in one task.
+
+import logging
+import re
+
+from concurrent.futures import ThreadPoolExecutor
+
+from airflow.exceptions import AirflowException
+
+from airflow_smartsheet.hooks.rate_limiter import RateLimiter
+from airflow_smartsheet.hooks.smartsheet_hook import SmartsheetHook
+from airflow_smartsheet.operators.instrumentation import StageTimer
+from airflow_smartsheet.operators.smartsheet_operator import SmartsheetOperator, SmartsheetToPostgresOperator
+from airflow_smartsheet.consts import *
+
+
+class SmartsheetBulkToPostgresOperator(SmartsheetOperator):
+    """The Smartsheet operator to save many sheets to database concurrently.
+    """
+
+    def __init__(
+            self,
+            sheets=None,
+            workspace_id=None,
+            folder_id=None,
+            max_workers=None,
+            rate_limit=None,
+            fail_on_error=True,
+            load_options=None,
+            postgres_conn_id=None,
+            postgres_database=None,
+            postgres_schema=None,
+            *args, **kwargs):
+        """Initializes a Smartsheet Bulk To Postgres operator.
+        This operator fetches sheets concurrently and saves each one to its own PostgreSQL table.
+        Sheets listed in a workspace or folder, including nested folders, are saved to tables named after
+        the sheets; listed sheets whose names map to the same table fail the task unless all but one of them
+        are given a table name in the sheet list.
+
+        Keyword Arguments:
+            sheets {list} -- Optional (sheet ID, table name) pairs to load. (default: {None})
+            workspace_id {int} -- Optional workspace whose sheets are loaded. (default: {None})
+            folder_id {int} -- Optional folder whose sheets are loaded. (default: {None})
+            max_workers {int} -- Maximum number of sheets loaded at once. (default: {None})
+            rate_limit {int} -- Optional maximum number of API requests per minute across all workers;
+                uses the limiter shared by the token if unspecified. (default: {None})
+            fail_on_error {bool} -- Whether to fail the task after all sheets ran if any sheet failed. (default: {True})
+            load_options {dict} -- Optional SmartsheetToPostgresOperator arguments applied to every sheet. (default: {None})
+
+        Raises:
+            AirflowException: Raised when no sheets, workspace or folder is specified.
+            AirflowException: Raised when the load options make the sheet loads deferrable.
+        """
+
+        if sheets is None and workspace_id is None and folder_id is None:
+            raise AirflowException(
+                "Either sheets or workspace ID or folder ID must be specified.")
+
+        # Sheets load on worker threads, which cannot defer the task
+        if load_options and load_options.get("deferrable"):
+            raise AirflowException(
+                "Bulk sheet loads cannot be deferrable; use one deferrable SmartsheetToPostgresOperator per sheet.")
+
+        self.sheets = sheets
+        self.workspace_id = workspace_id
+        self.folder_id = folder_id
+        self.max_workers = max_workers
+        self.rate_limit = rate_limit
+        self.fail_on_error = fail_on_error
+        self.load_options = load_options
+        self.postgres_conn_id = postgres_conn_id
+        self.postgres_database = postgres_database
+        self.postgres_schema = postgres_schema
+
+        if sheets is None:
+            self.sheets = []
+
+        if max_workers is None:
+            self.max_workers = DEFAULT_BULK_WORKERS
+
+        if load_options is None:
+            self.load_options = {}
+
+        if postgres_conn_id is None:
+            self.postgres_conn_id = DEFAULT_PG_CONN
+
+        if postgres_database is None:
+            self.postgres_database = DEFAULT_PG_DB
+
+        if postgres_schema is None:
+            self.postgres_schema = DEFAULT_PG_SCHEMA
+
+        super().__init__(*args, **kwargs)
+
+    def _list_sheets(self):
+        """Collects the sheets to load from the sheet list, workspace and folder.
+
+        Raises:
+            AirflowException: Raised when listing a workspace or folder returns an error.
+            AirflowException: Raised when several sheets would be saved to the same table.
+
+        Returns:
+            list -- (sheet ID, table name) pairs.
+        """
+
+        pairs = [(sheet_id, table_name) for sheet_id, table_name in self.sheets]
+
+        containers = []
+        if self.workspace_id is not None:
+            containers.append(self.smartsheet.Workspaces.get_workspace(self.workspace_id))
+        if self.folder_id is not None:
+            containers.append(self.smartsheet.Folders.get_folder(self.folder_id))
+
+        # Sheets in the sheet list keep their table names; sheets listed twice are loaded once
+        listed = {sheet_id for sheet_id, _ in pairs}
+        for container in containers:
+            for sheet in _walk_sheets(container, self.smartsheet):
+                if sheet.id not in listed:
+                    listed.add(sheet.id)
+                    pairs.append((sheet.id, _table_name(sheet.name)))
+
+        sheets_by_table = {}
+        for sheet_id, table_name in pairs:
+            sheets_by_table.setdefault(table_name, []).append(sheet_id)
+        collisions = {table_name: ids for table_name, ids in sheets_by_table.items() if len(ids) > 1}
+        if collisions:
+            raise AirflowException(
+                f"Several sheets would be saved to the same table: {collisions}; "
+                "list all but one of them with their own table names in sheets.")
+
+        return pairs
+
+    def _sync_sheet(self, sheet_id, table_name):
+        """Loads one sheet with the shared hooks.
+
+        Arguments:
+            sheet_id {int} -- Sheet ID to fetch.
+            table_name {str} -- Name of the target table.
+
+        Returns:
+            dict -- The sheet status.
+        """
+
+        status = {"sheet_id": sheet_id, "table_name": table_name}
+        try:
+            loader = SmartsheetToPostgresOperator(
+                task_id=f"{self.task_id}_{sheet_id}",
+                sheet_id=sheet_id,
+                table_name=table_name,
+                postgres_conn_id=self.postgres_conn_id,
+                postgres_database=self.postgres_database,
+                postgres_schema=self.postgres_schema,
+                **self.load_options)
+            loader.postgres = self.postgres
+            loader.smartsheet_hook = self.smartsheet_hook
+            loader.smartsheet = self.smartsheet
+            loader._ensure_paths()
+            loader.stages = StageTimer()
+
+            result = loader._sync()
+            status["stages"] = loader.stages.snapshot()
+            if isinstance(result, dict):
+                status["status"] = "loaded"
+                status["rows"] = result
+            else:
+                status["status"] = result if result is not None else "loaded"
+        except Exception as ex:
+            logging.exception(f"Loading sheet {sheet_id} to {table_name} failed.")
+            status["status"] = "failed"
+            status["error"] = str(ex)
+
+        return status
+
+    def execute(self, context):
+        """Loads every sheet and reports a per-sheet status.
+
+        Arguments:
+            context {dict} -- The task context.
+
+        Raises:
+            AirflowException: Raised when any sheet failed and failing on errors is enabled.
+
+        Returns:
+            list -- Per-sheet status dicts.
+        """
+
+        from airflow_smartsheet.hooks.pooled_postgres_hook import PooledPostgresHook
+
+        with self._instrument(context):
+            # Hooks are shared by all workers
+            rate_limiter = None
+            if self.rate_limit is not None:
+                rate_limiter = RateLimiter(self.rate_limit)
+            self.smartsheet_hook = SmartsheetHook(
+                self._get_token(),
+                rate_limiter=rate_limiter,
+                max_connections=self.max_workers)
+            self.smartsheet = self.smartsheet_hook.get_conn()
+            self.postgres = PooledPostgresHook(
+                max_connections=self.max_workers,
+                postgres_conn_id=self.postgres_conn_id,
+                schema=self.postgres_database)
+
+            self.api_stats = self.smartsheet_hook.get_stats()
+
+            with self._stage("list_sheets"):
+                pairs = self._list_sheets()
+            try:
+                with self._stage("sync_sheets") as metrics, \
+                        ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    summary = list(executor.map(
+                        lambda pair: self._sync_sheet(*pair), pairs))
+                    metrics["rows"] = len(summary)
+            finally:
+                self.postgres.close_all()
+
+            failed = [status for status in summary if status["status"] == "failed"]
+            logging.info(
+                f"Loaded {len(summary) - len(failed)} of {len(summary)} sheets; {len(failed)} failed.")
+
+            if failed and self.fail_on_error:
+                context["ti"].xcom_push(key="summary", value=summary)
+                raise AirflowException(
+                    f"Loading failed for sheets {[status['sheet_id'] for status in failed]}.")
+
+            return summary
+
+
+def _walk_sheets(container, client=None):
+    """Yields the sheets of a workspace or folder, including nested folders.
+    Listings only hold the top level of their folders, so every nested folder is fetched with its own call.
+
+    Arguments:
+        container {Workspace|Folder} -- The workspace or folder listing.
+
+    Keyword Arguments:
+        client {Smartsheet} -- Optional Smartsheet API session fetching nested folders;
+            only the folders in the listing are walked if unspecified. (default: {None})
+
+    Raises:
+        AirflowException: Raised when listing a workspace or folder returns an error.
+    """
+
+    import smartsheet
+
+    if isinstance(container, smartsheet.models.Error):
+        raise AirflowException(
+            f"Listing sheets was unsuccessful; message is {container.result.message}.")
+
+    for sheet in container.sheets or []:
+        yield sheet
+
+    for folder in container.folders or []:
+        if client is not None:
+            folder = client.Folders.get_folder(folder.id)
+        yield from _walk_sheets(folder, client)
+
+
+def _table_name(sheet_name):
+    """Derives a PostgreSQL table name from a sheet name.
+
+    Arguments:
+        sheet_name {str} -- The sheet name.
+
+    Returns:
+        str -- The lowercase name with non-alphanumeric runs replaced by underscores.
+    """
+
+    name = re.sub(r"[^0-9a-z]+", "_", sheet_name.lower()).strip("_")
+    if not name or name[0].isdigit():
+        name = "sheet_" + name
+
+    return name
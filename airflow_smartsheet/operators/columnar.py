@@ -0,0 +1,196 @@
+# Columnar file writers used to save sheets as typed Parquet or Feather files.
+
+import datetime
+import logging
+import os
+
+from airflow.exceptions import AirflowException
+
+from airflow_smartsheet.operators.columns import postgres_type, to_number, ROW_ID_TYPE, ROW_NUMBER_TYPE
+from airflow_smartsheet.operators.enums import SmartsheetEnums
+from airflow_smartsheet.consts import *
+
+
+# Sheet types written from sheet rows rather than downloaded from the API
+COLUMNAR_TYPES = (SmartsheetEnums.SheetType.PARQUET, SmartsheetEnums.SheetType.FEATHER)
+
+
+def write_columnar(rows, path, sheet_type, row_group_size=None, column_types=None):
+    """Writes sheet rows to a typed columnar file one row group at a time.
+    Column types follow the PostgreSQL type mapping and its overrides; numeric types are written as
+    64-bit integers or floats. Values not matching their column type are written as nulls.
+    The file is replaced atomically.
+
+    Arguments:
+        rows {SheetRowIterator} -- The sheet rows, not yet iterated.
+        path {str} -- Path to the output file.
+        sheet_type {SheetType} -- PARQUET or FEATHER.
+
+    Keyword Arguments:
+        row_group_size {int} -- Number of rows per row group or record batch. (default: {None})
+        column_types {dict} -- Optional PostgreSQL types by column title, overriding the type mapping. (default: {None})
+
+    Raises:
+        AirflowException: Raised when pyarrow is not installed.
+
+    Returns:
+        int -- The number of rows written.
+    """
+
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise AirflowException(
+            f"{sheet_type.name} sheet type needs pyarrow; install it with pip install pyarrow.")
+
+    if row_group_size is None:
+        row_group_size = DEFAULT_ROW_GROUP_SIZE
+
+    # Typed columns are converted from raw API values
+    pg_types = [ROW_NUMBER_TYPE, ROW_ID_TYPE] + [postgres_type(column, column_types) for column in rows.columns]
+    rows.raw_column_ids = {
+        rows.column_key(column) for column, pg_type in zip(rows.columns, pg_types[2:]) if pg_type != "text"}
+    schema = pyarrow.schema([
+        pyarrow.field(name, _arrow_type(pyarrow, pg_type))
+        for name, pg_type in zip(
+            ["RowNumber", "RowId"] + [column.title for column in rows.columns], pg_types)])
+    # Row numbers and IDs are already integers
+    converters = [int, int] + [_CONVERTERS.get(pg_type) for pg_type in pg_types[2:]]
+
+    temp_path = path + ".tmp"
+    if sheet_type is SmartsheetEnums.SheetType.PARQUET:
+        writer = pyarrow.parquet.ParquetWriter(temp_path, schema)
+        write = writer.write_table
+    else:
+        writer = pyarrow.ipc.new_file(temp_path, schema)
+        write = writer.write
+
+    written, invalid = 0, 0
+    try:
+        chunk = []
+        for row in rows:
+            chunk.append((row.row_number, row.id) + row.values)
+            if len(chunk) >= row_group_size:
+                invalid += _write_chunk(pyarrow, write, schema, converters, chunk)
+                written += len(chunk)
+                chunk = []
+        if chunk or not written:
+            invalid += _write_chunk(pyarrow, write, schema, converters, chunk)
+            written += len(chunk)
+        writer.close()
+    except BaseException:
+        writer.close()
+        os.remove(temp_path)
+        raise
+
+    os.replace(temp_path, path)
+
+    if invalid:
+        logging.warning(
+            f"Wrote {invalid} values that do not match their column type as nulls.")
+
+    return written
+
+
+def _write_chunk(pyarrow, write, schema, converters, chunk):
+    """Converts rows to typed columns and writes them as one row group.
+
+    Arguments:
+        pyarrow {module} -- The pyarrow module.
+        write {callable} -- The writer method accepting a table.
+        schema {Schema} -- The Arrow schema.
+        converters {list} -- Value converter of every column, or None for untyped columns.
+        chunk {list} -- The row tuples.
+
+    Returns:
+        int -- The number of values written as nulls because they did not match their column type.
+    """
+
+    arrays, invalid = [], 0
+    for index, (field, converter) in enumerate(zip(schema, converters)):
+        values = [row[index] for row in chunk]
+        if converter is None:
+            values = [None if value is None else str(value) for value in values]
+        elif converter is not int:
+            converted = []
+            for value in values:
+                try:
+                    converted.append(None if value is None else converter(value))
+                except (TypeError, ValueError):
+                    converted.append(None)
+                    invalid += 1
+            values = converted
+        arrays.append(pyarrow.array(values, type=field.type))
+
+    write(pyarrow.Table.from_arrays(arrays, schema=schema))
+    return invalid
+
+
+def _arrow_type(pyarrow, pg_type):
+    """Maps a PostgreSQL type of the type mapping to an Arrow type.
+
+    Arguments:
+        pyarrow {module} -- The pyarrow module.
+        pg_type {str} -- The PostgreSQL type.
+
+    Returns:
+        DataType -- The Arrow type; string for unmapped types.
+    """
+
+    return {
+        ROW_NUMBER_TYPE: pyarrow.int64(),
+        ROW_ID_TYPE: pyarrow.int64(),
+        "date": pyarrow.date32(),
+        "timestamptz": pyarrow.timestamp("ms", tz="UTC"),
+        "timestamp": pyarrow.timestamp("ms"),
+        "boolean": pyarrow.bool_(),
+        "smallint": pyarrow.int64(),
+        "numeric": pyarrow.float64(),
+        "double precision": pyarrow.float64(),
+        "real": pyarrow.float64(),
+    }.get(pg_type, pyarrow.string())
+
+
+def _to_date(value):
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+def _to_timestamptz(value):
+    return datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+def _to_timestamp(value):
+    return _to_timestamptz(value).replace(tzinfo=None)
+
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    if str(value).lower() in ("true", "false"):
+        return str(value).lower() == "true"
+    raise ValueError(value)
+
+
+def _to_integer(value):
+    return to_number(value, "bigint")
+
+
+def _to_float(value):
+    return float(to_number(value))
+
+
+# Value converters of typed columns
+_CONVERTERS = {
+    "integer": _to_integer,
+    "bigint": _to_integer,
+    "smallint": _to_integer,
+    "numeric": _to_float,
+    "double precision": _to_float,
+    "real": _to_float,
+    "date": _to_date,
+    "timestamptz": _to_timestamptz,
+    "timestamp": _to_timestamp,
+    "boolean": _to_bool,
+}
@@ -0,0 +1,107 @@
+# Column type mapping between Smartsheet columns and PostgreSQL types.
+
+import math
+
+from decimal import Decimal, InvalidOperation
+
+
+# PostgreSQL types of Smartsheet column types; unlisted types are loaded as text.
+# TEXT_NUMBER is the default type of free text columns, so numbers are only loaded
+# as numbers when a numeric type is given as a column type override
+COLUMN_TYPES = {
+    "DATE": "date",
+    "DATETIME": "timestamptz",
+    "ABSTRACT_DATETIME": "timestamp",
+    "CHECKBOX": "boolean",
+}
+
+# PostgreSQL types of Smartsheet system column types; these take precedence over column types
+SYSTEM_COLUMN_TYPES = {
+    "AUTO_NUMBER": "text",
+    "CREATED_DATE": "timestamptz",
+    "MODIFIED_DATE": "timestamptz",
+    "CREATED_BY": "text",
+    "MODIFIED_BY": "text",
+}
+
+# PostgreSQL types of the columns added to every sheet
+ROW_NUMBER_TYPE = "integer"
+ROW_ID_TYPE = "bigint"
+ROW_HASH_TYPE = "text"
+
+# Numeric PostgreSQL types of column type overrides; values are converted by to_number
+NUMERIC_TYPES = ("numeric", "double precision", "real", "integer", "bigint", "smallint")
+INTEGER_TYPES = ("integer", "bigint", "smallint")
+
+
+def postgres_type(column, overrides=None):
+    """Maps a Smartsheet column to a PostgreSQL type.
+
+    Arguments:
+        column {Column} -- The Smartsheet column.
+
+    Keyword Arguments:
+        overrides {dict} -- Optional PostgreSQL types by column title, taking precedence over the mapping. (default: {None})
+
+    Returns:
+        str -- The PostgreSQL type.
+    """
+
+    if overrides is not None and column.title in overrides:
+        return overrides[column.title]
+
+    system_type = str(column.system_column_type)
+    if system_type in SYSTEM_COLUMN_TYPES:
+        return SYSTEM_COLUMN_TYPES[system_type]
+
+    return COLUMN_TYPES.get(str(column.type), "text")
+
+
+def to_number(value, pg_type="numeric"):
+    """Converts a raw cell value to a number of a numeric PostgreSQL type.
+
+    Arguments:
+        value {object} -- The raw cell value, a number or text.
+
+    Keyword Arguments:
+        pg_type {str} -- The numeric PostgreSQL type. (default: {"numeric"})
+
+    Raises:
+        ValueError: Raised when the value is not a finite number, or not a whole number for integer types.
+
+    Returns:
+        object -- An int for integer types; otherwise the number, or a Decimal parsed from text.
+    """
+
+    if isinstance(value, bool):
+        raise ValueError(value)
+
+    number = value
+    if not isinstance(value, (int, float)):
+        try:
+            number = Decimal(str(value).strip())
+        except InvalidOperation:
+            raise ValueError(value)
+
+    if not math.isfinite(number):
+        raise ValueError(value)
+
+    if pg_type in INTEGER_TYPES:
+        if number != int(number):
+            raise ValueError(value)
+        return int(number)
+
+    return number
+
+
+def quote_ident(name):
+    """Quotes a PostgreSQL identifier.
+
+    Arguments:
+        name {str} -- The identifier to quote.
+
+    Returns:
+        str -- The double-quoted identifier.
+    """
+
+    return '"' + str(name).replace('"', '""') + '"'
@@ -14,6 +14,8 @@ class SmartsheetEnums:
         CSV = 0
         EXCEL = 1
         PDF = 2
+        PARQUET = 3
+        FEATHER = 4
 
     class PaperSize(Enum):
         """Sheet output paper size. Used for PDF file type.
@@ -35,3 +37,19 @@ class SmartsheetEnums:
 
         PARAMS = 0
         FILES = 1
+
+    class FetchMode(Enum):
+        """Sheet fetch mode. Used for loading a sheet to PostgreSQL.
+        """
+
+        JSON = 0
+        CSV = 1
+
+    class LoadMode(Enum):
+        """PostgreSQL table load mode. Used for loading a sheet to PostgreSQL.
+        """
+
+        TRUNCATE = 0
+        INCREMENTAL = 1
+        SHADOW = 2
+        DIFF = 3
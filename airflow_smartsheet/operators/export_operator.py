@@ -0,0 +1,331 @@
+# Operators used to archive Smartsheet sheets with their attachments.
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+
+from concurrent.futures import ThreadPoolExecutor
+
+from airflow.exceptions import AirflowException
+
+from airflow_smartsheet.operators.columnar import write_columnar, COLUMNAR_TYPES
+from airflow_smartsheet.operators.enums import SmartsheetEnums
+from airflow_smartsheet.operators.smartsheet_operator import SmartsheetOperator
+from airflow_smartsheet.consts import *
+
+
+class SmartsheetExportOperator(SmartsheetOperator):
+    """The Smartsheet operator to export a sheet in several formats with its attachments.
+    """
+
+    def __init__(
+            self,
+            sheet_id,
+            sheet_types=None,
+            paper_size=None,
+            with_attachments=True,
+            output_dir=None,
+            max_workers=None,
+            row_group_size=None,
+            column_types=None,
+            *args, **kwargs):
+        """Initializes a Smartsheet Export operator.
+        This operator downloads every requested format and attachment of a sheet concurrently
+        and writes a manifest listing every file with its checksum.
+
+        Arguments:
+            sheet_id {int} -- Sheet ID to export.
+
+        Keyword Arguments:
+            sheet_types {list} -- Optional sheet types to export. (default: {None}, CSV, EXCEL and PDF)
+            paper_size {str} -- Optional paper size for PDF file type. (default: {None})
+            with_attachments {bool} -- Whether to download sheet, row and comment attachments. (default: {True})
+            output_dir {str} -- Optional output directory to override default OS temp path. (default: {None})
+            max_workers {int} -- Maximum number of concurrent downloads. (default: {None})
+            row_group_size {int} -- Optional number of rows per row group of PARQUET and FEATHER files. (default: {None})
+            column_types {dict} -- Optional PostgreSQL types by column title, overriding the type mapping
+                of PARQUET and FEATHER files. (default: {None})
+
+        Raises:
+            AirflowException: Raised when PDF file type is selected but paper size is unspecified.
+        """
+
+        # Invalid enum keys will cause an exception
+        self.sheet_id = sheet_id
+        self.with_attachments = with_attachments
+        self.row_group_size = row_group_size
+        self.column_types = column_types
+
+        if sheet_types is None:
+            self.sheet_types = [
+                sheet_type for sheet_type in SmartsheetEnums.SheetType if sheet_type not in COLUMNAR_TYPES]
+        else:
+            self.sheet_types = [SmartsheetEnums.SheetType[sheet_type] for sheet_type in sheet_types]
+
+        if paper_size is None:
+            self.paper_size = None
+        else:
+            self.paper_size = SmartsheetEnums.PaperSize[paper_size]
+
+        # Check for paper size if format is PDF
+        if SmartsheetEnums.SheetType.PDF in self.sheet_types and self.paper_size is None:
+            raise AirflowException(
+                "PDF sheet type needs a paper size; paper size is unspecified.")
+
+        if output_dir is not None:
+            self.output_dir = output_dir
+        else:
+            self.output_dir = tempfile.gettempdir()
+
+        if max_workers is not None:
+            self.max_workers = max_workers
+        else:
+            self.max_workers = DEFAULT_EXPORT_WORKERS
+
+        super().__init__(*args, **kwargs)
+
+    def _read_manifest(self):
+        """Reads the manifest of the previous export.
+
+        Returns:
+            dict -- Previous manifest entries of attachments by attachment ID.
+        """
+
+        try:
+            with open(self.manifest_path) as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            return {}
+
+        return {
+            entry["attachment_id"]: entry
+            for entry in manifest.get("files", [])
+            if entry.get("attachment_id") is not None}
+
+    def _write_manifest(self, entries):
+        """Atomically writes the manifest of this export.
+
+        Arguments:
+            entries {list} -- Manifest entries of every exported file.
+        """
+
+        manifest = {"sheet_id": self.sheet_id, "files": entries}
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+    def _export_sheet(self, sheet_type):
+        """Downloads the sheet in one format.
+
+        Arguments:
+            sheet_type {SheetType} -- The sheet type.
+
+        Raises:
+            AirflowException: Raised when the download returns an error.
+
+        Returns:
+            dict -- The manifest entry of the file.
+        """
+
+        with self._stage(f"export_{sheet_type.name.lower()}") as metrics:
+            entry = self._download_sheet(sheet_type)
+            metrics["bytes"] = entry["bytes"]
+        return entry
+
+    def _download_sheet(self, sheet_type):
+        """Downloads or writes the sheet file of one format.
+
+        Arguments:
+            sheet_type {SheetType} -- The sheet type.
+
+        Raises:
+            AirflowException: Raised when the download returns an error.
+
+        Returns:
+            dict -- The manifest entry of the file.
+        """
+
+        filename = str(self.sheet_id) + "." + sheet_type.name.lower()
+        if sheet_type in COLUMNAR_TYPES:
+            path = os.path.join(self.output_dir, filename)
+            write_columnar(
+                self.smartsheet_hook.iter_rows(self.sheet_id), path, sheet_type, self.row_group_size,
+                self.column_types)
+            return _file_entry(path, sheet_type.name)
+
+        if sheet_type is SmartsheetEnums.SheetType.CSV:
+            downloaded = self.smartsheet.Sheets.get_sheet_as_csv(
+                self.sheet_id, self.output_dir, filename)
+        elif sheet_type is SmartsheetEnums.SheetType.EXCEL:
+            downloaded = self.smartsheet.Sheets.get_sheet_as_excel(
+                self.sheet_id, self.output_dir, filename)
+        else:
+            downloaded = self.smartsheet.Sheets.get_sheet_as_pdf(
+                self.sheet_id, self.output_dir, self.paper_size.name, filename)
+
+        if downloaded.message != "SUCCESS":
+            raise AirflowException(
+                f"Download of {sheet_type.name} was unsuccessful; message is {downloaded.message}.")
+
+        return _file_entry(os.path.join(self.output_dir, filename), sheet_type.name)
+
+    def _export_attachment(self, attachment, previous):
+        """Downloads one attachment unless the previous export already has it.
+        The previous file is kept when the attachment has the same size and creation time,
+        and the file on disk still has the size the manifest recorded.
+
+        Arguments:
+            attachment {Attachment} -- The attachment listing.
+            previous {dict} -- The previous manifest entry of the attachment, if any.
+
+        Raises:
+            AirflowException: Raised when the download returns an error.
+
+        Returns:
+            dict -- The manifest entry of the file.
+        """
+
+        import smartsheet
+
+        filename = f"{attachment.id}_{_safe_name(attachment.name)}"
+        path = os.path.join(self.attachment_dir, filename)
+
+        created_at = attachment.created_at.isoformat() if attachment.created_at is not None else None
+        if previous is not None \
+                and previous.get("size_in_kb") == attachment.size_in_kb \
+                and previous.get("created_at") == created_at \
+                and os.path.isfile(path) \
+                and os.path.getsize(path) == previous.get("bytes"):
+            return previous
+
+        with self._stage("attachments") as metrics:
+            # Attachment URLs are temporary and only returned by a single attachment lookup
+            attachment = self.smartsheet.Attachments.get_attachment(self.sheet_id, attachment.id)
+            if isinstance(attachment, smartsheet.models.Error):
+                raise AirflowException(
+                    f"Fetching attachment was unsuccessful; message is {attachment.result.message}.")
+
+            downloaded = self.smartsheet.Attachments.download_attachment(
+                attachment, self.attachment_dir, filename)
+            if downloaded is None or downloaded.message != "SUCCESS":
+                raise AirflowException(
+                    f"Download of attachment {attachment.id} was unsuccessful.")
+
+            entry = _file_entry(path, "ATTACHMENT")
+            metrics["bytes"] = entry["bytes"]
+        entry["attachment_id"] = attachment.id
+        entry["size_in_kb"] = attachment.size_in_kb
+        entry["created_at"] = created_at
+        return entry
+
+    def _list_attachments(self):
+        """Lists the downloadable sheet, row and comment attachments.
+
+        Raises:
+            AirflowException: Raised when the API returns an error.
+
+        Returns:
+            list -- File attachments of the sheet.
+        """
+
+        import smartsheet
+
+        result = self.smartsheet.Attachments.list_all_attachments(
+            self.sheet_id, include_all=True)
+        if isinstance(result, smartsheet.models.Error):
+            raise AirflowException(
+                f"Listing attachments was unsuccessful; message is {result.result.message}.")
+
+        return [attachment for attachment in result.data if str(attachment.attachment_type) == "FILE"]
+
+    def execute(self, context=None):
+        """Exports every requested format and attachment, then writes the manifest.
+
+        Arguments:
+            context {dict} -- The task context.
+
+        Raises:
+            AirflowException: Raised when any download failed.
+
+        Returns:
+            dict -- The manifest.
+        """
+
+        with self._instrument(context):
+            super().execute()
+
+            self.manifest_path = os.path.join(
+                self.output_dir, str(self.sheet_id) + "_manifest.json")
+            self.attachment_dir = os.path.join(
+                self.output_dir, str(self.sheet_id) + "_attachments")
+
+            jobs = [(self._export_sheet, (sheet_type,)) for sheet_type in self.sheet_types]
+            if self.with_attachments:
+                os.makedirs(self.attachment_dir, exist_ok=True)
+                previous = self._read_manifest()
+                with self._stage("list_attachments"):
+                    attachments = self._list_attachments()
+                jobs.extend(
+                    (self._export_attachment, (attachment, previous.get(attachment.id)))
+                    for attachment in attachments)
+
+            entries, errors = [], []
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [executor.submit(job, *args) for job, args in jobs]
+                for future in futures:
+                    try:
+                        entries.append(future.result())
+                    except Exception as ex:
+                        logging.exception("Export download failed.")
+                        errors.append(str(ex))
+
+            with self._stage("write_manifest"):
+                self._write_manifest(entries)
+            logging.info(
+                f"Exported {len(entries)} files of sheet {self.sheet_id}; {len(errors)} failed.")
+
+            if errors:
+                raise AirflowException(
+                    f"Export of sheet {self.sheet_id} had {len(errors)} failed downloads: {errors}.")
+
+            return {"sheet_id": self.sheet_id, "files": entries}
+
+
+def _file_entry(path, kind):
+    """Builds the manifest entry of a downloaded file.
+
+    Arguments:
+        path {str} -- Path to the file.
+        kind {str} -- The sheet type name, or ATTACHMENT.
+
+    Returns:
+        dict -- The file path, kind, size and SHA-256 checksum.
+    """
+
+    checksum = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(2 ** 16), b""):
+            checksum.update(chunk)
+
+    return {
+        "path": path,
+        "kind": kind,
+        "bytes": os.path.getsize(path),
+        "sha256": checksum.hexdigest()}
+
+
+def _safe_name(name):
+    """Replaces characters that are unsafe in file names.
+
+    Arguments:
+        name {str} -- The attachment name.
+
+    Returns:
+        str -- The name with path separators and control characters replaced.
+    """
+
+    return re.sub(r"[\\/:*?\"<>|\x00-\x1f]", "_", name or "attachment")
@@ -1,16 +1,27 @@
 # Operators used to ensure PostgreSQL table compatibility with data workflow.
 
+import logging
 import os
-import yaml
+import re
+import threading
+import time
 
-from airflow.models import AirflowException
-from airflow.hooks.postgres_hook import PostgresHook
+from contextlib import closing
 
+from airflow.exceptions import AirflowException
+from airflow.models import BaseOperator
+
+from airflow_smartsheet.operators.columns import quote_ident
 from airflow_smartsheet.operators.enums import SmartsheetEnums
 from airflow_smartsheet.consts import *
 
 
-class SmartsheetDbPrepOperator(PostgresOperator):
+# Parsed YML specs by file path, with the modification time they were parsed at
+_spec_cache = {}
+_spec_cache_lock = threading.Lock()
+
+
+class SmartsheetDbPrepOperator(BaseOperator):
     """The operator to create PostgreSQL Smartsheet views and apply nexessary transformations.
     Exists for backward compatibility reason.
 
@@ -24,21 +35,46 @@ class SmartsheetDbPrepOperator(PostgresOperator):
             view_as=None,
             yml_file=None,
             yml_path=None,
+            transforms=None,
+            materialized=False,
+            unique_indexes=None,
+            upstream_task_ids=None,
+            batches=None,
+            dry_run=False,
             postgres_conn_id=None,
             postgres_database=None,
             postgres_schema=None,
             *args, **kwargs):
         """Initializes a Smartsheet DB Prep operator.
         This operator ensures PostgreSQL view and necessary data transforms.
-        Refer to __set_params() for parameter description.
+        Refer to __set_params() for view parameter description.
+
+        Keyword Arguments:
+            transforms {list} -- Optional transform statements run after the view given by parameters. (default: {None})
+            materialized {bool} -- Whether the view given by parameters is materialized. (default: {False})
+            unique_indexes {list} -- Optional unique indexes of the materialized view given by parameters,
+                each a column name or a list of column names. (default: {None})
+            upstream_task_ids {list} -- Optional load tasks whose results decide whether materialized views
+                are refreshed; views are always refreshed if unspecified. (default: {None})
+            batches {int} -- Number of transactions the views are split into, in dependency order. (default: {None})
+            dry_run {bool} -- Whether to only log and return the planned statements. (default: {False})
         """
 
         self.__set_params(view_name, view_as, yml_file, yml_path)
 
+        self.transforms = transforms or []
+        self.materialized = materialized
+        self.unique_indexes = unique_indexes or []
+        self.upstream_task_ids = upstream_task_ids
+        self.batches = batches
+        self.dry_run = dry_run
         self.postgres_conn_id = postgres_conn_id
         self.postgres_database = postgres_database
         self.postgres_schema = postgres_schema
 
+        if batches is None:
+            self.batches = DEFAULT_PREP_BATCHES
+
         if postgres_conn_id is None:
             self.postgres_conn_id = DEFAULT_PG_CONN
 
@@ -48,25 +84,23 @@ class SmartsheetDbPrepOperator(PostgresOperator):
         if postgres_schema is None:
             self.postgres_schema = DEFAULT_PG_SCHEMA
 
-        super().__init__(
-            postgres_conn_id=postgres_conn_id,
-            *args, **kwargs)
-    
+        super().__init__(*args, **kwargs)
+
     def __set_params(self, view_name, view_as, yml_file, yml_path):
         """Validates parameters and set properties.
         Labeled in parentheses, one out of three sets of parameters is required
         to specify PostgreSQL operations. This allows either one-off database
         operation or batch operation with multiple YML files.
         Parameter sets with bigger number takes precedence.
-        
+
         Arguments:
             view_name {str} -- The name of the view.                    (1)
             view_as {str} -- The SELECT statement of the view.          (1)
             yml_file {str} -- Path to a single YML file to be parsed.   (2)
             yml_path {str} -- Path to YML files to be parsed.           (3)
-        
+
         Raises:
-            AirflowException: [description]
+            AirflowException: Raised when no set of parameters is specified.
         """
 
         with_params = view_name is not None and view_as is not None
@@ -76,49 +110,346 @@ class SmartsheetDbPrepOperator(PostgresOperator):
             raise AirflowException(
                 "Either parameters or YML file or YML path must be specified."
             )
-        
+
         # Precedence: path > file > params
+        # Files under a path are discovered on execution
+        self.yml_path = yml_path
         if with_path:
-            dirpath, dirnames, filenames = os.walk(yml_path)
-            self.ymls = [path for path in dirpath if path[:-3] == "yml"]
-            self.mode = SmartsheetEnums.BatchMode.PARAMS
+            self.ymls = None
+            self.mode = SmartsheetEnums.BatchMode.FILES
         elif with_file:
-            self.ymls = [ yml_file ]
+            self.ymls = [yml_file]
             self.mode = SmartsheetEnums.BatchMode.FILES
         else:
             self.ymls = None
             self.view_name = view_name
             self.view_as = view_as
-            self.mode = SmartsheetEnums.BatchMode.FILES
-    
-    def _ensure_view(self):
-        """Ensures the view for the target table is created.
+            self.mode = SmartsheetEnums.BatchMode.PARAMS
+
+    def _discover(self):
+        """Lists the YML files to be parsed.
+
+        Returns:
+            list -- Paths to YML files, sorted.
         """
 
-        self.postgres.run(
-            f"CREATE VIEW IF NOT EXISTS {self.view_name} AS ({self.view_as});")
-    
-    def _execute_transforms(self):
-        """Batch executes the specified transform statements.
+        if self.yml_path is None:
+            return self.ymls
+
+        ymls = []
+        for dirpath, _, filenames in os.walk(self.yml_path):
+            ymls.extend(
+                os.path.join(dirpath, filename)
+                for filename in filenames
+                if filename.endswith((".yml", ".yaml")))
+
+        return sorted(ymls)
+
+    def _specs(self):
+        """Builds the view specs to be applied.
+
+        Returns:
+            list -- View specs, ordered so that every view follows the views it depends on.
         """
 
-        sql = ";".join(self.transforms)
-        self.postgres.run(sql)
-    
+        if self.mode is SmartsheetEnums.BatchMode.PARAMS:
+            return [{
+                "view_name": self.view_name,
+                "as": self.view_as,
+                "statements": self.transforms,
+                "materialized": self.materialized,
+                "unique_indexes": self.unique_indexes}]
+
+        return _order_specs([_load_spec(path) for path in self._discover()])
+
+    def _upstream_changed(self, context):
+        """Determines whether any upstream load changed rows.
+
+        Arguments:
+            context {dict} -- The task context.
+
+        Returns:
+            bool -- Whether materialized views need a refresh.
+        """
+
+        if not self.upstream_task_ids or context is None:
+            return True
+
+        results = context["ti"].xcom_pull(task_ids=list(self.upstream_task_ids))
+        return any(_load_changed(result) for result in results)
+
+    def _plan(self, specs, refresh=True):
+        """Splits the statements of every spec into batches.
+
+        Arguments:
+            specs {list} -- Ordered view specs.
+
+        Keyword Arguments:
+            refresh {bool} -- Whether to refresh existing materialized views. (default: {True})
+
+        Returns:
+            list -- Batches, each a list of (statement, refreshed view or None, checked spec or None) run in one transaction.
+        """
+
+        if not specs:
+            return []
+
+        batch_count = max(1, min(self.batches, len(specs)))
+        size = -(-len(specs) // batch_count)
+
+        batches = []
+        for start in range(0, len(specs), size):
+            statements = []
+            for spec in specs[start:start + size]:
+                statements.extend(_view_statements(spec, refresh))
+            batches.append(statements)
+
+        return batches
+
     def execute(self, context=None):
-        self.postgres = PostgresHook(
+        """Ensures every view, runs its transforms and refreshes materialized views.
+
+        Arguments:
+            context {dict} -- The task context.
+
+        Returns:
+            dict -- The planned statements and the refresh duration of every materialized view in seconds.
+        """
+
+        from airflow_smartsheet.hooks.pooled_postgres_hook import PooledPostgresHook
+
+        refresh = self._upstream_changed(context)
+        if not refresh:
+            logging.info("Upstream loads changed no rows; skipping materialized view refreshes.")
+
+        batches = self._plan(self._specs(), refresh)
+        statements = [statement for batch in batches for statement, _, _ in batch]
+        refresh_seconds = {}
+
+        if self.dry_run:
+            for statement in statements:
+                logging.info(f"Planned statement: {statement}")
+            return {"statements": statements, "refresh_seconds": refresh_seconds}
+
+        self.postgres = PooledPostgresHook(
             postgres_conn_id=self.postgres_conn_id,
             schema=self.postgres_database)
-        
 
-        if self.mode is SmartsheetEnums.BatchMode.PARAMS:
-            self._ensure_view()
-            self._execute_transforms()
-        elif self.mode is SmartsheetEnums.BatchMode.FILES:
-            for file in self.ymls:
-                yml = yaml.load(open(file))
-                self.view_name = yml["view_name"]
-                self.view_as = yml["as"]
-                self.transforms = yml["statements"]
-                self._ensure_view()
-                self._execute_transforms()
+        # Every batch runs in its own transaction on the same connection
+        created = set()
+        try:
+            with closing(self.postgres.get_conn()) as conn:
+                for number, batch in enumerate(batches, start=1):
+                    with closing(conn.cursor()) as cursor:
+                        for statement, view, spec in batch:
+                            if spec is not None and _drop_changed_view(cursor, spec):
+                                created.add(spec["view_name"])
+                            # Views created by this run are already populated
+                            if view in created:
+                                logging.info(
+                                    f"Materialized view {view} was just created; skipping its refresh.")
+                                continue
+                            started = time.monotonic()
+                            cursor.execute(statement)
+                            if view is not None:
+                                refresh_seconds[view] = time.monotonic() - started
+                                logging.info(
+                                    f"Refreshed materialized view {view} in {refresh_seconds[view]:.3f} seconds.")
+                    conn.commit()
+                    logging.info(
+                        f"Applied batch {number} of {len(batches)} with {len(batch)} statements.")
+        finally:
+            self.postgres.close_all()
+
+        return {"statements": statements, "refresh_seconds": refresh_seconds}
+
+
+def _view_statements(spec, refresh):
+    """Builds the statements ensuring a view, running its transforms and refreshing it.
+    Materialized views are created if missing; an existing one is checked against the spec
+    before its statement runs and recreated if its definition changed. Views created by the run are not refreshed.
+
+    Arguments:
+        spec {dict} -- The view spec.
+        refresh {bool} -- Whether to refresh the view if it is materialized.
+
+    Returns:
+        list -- (statement, refreshed view or None, spec to check or None) of every statement.
+    """
+
+    name = spec["view_name"]
+    if not spec.get("materialized"):
+        statements = [(f"CREATE OR REPLACE VIEW {name} AS ({spec['as']});", None, None)]
+        statements.extend((statement, None, None) for statement in spec.get("statements") or [])
+        return statements
+
+    statements = [(f"CREATE MATERIALIZED VIEW IF NOT EXISTS {name} AS ({spec['as']});", None, spec)]
+
+    # Concurrent refreshes need a unique index
+    base_name = str(name).split(".")[-1].strip('"')
+    unique_indexes = spec.get("unique_indexes") or []
+    for number, columns in enumerate(unique_indexes, start=1):
+        if isinstance(columns, str):
+            columns = [columns]
+        column_list = ", ".join(quote_ident(column) for column in columns)
+        index_name = quote_ident(f"{base_name[:52]}_{number}_uidx")
+        statements.append(
+            (f"CREATE UNIQUE INDEX IF NOT EXISTS {index_name} ON {name} ({column_list});", None, None))
+
+    statements.extend((statement, None, None) for statement in spec.get("statements") or [])
+
+    if refresh:
+        concurrently = " CONCURRENTLY" if unique_indexes else ""
+        statements.append((f"REFRESH MATERIALIZED VIEW{concurrently} {name};", name, None))
+
+    return statements
+
+
+def _drop_changed_view(cursor, spec):
+    """Drops an existing materialized view whose definition differs from its spec, so it is created anew.
+    The spec's query is normalized by PostgreSQL through a temporary view before the definitions are compared.
+    A changed view that other views select from is kept, with a warning, as dropping it would drop them too.
+
+    Arguments:
+        cursor {cursor} -- The psycopg2 cursor to execute on.
+        spec {dict} -- The materialized view spec.
+
+    Returns:
+        bool -- Whether the view is missing or was dropped, so that its statement creates and populates it.
+    """
+
+    name = spec["view_name"]
+    cursor.execute(
+        "SELECT pg_get_viewdef(oid) FROM pg_class WHERE oid = to_regclass(%s) AND relkind = 'm';",
+        (name,))
+    existing = cursor.fetchone()
+    if existing is None:
+        return True
+
+    cursor.execute(f"CREATE TEMPORARY VIEW smartsheet_prep_definition AS ({spec['as']});")
+    cursor.execute("SELECT pg_get_viewdef('smartsheet_prep_definition'::regclass);")
+    definition, = cursor.fetchone()
+    cursor.execute("DROP VIEW smartsheet_prep_definition;")
+    if definition == existing[0]:
+        return False
+
+    cursor.execute(
+        "SELECT count(*) FROM pg_depend d "
+        "JOIN pg_rewrite r ON r.oid = d.objid "
+        "WHERE d.classid = 'pg_rewrite'::regclass AND d.refobjid = to_regclass(%s) "
+        "AND r.ev_class <> d.refobjid;",
+        (name,))
+    dependents, = cursor.fetchone()
+    if dependents:
+        logging.warning(
+            f"Definition of materialized view {name} changed, but views select from it; "
+            "drop it to apply the new definition.")
+        return False
+
+    cursor.execute(f"DROP MATERIALIZED VIEW {name};")
+    logging.info(f"Definition of materialized view {name} changed; recreating it.")
+
+    return True
+
+
+def _load_changed(result):
+    """Determines whether a load task result reports changed rows.
+    Loads that do not count rows are assumed to have changed rows; moved rows only changed their row number
+    and do not count as changes.
+
+    Arguments:
+        result {object} -- The XCom result of a SmartsheetToPostgresOperator or SmartsheetBulkToPostgresOperator.
+
+    Returns:
+        bool -- Whether rows may have changed.
+    """
+
+    if result == SKIPPED_UNCHANGED:
+        return False
+
+    if isinstance(result, dict):
+        return result.get("inserted", 1) + result.get("updated", 1) + result.get("deleted", 1) > 0
+
+    # Bulk loads report a status per sheet
+    if isinstance(result, list):
+        return any(
+            _load_changed(status.get("rows", status.get("status")))
+            for status in result)
+
+    return True
+
+
+def _load_spec(path):
+    """Parses a YML view spec, reusing the parsed spec while the file is unmodified.
+
+    Arguments:
+        path {str} -- Path to the YML file.
+
+    Raises:
+        AirflowException: Raised when the spec has no view name or SELECT statement.
+
+    Returns:
+        dict -- The view spec.
+    """
+
+    import yaml
+
+    mtime = os.path.getmtime(path)
+    with _spec_cache_lock:
+        cached = _spec_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with open(path) as file:
+        spec = yaml.safe_load(file)
+    if not isinstance(spec, dict) or "view_name" not in spec or "as" not in spec:
+        raise AirflowException(
+            f"YML file {path} needs a view_name and an as entry.")
+
+    with _spec_cache_lock:
+        _spec_cache[path] = (mtime, spec)
+
+    return spec
+
+
+def _order_specs(specs):
+    """Orders view specs so that every view follows the views it depends on.
+    A view depends on the views listed in its depends_on entry and the views its SELECT statement names.
+
+    Arguments:
+        specs {list} -- View specs.
+
+    Raises:
+        AirflowException: Raised when views depend on each other in a cycle.
+
+    Returns:
+        list -- The view specs in dependency order, otherwise in their original order.
+    """
+
+    names = [str(spec["view_name"]) for spec in specs]
+    patterns = {
+        name: re.compile(r"(?<![\w.\"])" + re.escape(name) + r"(?![\w\"])", re.IGNORECASE)
+        for name in names}
+
+    dependencies = []
+    for spec, name in zip(specs, names):
+        depends_on = set(spec.get("depends_on") or [])
+        depends_on.update(
+            other for other in names
+            if other != name and patterns[other].search(str(spec["as"])))
+        dependencies.append(depends_on & set(names))
+
+    ordered, done = [], set()
+    while len(ordered) < len(specs):
+        ready = [
+            index for index, name in enumerate(names)
+            if name not in done and dependencies[index] <= done]
+        if not ready:
+            pending = [name for name in names if name not in done]
+            raise AirflowException(
+                f"Views {pending} depend on each other in a cycle.")
+        for index in ready:
+            ordered.append(specs[index])
+            done.add(names[index])
+
+    return ordered
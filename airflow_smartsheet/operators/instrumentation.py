@@ -0,0 +1,201 @@
+# Stage timing and profiling used to see where operator runs spend their time.
+
+import io
+import logging
+import os
+import threading
+import time
+
+from contextlib import contextmanager
+
+try:
+    from airflow.stats import Stats
+except ImportError:
+    # Airflow before 1.10.6
+    from airflow.settings import Stats
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+from airflow_smartsheet.consts import *
+
+
+class StageTimer:
+    """Collects the wall time, rows and bytes of every stage of an operator run.
+    Repeated stages accumulate; stages run on several threads may add up to more than the run time.
+    """
+
+    def __init__(self):
+        """Initializes an empty stage timer.
+        """
+
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """Times a stage. The yielded dict takes optional rows and bytes counts of the stage.
+
+        Arguments:
+            name {str} -- The stage name.
+
+        Yields:
+            dict -- Metrics of the stage.
+        """
+
+        metrics = {}
+        started = time.monotonic()
+        try:
+            yield metrics
+        finally:
+            self.record(name, time.monotonic() - started, **metrics)
+
+    def record(self, name, seconds, rows=None, bytes=None):
+        """Adds a timed stage.
+
+        Arguments:
+            name {str} -- The stage name.
+            seconds {float} -- The wall time of the stage.
+
+        Keyword Arguments:
+            rows {int} -- Optional number of rows handled by the stage. (default: {None})
+            bytes {int} -- Optional number of bytes handled by the stage. (default: {None})
+        """
+
+        with self._lock:
+            entry = self._stages.setdefault(name, {"seconds": 0.0, "count": 0})
+            entry["seconds"] += seconds
+            entry["count"] += 1
+            if rows is not None:
+                entry["rows"] = entry.get("rows", 0) + rows
+            if bytes is not None:
+                entry["bytes"] = entry.get("bytes", 0) + bytes
+
+    def snapshot(self):
+        """Copies the stages recorded so far.
+
+        Returns:
+            dict -- Seconds, count, rows and bytes of every stage by name.
+        """
+
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._stages.items()}
+
+
+class Profiler:
+    """Optionally profiles an operator run with cProfile and tracemalloc.
+    Peak resident memory is always reported where the platform provides it.
+    """
+
+    def __init__(self, profile=False, trace_memory=False, output_path=None):
+        """Initializes a profiler.
+
+        Keyword Arguments:
+            profile {bool} -- Whether to profile function calls with cProfile. (default: {False})
+            trace_memory {bool} -- Whether to trace Python allocations with tracemalloc. (default: {False})
+            output_path {str} -- Optional path to dump cProfile statistics to. (default: {None})
+        """
+
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.output_path = output_path
+
+        self._profiler = None
+        self._started_tracing = False
+
+    def start(self):
+        """Starts the enabled profilers.
+        """
+
+        # Profilers load only when enabled
+        if self.trace_memory:
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+        if self.profile:
+            import cProfile
+
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self):
+        """Stops the enabled profilers and logs their findings.
+
+        Returns:
+            dict -- Peak memory figures and the path to the cProfile dump, where available.
+        """
+
+        report = {}
+        if self._profiler is not None:
+            import pstats
+
+            self._profiler.disable()
+            output = io.StringIO()
+            pstats.Stats(self._profiler, stream=output).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+            logging.info(f"Profile of the slowest functions:\n{output.getvalue()}")
+            if self.output_path is not None:
+                self._profiler.dump_stats(self.output_path)
+                report["profile_path"] = self.output_path
+            self._profiler = None
+
+        if self.trace_memory:
+            import tracemalloc
+
+            if tracemalloc.is_tracing():
+                snapshot = tracemalloc.take_snapshot()
+                report["traced_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+                top = "\n".join(str(stat) for stat in snapshot.statistics("lineno")[:PROFILE_TOP_FUNCTIONS])
+                logging.info(f"Largest Python allocations still held:\n{top}")
+                if self._started_tracing:
+                    tracemalloc.stop()
+                    self._started_tracing = False
+
+        if resource is not None:
+            # Linux reports kilobytes
+            report["max_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+        return report
+
+
+def emit_metrics(prefix, report):
+    """Emits stage timings and counts through Airflow's StatsD metrics.
+
+    Arguments:
+        prefix {str} -- The metric name prefix.
+        report {dict} -- The instrumentation report of an operator run.
+    """
+
+    for name, entry in report.get("stages", {}).items():
+        Stats.timing(f"{prefix}.{name}", entry["seconds"] * 1000)
+        for count in ("rows", "bytes"):
+            if count in entry:
+                Stats.incr(f"{prefix}.{name}.{count}", entry[count])
+
+    for name, value in report.get("api", {}).items():
+        if name.endswith(("_time", "_wait")):
+            Stats.timing(f"{prefix}.api.{name}", value * 1000)
+        else:
+            Stats.incr(f"{prefix}.api.{name}", value)
+
+    for name in ("max_rss_bytes", "traced_peak_bytes"):
+        if name in report:
+            Stats.gauge(f"{prefix}.{name}", report[name])
+
+
+def profile_path(output_dir, task_id):
+    """Builds the path of a cProfile dump.
+
+    Arguments:
+        output_dir {str} -- The output directory.
+        task_id {str} -- The task ID.
+
+    Returns:
+        str -- Path to the dump, unique per run.
+    """
+
+    return os.path.join(output_dir, f"{task_id}_{int(time.time())}.prof")
@@ -0,0 +1,337 @@
+# Shadow table helpers used to swap a freshly loaded table in place of its target.
+
+import hashlib
+
+from airflow.exceptions import AirflowException
+
+from airflow_smartsheet.operators.columns import quote_ident
+
+
+# PostgreSQL's identifier length limit
+MAX_IDENTIFIER_LENGTH = 63
+
+
+def _suffixed(name, suffix):
+    """Appends a suffix to a name, keeping it within PostgreSQL's identifier length limit.
+    Names too long to take the suffix are shortened and told apart by a digest of the full name.
+
+    Arguments:
+        name {str} -- The name.
+        suffix {str} -- The suffix.
+
+    Returns:
+        str -- The suffixed name.
+    """
+
+    if len(name) + len(suffix) <= MAX_IDENTIFIER_LENGTH:
+        return name + suffix
+
+    digest = hashlib.sha1(name.encode("utf-8")).hexdigest()[:8]
+    return name[:MAX_IDENTIFIER_LENGTH - len(suffix) - len(digest) - 1] + "_" + digest + suffix
+
+
+def shadow_name(name):
+    """Names the shadow counterpart of a table.
+
+    Arguments:
+        name {str} -- The table name.
+
+    Returns:
+        str -- The shadow name, ending in _shadow.
+    """
+
+    return _suffixed(name, "_shadow")
+
+
+def shadow_index_name(name):
+    """Names the temporary counterpart of an index built on a shadow table.
+    The suffix differs from shadow table names, so the default index names of long table names,
+    such as their primary key index, never take the name of the shadow table.
+
+    Arguments:
+        name {str} -- The index name.
+
+    Returns:
+        str -- The temporary index name, ending in _shadow_idx.
+    """
+
+    return _suffixed(name, "_shadow_idx")
+
+
+def create_shadow(cursor, schema, table, unlogged=False):
+    """Creates an empty shadow table shaped like the target table, without its indexes.
+    An unlogged shadow table only speeds up the load; swap_shadow gives it the persistence of the target table.
+
+    Arguments:
+        cursor {cursor} -- The psycopg2 cursor to execute on.
+        schema {str} -- The schema of the target table.
+        table {str} -- The target table name.
+
+    Keyword Arguments:
+        unlogged {bool} -- Whether to create the shadow table unlogged. (default: {False})
+    """
+
+    shadow = shadow_name(table)
+    persistence = "UNLOGGED " if unlogged else ""
+    cursor.execute(f"DROP TABLE IF EXISTS {schema}.{shadow};")
+    cursor.execute(
+        f"CREATE {persistence}TABLE {schema}.{shadow} (LIKE {schema}.{table} "
+        "INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE INCLUDING COMMENTS);")
+
+
+def index_shadow(cursor, schema, table):
+    """Builds the indexes of the target table on the loaded shadow table under temporary names.
+
+    Arguments:
+        cursor {cursor} -- The psycopg2 cursor to execute on.
+        schema {str} -- The schema of the target table.
+        table {str} -- The target table name.
+
+    Returns:
+        list -- (temporary name, index name, constraint name, constraint type) of every index.
+    """
+
+    shadow = shadow_name(table)
+    cursor.execute(
+        "SELECT i.relname, x.indisunique, pg_get_indexdef(x.indexrelid), c.conname, c.contype "
+        "FROM pg_index x "
+        "JOIN pg_class i ON i.oid = x.indexrelid "
+        "LEFT JOIN pg_constraint c ON c.conindid = x.indexrelid AND c.contype IN ('p', 'u') "
+        "WHERE x.indrelid = %s::regclass;",
+        (f"{schema}.{table}",))
+
+    indexes = []
+    for name, unique, definition, constraint, constraint_type in cursor.fetchall():
+        temp_name = shadow_index_name(name)
+        method = definition[definition.index(" USING "):]
+        uniqueness = "UNIQUE " if unique else ""
+        cursor.execute(f"DROP INDEX IF EXISTS {schema}.{quote_ident(temp_name)};")
+        cursor.execute(
+            f"CREATE {uniqueness}INDEX {quote_ident(temp_name)} ON {schema}.{shadow}{method};")
+        indexes.append((temp_name, name, constraint, constraint_type))
+
+    return indexes
+
+
+def _grants(cursor, relation):
+    """Lists the GRANT statements that restore the privileges on a relation.
+
+    Arguments:
+        cursor {cursor} -- The psycopg2 cursor to execute on.
+        relation {str} -- The qualified relation name.
+
+    Returns:
+        list -- (privilege, grantee) of every privilege granted to other roles.
+    """
+
+    cursor.execute(
+        "SELECT CASE WHEN a.grantee = 0 THEN 'PUBLIC' ELSE quote_ident(pg_get_userbyid(a.grantee)) END, "
+        "a.privilege_type "
+        "FROM pg_class c, aclexplode(c.relacl) a "
+        "WHERE c.oid = %s::regclass AND a.grantee <> c.relowner;",
+        (relation,))
+
+    return [(privilege, grantee) for grantee, privilege in cursor.fetchall()]
+
+
+def _comments(cursor, relation):
+    """Lists the COMMENT statements that restore the comments on a relation and its columns.
+
+    Arguments:
+        cursor {cursor} -- The psycopg2 cursor to execute on.
+        relation {str} -- The qualified relation name.
+
+    Returns:
+        list -- (column name, comment) of every comment; the column name is None for the relation itself.
+    """
+
+    cursor.execute(
+        "SELECT quote_ident(a.attname), d.description "
+        "FROM pg_description d "
+        "LEFT JOIN pg_attribute a ON a.attrelid = d.objoid AND a.attnum = d.objsubid "
+        "WHERE d.objoid = %s::regclass AND d.classoid = 'pg_class'::regclass;",
+        (relation,))
+
+    return cursor.fetchall()
+
+
+def _owner(cursor, relation):
+    """Reads the owner of a relation.
+
+    Arguments:
+        cursor {cursor} -- The psycopg2 cursor to execute on.
+        relation {str} -- The qualified relation name.
+
+    Returns:
+        tuple -- The quoted owner name, and whether the current user may hand the relation to the owner.
+    """
+
+    cursor.execute(
+        "SELECT quote_ident(pg_get_userbyid(relowner)), pg_has_role(relowner, 'MEMBER') "
+        "FROM pg_class WHERE oid = %s::regclass;",
+        (relation,))
+
+    return cursor.fetchone()
+
+
+def _dependent_views(cursor, relation):
+    """Lists the views and materialized views selecting directly from a relation.
+
+    Arguments:
+        cursor {cursor} -- The psycopg2 cursor to execute on.
+        relation {str} -- The qualified relation name.
+
+    Returns:
+        list -- (qualified view name, view definition, relation kind, view options) of every dependent view.
+    """
+
+    cursor.execute(
+        "SELECT DISTINCT quote_ident(n.nspname) || '.' || quote_ident(v.relname), pg_get_viewdef(v.oid), v.relkind, "
+        "array_to_string(v.reloptions, ', ') "
+        "FROM pg_depend d "
+        "JOIN pg_rewrite r ON r.oid = d.objid "
+        "JOIN pg_class v ON v.oid = r.ev_class "
+        "JOIN pg_namespace n ON n.oid = v.relnamespace "
+        "WHERE d.classid = 'pg_rewrite'::regclass AND d.refobjid = %s::regclass "
+        "AND v.oid <> d.refobjid AND v.relkind IN ('v', 'm');",
+        (relation,))
+
+    return cursor.fetchall()
+
+
+def check_shadow(cursor, schema, table):
+    """Checks that the target table can be replaced by its shadow table without losing dependent objects.
+    Views selecting directly from the table are recreated with their options, owners, comments and privileges.
+    Other dependents are not carried over: materialized views, views selecting from those views,
+    and sequences owned by the table, as serial and identity columns have, are refused.
+    Triggers, policies, rules and foreign keys of the table are not recreated either.
+
+    Arguments:
+        cursor {cursor} -- The psycopg2 cursor to execute on.
+        schema {str} -- The schema of the target table.
+        table {str} -- The target table name.
+
+    Raises:
+        AirflowException: Raised when a materialized view or a view of a dependent view selects from the target table.
+        AirflowException: Raised when the target table owns sequences.
+        AirflowException: Raised when the table or a dependent view is owned by a role the current user is not a member of.
+
+    Returns:
+        list -- (qualified view name, view definition, relation kind, view options) of every dependent view.
+    """
+
+    target = f"{schema}.{table}"
+    hint = "use a load mode other than SHADOW."
+
+    # Materialized views would have to be repopulated while the table is locked
+    dependents = _dependent_views(cursor, target)
+    materialized = [view for view, _, kind, _ in dependents if kind == "m"]
+    if materialized:
+        raise AirflowException(
+            f"Materialized views {materialized} select from {target}; {hint}")
+
+    # Dropping a dependent view would need CASCADE, losing the views built on it
+    nested = [nested_view for view, _, _, _ in dependents for nested_view, _, _, _ in _dependent_views(cursor, view)]
+    if nested:
+        raise AirflowException(
+            f"Views {nested} select from views of {target}; {hint}")
+
+    # Owned sequences are dropped with the table while the shadow table's defaults still use them
+    cursor.execute(
+        "SELECT quote_ident(n.nspname) || '.' || quote_ident(s.relname) "
+        "FROM pg_depend d "
+        "JOIN pg_class s ON s.oid = d.objid "
+        "JOIN pg_namespace n ON n.oid = s.relnamespace "
+        "WHERE d.classid = 'pg_class'::regclass AND d.refobjid = %s::regclass "
+        "AND d.deptype IN ('a', 'i') AND s.relkind = 'S';",
+        (target,))
+    sequences = [sequence for sequence, in cursor.fetchall()]
+    if sequences:
+        raise AirflowException(
+            f"{target} owns sequences {sequences} of serial or identity columns; {hint}")
+
+    unowned = [
+        relation for relation in [target] + [view for view, _, _, _ in dependents]
+        if not _owner(cursor, relation)[1]]
+    if unowned:
+        raise AirflowException(
+            f"Owners of {unowned} cannot be restored by the current user; {hint}")
+
+    return dependents
+
+
+def swap_shadow(cursor, schema, table, indexes):
+    """Replaces the target table with its shadow table.
+    Privileges, owners, comments, persistence, indexes, primary and unique constraints, and views selecting
+    directly from the table are carried over; see check_shadow for what is not. Must run inside a single transaction.
+
+    Arguments:
+        cursor {cursor} -- The psycopg2 cursor to execute on.
+        schema {str} -- The schema of the target table.
+        table {str} -- The target table name.
+        indexes {list} -- Indexes built by index_shadow.
+
+    Raises:
+        AirflowException: Raised when check_shadow refuses the target table.
+    """
+
+    target = f"{schema}.{table}"
+    shadow = f"{schema}.{shadow_name(table)}"
+
+    # An unlogged table is truncated after a crash, so a logged target must not be replaced by one.
+    # The shadow table is rewritten before the target is locked
+    cursor.execute(
+        "SELECT t.relpersistence, s.relpersistence FROM pg_class t, pg_class s "
+        "WHERE t.oid = %s::regclass AND s.oid = %s::regclass;",
+        (target, shadow))
+    persistence, shadow_persistence = cursor.fetchone()
+    if persistence != shadow_persistence:
+        cursor.execute(f"ALTER TABLE {shadow} SET {'UNLOGGED' if persistence == 'u' else 'LOGGED'};")
+
+    cursor.execute(f"LOCK TABLE {target} IN ACCESS EXCLUSIVE MODE;")
+
+    # Dependents may have changed while the shadow table was loaded
+    dependents = check_shadow(cursor, schema, table)
+
+    grants = _grants(cursor, target)
+    owner, _ = _owner(cursor, target)
+    cursor.execute("SELECT obj_description(%s::regclass, 'pg_class');", (target,))
+    comment, = cursor.fetchone()
+    views = [
+        (view, definition, options, _grants(cursor, view), _owner(cursor, view)[0], _comments(cursor, view))
+        for view, definition, _, options in dependents]
+
+    # Views holding on to the old table are recreated on the new one
+    for view, _, _, _, _, _ in views:
+        cursor.execute(f"DROP VIEW {view};")
+    cursor.execute(f"DROP TABLE {target};")
+    cursor.execute(f"ALTER TABLE {shadow} RENAME TO {table};")
+
+    for temp_name, name, constraint, constraint_type in indexes:
+        if constraint is None:
+            cursor.execute(
+                f"ALTER INDEX {schema}.{quote_ident(temp_name)} RENAME TO {quote_ident(name)};")
+        else:
+            kind = "PRIMARY KEY" if constraint_type == "p" else "UNIQUE"
+            cursor.execute(
+                f"ALTER TABLE {target} ADD CONSTRAINT {quote_ident(constraint)} {kind} USING INDEX {quote_ident(temp_name)};")
+
+    # Privileges are granted before the owner changes, so the new owner becomes their grantor
+    for privilege, grantee in grants:
+        cursor.execute(f"GRANT {privilege} ON {target} TO {grantee};")
+    if comment is not None:
+        cursor.execute(f"COMMENT ON TABLE {target} IS %s;", (comment,))
+    cursor.execute(f"ALTER TABLE {target} OWNER TO {owner};")
+
+    for view, definition, options, view_grants, view_owner, view_comments in views:
+        # Options hold security_barrier and check_option
+        with_options = f" WITH ({options})" if options else ""
+        cursor.execute(f"CREATE VIEW {view}{with_options} AS {definition}")
+        for privilege, grantee in view_grants:
+            cursor.execute(f"GRANT {privilege} ON {view} TO {grantee};")
+        for column, view_comment in view_comments:
+            if column is None:
+                cursor.execute(f"COMMENT ON VIEW {view} IS %s;", (view_comment,))
+            else:
+                cursor.execute(f"COMMENT ON COLUMN {view}.{column} IS %s;", (view_comment,))
+        cursor.execute(f"ALTER VIEW {view} OWNER TO {view_owner};")
@@ -1,18 +1,36 @@
 # Operators used to interface with Smartsheet SDK.
 
-import csv
+import hashlib
+import itertools
+import json
 import os
+import shutil
 import tempfile
+import time
 import logging
-import smartsheet
+
+from contextlib import closing, contextmanager, nullcontext
+from datetime import timedelta
 
 from airflow.exceptions import AirflowException
 from airflow.models import BaseOperator
 from airflow.models import Variable
-from airflow.hooks.postgres_hook import PostgresHook
 
+try:
+    from airflow.exceptions import TaskDeferred
+except ImportError:
+    # Airflow before 2.2 cannot defer tasks
+    class TaskDeferred(Exception):
+        pass
+
+from airflow_smartsheet.hooks.sheet_cache import SheetCache
 from airflow_smartsheet.hooks.smartsheet_hook import SmartsheetHook
+from airflow_smartsheet.operators.columnar import write_columnar, COLUMNAR_TYPES
+from airflow_smartsheet.operators.columns import postgres_type, quote_ident, to_number, NUMERIC_TYPES, ROW_HASH_TYPE, ROW_ID_TYPE, ROW_NUMBER_TYPE
 from airflow_smartsheet.operators.enums import SmartsheetEnums
+from airflow_smartsheet.operators.instrumentation import emit_metrics, profile_path, Profiler, StageTimer
+from airflow_smartsheet.operators.shadow import check_shadow, create_shadow, index_shadow, shadow_name, swap_shadow
+from airflow_smartsheet.operators.streams import CsvRowStream, JsonSheetWriter
 from airflow_smartsheet.consts import *
 
 
@@ -20,10 +38,20 @@ class SmartsheetOperator(BaseOperator):
     """The base Smartsheet API operator.
     """
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, profile=False, trace_memory=False, token_variable=None, *args, **kwargs):
         """Initializes a base Smartsheet API operator.
+
+        Keyword Arguments:
+            profile {bool} -- Whether to profile the run with cProfile and dump the statistics. (default: {False})
+            trace_memory {bool} -- Whether to trace Python allocations of the run with tracemalloc. (default: {False})
+            token_variable {str} -- Optional name of an Airflow variable holding an override token,
+                read when the task runs. (default: {None})
         """
 
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.token_variable = token_variable
+
         # Set override token if specified
         self.token = None
         if "token" in kwargs:
@@ -37,8 +65,97 @@ class SmartsheetOperator(BaseOperator):
         """Creates a Smartsheet API hook and establishes connection.
         """
 
-        self.smartsheet_hook = SmartsheetHook(self.token)
+        self.smartsheet_hook = SmartsheetHook(self._get_token())
         self.smartsheet = self.smartsheet_hook.get_conn()
+        self.api_stats = self.smartsheet_hook.get_stats()
+
+    def _get_token(self):
+        """Selects the override token, or the token stored in the override token variable.
+
+        Returns:
+            str -- The override token, or None to use the default token.
+        """
+
+        if self.token is None and self.token_variable is not None:
+            return Variable.get(self.token_variable)
+
+        return self.token
+
+    @contextmanager
+    def _instrument(self, context):
+        """Times the stages of a run, then reports them with API activity and peak memory.
+        The report is logged, pushed to XCom under the stages key and emitted as StatsD metrics.
+        API activity covers every session sharing the token in this process. Runs deferring to a trigger
+        are not reported; the resumed run reports the download of the triggerer.
+
+        Arguments:
+            context {dict} -- The task context.
+
+        Yields:
+            StageTimer -- The stage timer of the run.
+        """
+
+        self.stages = StageTimer()
+        output_dir = getattr(self, "output_dir", None) or tempfile.gettempdir()
+        profiler = Profiler(
+            self.profile,
+            self.trace_memory,
+            profile_path(output_dir, self.task_id) if self.profile else None)
+        profiler.start()
+        started = time.monotonic()
+        try:
+            yield self.stages
+        except TaskDeferred:
+            # The resumed run reports the whole download
+            profiler.stop()
+            raise
+        except BaseException:
+            self._report(context, started, profiler)
+            raise
+        self._report(context, started, profiler)
+
+    def _report(self, context, started, profiler):
+        """Reports the stages of a finished run.
+
+        Arguments:
+            context {dict} -- The task context.
+            started {float} -- The monotonic time the run started at.
+            profiler {Profiler} -- The started profiler of the run.
+        """
+
+        report = {
+            "seconds": time.monotonic() - started,
+            "stages": self.stages.snapshot()}
+        if getattr(self, "api_stats", None) is not None:
+            current = self.smartsheet_hook.get_stats()
+            report["api"] = {name: current[name] - self.api_stats.get(name, 0) for name in current}
+        # API activity of the triggerer, if the download was deferred
+        if getattr(self, "deferred_api", None):
+            api = report.setdefault("api", {})
+            for name, value in self.deferred_api.items():
+                api[name] = api.get(name, 0) + value
+        report.update(profiler.stop())
+
+        logging.info(f"Stages of task {self.task_id}: {json.dumps(report)}")
+        emit_metrics(f"{STATS_PREFIX}.{self.task_id}", report)
+        if context is not None and "ti" in context:
+            context["ti"].xcom_push(key="stages", value=report)
+
+    def _stage(self, name):
+        """Times a stage of the current run, if instrumented.
+
+        Arguments:
+            name {str} -- The stage name.
+
+        Returns:
+            contextmanager -- Yields a dict taking optional rows and bytes counts of the stage.
+        """
+
+        stages = getattr(self, "stages", None)
+        if stages is None:
+            return nullcontext({})
+
+        return stages.stage(name)
 
 
 class SmartsheetToFileOperator(SmartsheetOperator):
@@ -52,6 +169,16 @@ class SmartsheetToFileOperator(SmartsheetOperator):
                  output_dir=None,
                  with_json=False,
                  no_overwrite=False,
+                 skip_unchanged=False,
+                 cache_dir=None,
+                 cache_max_bytes=None,
+                 row_group_size=None,
+                 column_types=None,
+                 columns=None,
+                 row_ids=None,
+                 filter_id=None,
+                 report_id=None,
+                 deferrable=False,
                  *args, **kwargs):
         """Initializes a Smartsheet Get Sheet operator.
         This operator takes a Smartsheet sheet and saves it as a file.
@@ -65,9 +192,28 @@ class SmartsheetToFileOperator(SmartsheetOperator):
             output_dir {str} -- Optional output directory to override default OS temp path. (default: {None})
             with_json {bool} -- Whether to save a JSON dump alongside specified file type. (default: {False})
             no_overwrite {bool} -- Whether not to overwrite any file. (default: {False})
+            skip_unchanged {bool} -- Whether to skip the sheet when its version has not changed since the last run. (default: {False})
+            cache_dir {str} -- Optional directory of a content cache serving downloads of unchanged sheet versions. (default: {None})
+            cache_max_bytes {int} -- Optional size limit of the content cache. (default: {None})
+            row_group_size {int} -- Optional number of rows per row group of PARQUET and FEATHER files. (default: {None})
+            column_types {dict} -- Optional PostgreSQL types by column title, overriding the type mapping
+                of PARQUET and FEATHER files; TEXT_NUMBER columns are strings unless given a numeric type here. (default: {None})
+            columns {list} -- Optional IDs or titles of the only columns to fetch. (default: {None})
+            row_ids {list} -- Optional IDs of the only rows to fetch. (default: {None})
+            filter_id {int} -- Optional ID of a saved sheet filter the fetched rows must match. (default: {None})
+            report_id {int} -- Optional ID of a report fetched instead of the sheet; the sheet ID then only names
+                output files. (default: {None})
+            deferrable {bool} -- Whether to free the worker while the triggerer downloads the sheet;
+                needs Airflow 2.2 or later, aiohttp, and an output directory on storage shared by the triggerer
+                and workers, since the task resumes on a worker that reads the downloaded file. (default: {False})
 
         Raises:
             AirflowException: Raised when PDF file type is selected but paper size is unspecified.
+            AirflowException: Raised when columns, rows or reports are filtered for EXCEL or PDF file types.
+            AirflowException: Raised when a deferrable operator runs on Airflow before 2.2.
+            AirflowException: Raised when a deferrable operator filters the sheet or writes a PARQUET or FEATHER file.
+            AirflowException: Raised when a deferrable operator has no output directory.
+            AirflowException: Raised when a deferrable operator is given an override token instead of its variable.
         """
 
         # Invalid enum keys will cause an exception
@@ -75,6 +221,20 @@ class SmartsheetToFileOperator(SmartsheetOperator):
         self.sheet_type = SmartsheetEnums.SheetType[sheet_type]
         self.with_json = with_json
         self.no_overwrite = no_overwrite
+        self.skip_unchanged = skip_unchanged
+        self.row_group_size = row_group_size
+        self.column_types = column_types
+        self.columns = columns
+        self.row_ids = row_ids
+        self.filter_id = filter_id
+        self.report_id = report_id
+        self.deferrable = deferrable
+        self.filtered = any(value is not None for value in (columns, row_ids, filter_id, report_id))
+
+        if cache_dir is None:
+            self.cache = None
+        else:
+            self.cache = SheetCache(cache_dir, cache_max_bytes)
 
         if paper_size is None:
             self.paper_size = None
@@ -86,6 +246,32 @@ class SmartsheetToFileOperator(SmartsheetOperator):
             raise AirflowException(
                 "PDF sheet type needs a paper size; paper size is unspecified.")
 
+        # Filtered data is built from rows; only EXCEL and PDF files need the full export
+        if self.filtered and self.sheet_type in (SmartsheetEnums.SheetType.EXCEL, SmartsheetEnums.SheetType.PDF):
+            raise AirflowException(
+                f"{self.sheet_type.name} sheet type exports the whole sheet; columns, rows or reports are filtered.")
+
+        # The triggerer only downloads whole sheets; filtered and columnar files are built from rows on a worker
+        if deferrable:
+            from airflow_smartsheet.triggers.smartsheet_trigger import triggers_supported
+
+            if not triggers_supported():
+                raise AirflowException(
+                    "Deferrable operators need Airflow 2.2 or later.")
+            if self.filtered or self.sheet_type in COLUMNAR_TYPES:
+                raise AirflowException(
+                    "Deferrable operators download whole sheets; columns, rows or reports are filtered "
+                    "or the sheet type is built from rows.")
+            # The default temp directory is local to the triggerer host
+            if output_dir is None:
+                raise AirflowException(
+                    "Deferrable operators need an output directory shared by the triggerer and workers.")
+            # Trigger arguments are stored in plain text in the metadata database
+            if kwargs.get("token") is not None:
+                raise AirflowException(
+                    "Deferrable operators store their trigger in the metadata database; "
+                    "pass the name of a variable holding the token as token_variable instead of token.")
+
         # Check for output directory
         if output_dir is not None:
             self.output_dir = output_dir
@@ -105,6 +291,15 @@ class SmartsheetToFileOperator(SmartsheetOperator):
         """
         return not os.path.isfile(file_path) or not self.no_overwrite
 
+    def _set_paths(self):
+        """Sets the output file paths.
+        """
+
+        self.file_path = os.path.join(
+            self.output_dir, str(self.sheet_id) + "." + self.sheet_type.name.lower())
+        self.json_path = os.path.join(
+            self.output_dir, str(self.sheet_id) + ".json")
+
     def _ensure_paths(self):
         """Ensures all required output file paths are (over)writable.
 
@@ -113,10 +308,7 @@ class SmartsheetToFileOperator(SmartsheetOperator):
             AirflowException: Raised when unable to write to JSON dump file path.
         """
 
-        self.file_path = os.path.join(
-            self.output_dir, str(self.sheet_id) + "." + self.sheet_type.name.lower())
-        self.json_path = os.path.join(
-            self.output_dir, str(self.sheet_id) + ".json")
+        self._set_paths()
 
         if not self._can_write(self.file_path):
             # Cannot write to download path
@@ -148,25 +340,284 @@ class SmartsheetToFileOperator(SmartsheetOperator):
             # File does not exist; ignote
             pass
 
-    def execute(self, context=None):
-        """Fetches the specified sheet in the specified format.
+    def _get_version(self):
+        """Fetches the current version of the sheet without loading its rows.
 
-        Arguments:
-            context {[type]} -- [description]
+        Raises:
+            AirflowException: Raised when the API returns an error.
+
+        Returns:
+            int -- The sheet version.
+        """
+
+        import smartsheet
+
+        version = self.smartsheet.Sheets.get_sheet_version(self.sheet_id)
+        if isinstance(version, smartsheet.models.Error):
+            raise AirflowException(
+                f"Fetching version of sheet {self.sheet_id} was unsuccessful; message is {version.result.message}.")
+
+        return version.version
+
+    def _version_key(self):
+        """Names the Airflow variable storing the sheet version of the last download.
+
+        Returns:
+            str -- The variable key.
+        """
+
+        return f"{VERSION_VARIABLE_PREFIX}{self.sheet_id}_{self.sheet_type.name}"
+
+    def _cache_format(self):
+        """Names the format of the download in the content cache.
+
+        Returns:
+            str -- The sheet type, with the paper size for PDF files or a digest of column type overrides
+                for PARQUET and FEATHER files.
+        """
+
+        if self.sheet_type is SmartsheetEnums.SheetType.PDF:
+            return f"{self.sheet_type.name}_{self.paper_size.name}"
+
+        # Columnar files of other column types are cached apart
+        if self.sheet_type in COLUMNAR_TYPES and self.column_types:
+            digest = hashlib.sha1(json.dumps(self.column_types, sort_keys=True).encode("utf-8")).hexdigest()
+            return f"{self.sheet_type.name}_{digest[:12]}"
+
+        return self.sheet_type.name
+
+    def _download(self, version=None):
+        """Downloads the sheet in the specified format to the output file path.
+        Downloads are served from and stored in the content cache if specified,
+        and deferred to the triggerer if the operator is deferrable.
+
+        Keyword Arguments:
+            version {int} -- The current sheet version, if already fetched. (default: {None})
 
         Raises:
             AirflowException: Raised when an unsupported sheet type is specified.
             AirflowException: Raised when the download returns an error.
-            AirflowException: Raised when unable to overwrite an existing same-name file.
         """
 
-        # Ensure paths
-        self._ensure_paths()
+        # Filtered contents are not cached
+        fmt = self._cache_format()
+        cache = self.cache if not self.filtered else None
+        if cache is not None:
+            if version is None:
+                version = self._get_version()
+            with self._stage("cache_read") as metrics:
+                if cache.fetch(self.sheet_id, version, fmt, self.file_path) and \
+                        (not self.with_json or cache.fetch(self.sheet_id, version, fmt + "_JSON", self.json_path)):
+                    metrics["bytes"] = os.path.getsize(self.file_path)
+                    return
+
+        if self.deferrable:
+            # execute_complete resumes with the downloaded file
+            self._defer_download(self.sheet_type.name, self.file_path, version)
+
+        with self._stage("download") as metrics:
+            if self.sheet_type in COLUMNAR_TYPES or self.filtered:
+                metrics["rows"] = self._write_rows()
+            else:
+                self._download_export()
+            metrics["bytes"] = os.path.getsize(self.file_path)
+
+        self._cache_download(version)
+
+    def _cache_download(self, version):
+        """Stores the download in the content cache if specified, unless the sheet changed meanwhile.
+
+        Arguments:
+            version {int} -- The sheet version when the download started.
+        """
+
+        # Filtered contents are not cached
+        if self.cache is None or self.filtered or self._get_version() != version:
+            return
+
+        fmt = self._cache_format()
+        self.cache.put(self.sheet_id, version, fmt, self.file_path)
+        if self.with_json:
+            self.cache.put(self.sheet_id, version, fmt + "_JSON", self.json_path)
+
+    def _defer_download(self, sheet_type, path, version=None):
+        """Frees the worker while the triggerer downloads the sheet; the task resumes in execute_complete.
 
-        # Initialize the hook
-        super().execute()
+        Arguments:
+            sheet_type {str} -- CSV, EXCEL or PDF to download an export, or JSON to download the sheet payload.
+            path {str} -- Path to the downloaded file.
+
+        Keyword Arguments:
+            version {int} -- The current sheet version, if already fetched. (default: {None})
+        """
+
+        from airflow_smartsheet.triggers.smartsheet_trigger import SmartsheetDownloadTrigger
+
+        logging.info(
+            f"Deferring download of sheet {self.sheet_id} to the triggerer.")
+        self.defer(
+            trigger=SmartsheetDownloadTrigger(
+                self.sheet_id,
+                path,
+                sheet_type,
+                paper_size=self.paper_size.name if self.paper_size is not None else None,
+                page_size=getattr(self, "page_size", None),
+                token_variable=self.token_variable,
+                api_base=self.smartsheet_hook.api_base),
+            method_name="execute_complete",
+            kwargs={"version": version})
+
+    def _complete_download(self, event):
+        """Records the download stage and API activity of the triggerer.
+
+        Arguments:
+            event {dict} -- The payload of the trigger event.
+
+        Raises:
+            AirflowException: Raised when the deferred download failed.
+        """
+
+        if event is None or event.get("status") != "success":
+            raise AirflowException(
+                f"Deferred download of sheet {self.sheet_id} was unsuccessful; "
+                f"message is {(event or {}).get('message')}.")
+
+        self.stages.record("download", event["seconds"], rows=event.get("rows"), bytes=event.get("bytes"))
+        self.deferred_api = event.get("api")
+        logging.info(
+            f"Triggerer downloaded {event.get('bytes')} bytes of sheet {self.sheet_id} to {event['path']} "
+            f"in {event['seconds']:.1f} seconds.")
+
+    def _resolve_columns(self):
+        """Resolves the filtered column titles to column IDs.
+
+        Raises:
+            AirflowException: Raised when the API returns an error.
+            AirflowException: Raised when a column title does not exist.
+
+        Returns:
+            list -- The IDs of the filtered columns.
+        """
+
+        import smartsheet
+
+        result = self.smartsheet.Sheets.get_columns(self.sheet_id, include_all=True)
+        if isinstance(result, smartsheet.models.Error):
+            raise AirflowException(
+                f"Listing columns of sheet {self.sheet_id} was unsuccessful; message is {result.result.message}.")
+
+        self.column_count = len(result.data)
+        column_ids = {column.title: column.id for column in result.data}
+        resolved = []
+        for column in self.columns:
+            if isinstance(column, int):
+                resolved.append(column)
+            elif column in column_ids:
+                resolved.append(column_ids[column])
+            else:
+                raise AirflowException(
+                    f"Sheet {self.sheet_id} has no column titled {column}.")
+
+        return resolved
+
+    def _row_filters(self):
+        """Builds the Sheets.get_sheet arguments of the column and row filters.
+
+        Returns:
+            dict -- The column_ids, row_ids and filter_id arguments that are specified.
+        """
+
+        filters = {}
+        if self.columns is not None:
+            if getattr(self, "column_ids", None) is None:
+                self.column_ids = self._resolve_columns()
+            filters["column_ids"] = self.column_ids
+        if self.row_ids is not None:
+            filters["row_ids"] = self.row_ids
+        if self.filter_id is not None:
+            filters["filter_id"] = self.filter_id
+
+        return filters
+
+    def _open_rows(self, **kwargs):
+        """Starts iterating over the filtered rows of the sheet or report one page at a time.
+        Keyword arguments are passed on to SmartsheetHook.iter_rows or SmartsheetHook.iter_report_rows.
+
+        Returns:
+            SheetRowIterator -- Iterable of SheetRow records with the sheet metadata and columns.
+        """
+
+        if self.report_id is not None:
+            return self.smartsheet_hook.iter_report_rows(self.report_id, **kwargs)
+
+        return self.smartsheet_hook.iter_rows(self.sheet_id, **{**self._row_filters(), **kwargs})
+
+    def _log_savings(self, rows):
+        """Logs the bytes received for filtered rows against an estimated full fetch.
+
+        Arguments:
+            rows {SheetRowIterator} -- The iterated rows.
+        """
+
+        if not self.filtered:
+            return
+
+        if self.report_id is not None:
+            logging.info(
+                f"Fetched {rows.bytes_fetched} bytes for {rows.rows_fetched} rows of report {self.report_id}.")
+            return
+
+        # Scale the received bytes up to every column and row of the sheet
+        column_ratio = 1.0
+        if self.columns is not None:
+            column_ratio = self.column_count / max(len(rows.columns), 1)
+        row_ratio = max(rows.sheet.total_row_count or 0, rows.rows_fetched) / max(rows.rows_fetched, 1)
+        full_bytes = int(rows.bytes_fetched * column_ratio * row_ratio)
+        logging.info(
+            f"Fetched {rows.bytes_fetched} bytes for {len(rows.columns)} columns and {rows.rows_fetched} rows "
+            f"of sheet {self.sheet_id}; a full fetch would be about {full_bytes} bytes, "
+            f"saving about {full_bytes - rows.bytes_fetched} bytes.")
+
+    def _write_rows(self):
+        """Writes the filtered sheet rows to a CSV or typed columnar file page by page.
+        The JSON dump holds the sheet payload if specified.
+
+        Returns:
+            int -- The number of rows written.
+        """
+
+        json_writer = JsonSheetWriter(self.json_path) if self.with_json else None
+        try:
+            rows = self._open_rows(
+                on_page=json_writer.write_page if json_writer is not None else None)
+            if self.sheet_type in COLUMNAR_TYPES:
+                written = write_columnar(
+                    rows, self.file_path, self.sheet_type, self.row_group_size, self.column_types)
+            else:
+                stream = CsvRowStream(
+                    (row.values for row in rows),
+                    header=[column.title for column in rows.columns])
+                with open(self.file_path, "w", newline="") as file:
+                    shutil.copyfileobj(stream, file)
+                written = stream.rows_read
+        finally:
+            if json_writer is not None:
+                json_writer.close()
+
+        logging.info(
+            f"Wrote {written} rows of sheet {self.sheet_id} to {self.file_path}.")
+        self._log_savings(rows)
+
+        return written
+
+    def _download_export(self):
+        """Downloads the sheet export of the specified format to the output file path.
+
+        Raises:
+            AirflowException: Raised when an unsupported sheet type is specified.
+            AirflowException: Raised when the download returns an error.
+        """
 
-        # Download the sheet
         if self.sheet_type is SmartsheetEnums.SheetType.CSV:
             downloaded_sheet = self.smartsheet.Sheets.get_sheet_as_csv(
                 self.sheet_id,
@@ -202,6 +653,74 @@ class SmartsheetToFileOperator(SmartsheetOperator):
             with open(self.json_path, "w") as json_file:
                 json_file.write(downloaded_sheet.to_json())
 
+    def execute(self, context=None):
+        """Fetches the specified sheet in the specified format.
+
+        Arguments:
+            context {[type]} -- [description]
+
+        Raises:
+            AirflowException: Raised when an unsupported sheet type is specified.
+            AirflowException: Raised when the download returns an error.
+            AirflowException: Raised when unable to overwrite an existing same-name file.
+
+        Returns:
+            str -- SKIPPED_UNCHANGED when the sheet was skipped, otherwise None.
+        """
+
+        with self._instrument(context):
+            # Ensure paths
+            self._ensure_paths()
+
+            # Initialize the hook
+            super().execute()
+
+            # Compare the sheet version against the version of the last download
+            version = None
+            if self.skip_unchanged:
+                with self._stage("check_version"):
+                    version = self._get_version()
+                    stored_version = Variable.get(self._version_key(), default_var=None)
+                if stored_version == str(version) and os.path.isfile(self.file_path):
+                    logging.info(
+                        f"Sheet {self.sheet_id} is unchanged at version {version}; skipping download.")
+                    return SKIPPED_UNCHANGED
+
+            self._download(version)
+
+            if self.skip_unchanged:
+                Variable.set(self._version_key(), str(version))
+
+    def execute_complete(self, context, event=None, version=None):
+        """Resumes a deferred run once the triggerer downloaded the sheet.
+
+        Arguments:
+            context {dict} -- The task context.
+
+        Keyword Arguments:
+            event {dict} -- The payload of the trigger event. (default: {None})
+            version {int} -- The sheet version when the download was deferred, if fetched. (default: {None})
+
+        Raises:
+            AirflowException: Raised when the deferred download failed.
+        """
+
+        with self._instrument(context):
+            self._set_paths()
+            SmartsheetOperator.execute(self)
+            self._complete_download(event)
+
+            # Save the download result if specified, as the SDK download does
+            if self.with_json:
+                with open(self.json_path, "w") as json_file:
+                    json.dump(event, json_file)
+
+            if version is not None:
+                self._cache_download(version)
+
+            if self.skip_unchanged:
+                Variable.set(self._version_key(), str(version))
+
 
 class SmartsheetToPostgresOperator(SmartsheetToFileOperator):
     """The Smartsheet operator to save a sheet to database.
@@ -211,6 +730,17 @@ class SmartsheetToPostgresOperator(SmartsheetToFileOperator):
             self,
             sheet_id,
             table_name,
+            fetch_mode="JSON",
+            with_row_id=False,
+            load_mode="TRUNCATE",
+            state_table=None,
+            page_size=None,
+            prefetch_pages=False,
+            typed_columns=False,
+            column_types=None,
+            create_table=False,
+            shadow_unlogged=False,
+            analyze=True,
             postgres_conn_id=None,
             postgres_database=None,
             postgres_schema=None,
@@ -221,9 +751,48 @@ class SmartsheetToPostgresOperator(SmartsheetToFileOperator):
         Arguments:
             sheet_id {int} -- Sheet ID to fetch.
             table_name {str} -- Name of the target table.
+
+        Keyword Arguments:
+            fetch_mode {str} -- Sheet fetch mode. JSON fetches the sheet once through the API;
+                CSV additionally downloads the CSV export. (default: {"JSON"})
+            with_row_id {bool} -- Whether to load Smartsheet row IDs into a RowId column. (default: {False})
+            load_mode {str} -- Table load mode. TRUNCATE reloads every row; INCREMENTAL upserts rows
+                modified since the last run by row ID and always loads the RowId column;
+                SHADOW reloads every row into a shadow table and swaps it in, refusing tables with
+                materialized views, views of views or owned sequences; DIFF compares a RowHash column
+                of every row and only applies inserted, updated and deleted rows. (default: {"TRUNCATE"})
+            state_table {str} -- Optional name of the sync state table in the target schema. (default: {None})
+            page_size {int} -- Optional number of rows fetched per API call. (default: {None})
+            prefetch_pages {bool} -- Whether to fetch the next page while the current one is loaded. (default: {False})
+            typed_columns {bool} -- Whether to load dates, times and checkboxes as native PostgreSQL values
+                instead of displayed text. (default: {False})
+            column_types {dict} -- Optional PostgreSQL types by column title, overriding the type mapping;
+                TEXT_NUMBER columns are text unless given a numeric type here. (default: {None})
+            create_table {bool} -- Whether to create the target table and add missing columns. (default: {False})
+            shadow_unlogged {bool} -- Whether the shadow table is loaded unlogged; it is made logged again before
+                the swap unless the target table is unlogged. (default: {False})
+            analyze {bool} -- Whether to analyze the shadow table before swapping it in. (default: {True})
+
+        Raises:
+            AirflowException: Raised when incremental or diff loading is combined with the CSV fetch mode.
+            AirflowException: Raised when columns, rows or reports are filtered with the CSV fetch mode.
+            AirflowException: Raised when a report is loaded incrementally or skipped when unchanged.
+            AirflowException: Raised when a deferrable operator loads incrementally or with the CSV fetch mode.
         """
 
         self.table_name = table_name
+        # Deferred loads only use the output directory to hand the sheet payload to the worker
+        self.keep_files = kwargs.get("output_dir") is not None and not kwargs.get("deferrable")
+        self.fetch_mode = SmartsheetEnums.FetchMode[fetch_mode]
+        self.load_mode = SmartsheetEnums.LoadMode[load_mode]
+        self.with_row_id = with_row_id
+        self.state_table = state_table
+        self.page_size = page_size
+        self.prefetch_pages = prefetch_pages
+        self.typed_columns = typed_columns
+        self.create_table = create_table
+        self.shadow_unlogged = shadow_unlogged
+        self.analyze = analyze
         self.postgres_conn_id = postgres_conn_id
         self.postgres_database = postgres_database
         self.postgres_schema = postgres_schema
@@ -237,70 +806,857 @@ class SmartsheetToPostgresOperator(SmartsheetToFileOperator):
         if postgres_schema is None:
             self.postgres_schema = DEFAULT_PG_SCHEMA
 
+        if state_table is None:
+            self.state_table = DEFAULT_STATE_TABLE
+
+        # Incremental and diff loads are keyed on row ID
+        if self.load_mode in (SmartsheetEnums.LoadMode.INCREMENTAL, SmartsheetEnums.LoadMode.DIFF):
+            if self.fetch_mode is SmartsheetEnums.FetchMode.CSV:
+                raise AirflowException(
+                    f"{self.load_mode.name.capitalize()} load mode needs the JSON fetch mode; CSV fetch mode is specified.")
+            self.with_row_id = True
+
         super().__init__(
             sheet_id,
             sheet_type="CSV",
+            column_types=column_types,
             *args, **kwargs
         )
 
+        if self.filtered and self.fetch_mode is SmartsheetEnums.FetchMode.CSV:
+            raise AirflowException(
+                "Filtered columns, rows or reports need the JSON fetch mode; CSV fetch mode is specified.")
+
+        # Reports have no version or modified rows filter
+        if self.report_id is not None and \
+                (self.load_mode is SmartsheetEnums.LoadMode.INCREMENTAL or self.skip_unchanged):
+            raise AirflowException(
+                "Reports cannot be loaded incrementally or skipped when unchanged.")
+
+        # The triggerer fetches the whole sheet payload; incremental loads only fetch modified rows
+        if self.deferrable and (self.fetch_mode is SmartsheetEnums.FetchMode.CSV or
+                                self.load_mode is SmartsheetEnums.LoadMode.INCREMENTAL):
+            raise AirflowException(
+                "Deferrable operators need the JSON fetch mode and cannot load incrementally.")
+
+    def _connect_postgres(self):
+        """Creates the PostgreSQL hook, loading it on first use rather than when DAG files import the operator.
+        """
+
+        from airflow.hooks.postgres_hook import PostgresHook
+
+        # Schema is actually database name.
+        self.postgres = PostgresHook(
+            postgres_conn_id=self.postgres_conn_id,
+            schema=self.postgres_database)
+
     def _purge_table(self):
         """Truncates a PostgreSQL table.
         """
 
-        self.postgres.run(
-            f"TRUNCATE TABLE {self.postgres_schema}.{self.table_name};")
+        with self._stage("truncate"):
+            self.postgres.run(
+                f"TRUNCATE TABLE {self.postgres_schema}.{self.table_name};")
 
-    def _copy_table(self):
+    def _copy_table(self, source, columns=None, table_name=None, conn=None):
         """Uses psycopg2 copy_expert to import CSV data to a PostgreSQL table.
+
+        Arguments:
+            source {file} -- File-like object serving CSV data with a header row.
+
+        Keyword Arguments:
+            columns {list} -- Optional target column names, in CSV order. (default: {None})
+            table_name {str} -- Optional table to import to instead of the target table. (default: {None})
+            conn {connection} -- Optional connection already held by the caller to import on;
+                a connection is taken from the hook if unspecified. (default: {None})
         """
 
+        if table_name is None:
+            table_name = self.table_name
+
+        if conn is None:
+            with closing(self.postgres.get_conn()) as conn:
+                self._copy_table(source, columns, table_name, conn)
+            return
+
         # copy_expert pipes CSV data to STDIN
-        self.postgres.copy_expert(
-            f"COPY {self.postgres_schema}.{self.table_name} FROM STDIN WITH (FORMAT csv, HEADER true);",
-            f"{self.output_dir}/{self.sheet_id}_enriched.csv")
-
-    def _enrich_csv(self):
-        """Enriches Smartsheet export CSV with Smartsheet API row numbers.
-        """
-
-        # Read original CSV rows and length
-        with open(f"{self.output_dir}/{self.sheet_id}.csv") as file:
-            csv_sheet = csv.reader(file)
-            tuple_sheet = [tuple(row) for row in csv_sheet]
-            # remove header row
-            first_row = tuple_sheet[0]
-            tuple_sheet.remove(first_row)
-            first_row = ("RowNumber",) + first_row
-            sheet_len = len(tuple_sheet)
-
-        # Get row numbers from query API
-        sheet = self.smartsheet.Sheets.get_sheet(
-            sheet_id=self.sheet_id,
-            page_size=sheet_len)
-        sheet_rows = sheet.to_dict()["rows"]
-        row_ids = [row["rowNumber"] for row in sheet_rows]
-
-        # Insert row ID in front of each row
-        for i in range(0, len(tuple_sheet)):
-            tuple_sheet[i] = (row_ids[i],) + tuple_sheet[i]
-
-        # Create new file for enriched CSV
-        with open(f"{self.output_dir}/{self.sheet_id}_enriched.csv", "w") as file:
-            enriched_csv = csv.writer(file, lineterminator="\n")
-            enriched_csv.writerow(first_row)
-            enriched_csv.writerows(tuple_sheet)
+        with closing(conn.cursor()) as cursor:
+            cursor.copy_expert(
+                _copy_sql(f"{self.postgres_schema}.{table_name}", columns),
+                source)
+        conn.commit()
+
+    def _load_rows(self, header, rows, columns=None, table_name=None, conn=None):
+        """Loads rows to the target table, streaming them straight into COPY.
+        The enriched CSV is only written to disk when an output directory is specified.
+
+        Arguments:
+            header {list} -- The CSV header row.
+            rows {iterable} -- The CSV data rows.
+
+        Keyword Arguments:
+            columns {list} -- Optional target column names, in CSV order. (default: {None})
+            table_name {str} -- Optional table to load to instead of the target table. (default: {None})
+            conn {connection} -- Optional connection already held by the caller to load on. (default: {None})
+        """
+
+        # Rows are fetched while they are copied, so these stages include paging through the API
+        stream = CsvRowStream(rows, header=header)
+        if not self.keep_files:
+            with self._stage("copy") as metrics:
+                self._copy_table(stream, columns, table_name, conn)
+                metrics.update(rows=stream.rows_read, bytes=stream.bytes_read)
+            return
+
+        enriched_path = os.path.join(
+            self.output_dir, str(self.sheet_id) + "_enriched.csv")
+        with self._stage("write_enriched") as metrics:
+            with open(enriched_path, "w", newline="") as file:
+                shutil.copyfileobj(stream, file)
+            metrics.update(rows=stream.rows_read, bytes=stream.bytes_read)
+        with self._stage("copy") as metrics:
+            with open(enriched_path, newline="") as file:
+                self._copy_table(file, columns, table_name, conn)
+            metrics.update(rows=stream.rows_read, bytes=stream.bytes_read)
+
+    def _load_shadow(self, header, rows, columns=None):
+        """Loads rows into a shadow table, builds its indexes, then swaps it in for the target table.
+        Readers of the target table are only blocked during the swap. Target tables with dependents
+        the swap cannot carry over are refused before loading, and the shadow table is dropped when the load fails.
+
+        Arguments:
+            header {list} -- The CSV header row.
+            rows {iterable} -- The CSV data rows.
+
+        Keyword Arguments:
+            columns {list} -- Optional target column names, in CSV order. (default: {None})
+        """
+
+        shadow = shadow_name(self.table_name)
+        with closing(self.postgres.get_conn()) as conn:
+            with self._stage("create_shadow"), closing(conn.cursor()) as cursor:
+                check_shadow(cursor, self.postgres_schema, self.table_name)
+                create_shadow(cursor, self.postgres_schema, self.table_name, self.shadow_unlogged)
+                conn.commit()
+
+            try:
+                # Copies on the held connection, so pooled hooks never wait on a second one
+                self._load_rows(header, rows, columns, shadow, conn)
+
+                with self._stage("index_shadow"), closing(conn.cursor()) as cursor:
+                    indexes = index_shadow(cursor, self.postgres_schema, self.table_name)
+                    if self.analyze:
+                        cursor.execute(f"ANALYZE {self.postgres_schema}.{shadow};")
+                    conn.commit()
+
+                with self._stage("swap_shadow"), closing(conn.cursor()) as cursor:
+                    swap_shadow(cursor, self.postgres_schema, self.table_name, indexes)
+                    conn.commit()
+            except Exception:
+                self._drop_shadow(conn)
+                raise
+
+    def _drop_shadow(self, conn):
+        """Drops the shadow table of a failed load, keeping the original error if dropping fails too.
+
+        Arguments:
+            conn {connection} -- The psycopg2 connection the shadow table was loaded on.
+        """
+
+        try:
+            conn.rollback()
+            with closing(conn.cursor()) as cursor:
+                cursor.execute(
+                    f"DROP TABLE IF EXISTS {self.postgres_schema}.{shadow_name(self.table_name)};")
+            conn.commit()
+        except Exception:
+            logging.exception(
+                f"Dropping the shadow table of {self.postgres_schema}.{self.table_name} failed.")
+
+    def _iter_rows(self, **kwargs):
+        """Iterates over the filtered rows of the sheet or report one page at a time.
+        Keyword arguments are passed on to SmartsheetHook.iter_rows or SmartsheetHook.iter_report_rows.
+
+        Returns:
+            SheetRowIterator -- Iterable of SheetRow records with the sheet metadata and columns.
+        """
+
+        return self._open_rows(
+            page_size=self.page_size,
+            prefetch=self.prefetch_pages,
+            **kwargs)
+
+    @contextmanager
+    def _fetch_rows(self):
+        """Fetches every row of the sheet, writing the JSON dump if specified.
+        Sheet payloads are served from and stored in the content cache if specified,
+        and fetched by the triggerer if the operator is deferrable.
+
+        Yields:
+            SheetRowIterator -- Iterable of SheetRow records with the sheet metadata and columns.
+        """
+
+        import smartsheet
+
+        # Payload fetched by the triggerer of a deferred run
+        if getattr(self, "deferred_event", None) is not None:
+            payload_path = self.deferred_event["path"]
+            try:
+                with self._stage("read_payload"), open(payload_path) as payload:
+                    sheet = smartsheet.models.Sheet(json.load(payload))
+                if self.with_json:
+                    shutil.copyfile(payload_path, self.json_path)
+                yield self._iter_rows(sheet=sheet)
+                if self.cache is not None:
+                    self.cache.put(self.sheet_id, sheet.version, "JSON", payload_path)
+            finally:
+                os.remove(payload_path)
+            return
+
+        if self.cache is not None and not self.filtered:
+            cached = self.cache.open(self.sheet_id, self._get_version(), "JSON", mode="r")
+            if cached is not None:
+                with self._stage("cache_read"), cached:
+                    sheet = smartsheet.models.Sheet(json.load(cached))
+                if self.with_json:
+                    with open(self.json_path, "w") as json_file:
+                        json.dump(sheet.to_dict(), json_file)
+                yield self._iter_rows(sheet=sheet)
+                return
+
+        if self.deferrable:
+            # execute_complete resumes with the payload
+            from airflow_smartsheet.triggers.smartsheet_trigger import JSON_PAYLOAD
+
+            self._defer_download(JSON_PAYLOAD, os.path.join(self.output_dir, f"{self.sheet_id}_payload.json"))
+
+        # The JSON dump doubles as the cached payload
+        json_path = None
+        if self.with_json:
+            json_path = self.json_path
+        elif self.cache is not None and not self.filtered:
+            fd, json_path = tempfile.mkstemp(dir=self.output_dir, suffix=".json")
+            os.close(fd)
+
+        json_writer = JsonSheetWriter(json_path) if json_path is not None else None
+        try:
+            with self._stage("fetch_first_page"):
+                rows = self._iter_rows(
+                    on_page=json_writer.write_page if json_writer is not None else None)
+            yield rows
+            if json_writer is not None:
+                json_writer.close()
+            if self.cache is not None and not self.filtered:
+                self.cache.put(self.sheet_id, rows.sheet.version, "JSON", json_path)
+            self._log_savings(rows)
+        finally:
+            if json_writer is not None:
+                json_writer.close()
+            if json_path is not None and not self.with_json:
+                os.remove(json_path)
+
+    def _column_type(self, column):
+        """Maps a sheet column to its PostgreSQL type in the target table.
+
+        Arguments:
+            column {Column} -- The Smartsheet column.
+
+        Returns:
+            str -- The PostgreSQL type; text unless columns are typed.
+        """
+
+        if not self.typed_columns:
+            return "text"
+
+        return postgres_type(column, self.column_types)
+
+    def _prepare_columns(self, rows):
+        """Prepares the target table and value types for the sheet columns.
+        Typed columns yield raw API values; the table is created or migrated if specified.
+
+        Arguments:
+            rows {SheetRowIterator} -- The sheet rows.
+        """
+
+        types = [(column, self._column_type(column)) for column in rows.columns]
+        rows.raw_column_ids = {rows.column_key(column) for column, pg_type in types if pg_type != "text"}
+
+        if not self.create_table:
+            return
+
+        definitions = [("RowNumber", ROW_NUMBER_TYPE)]
+        if self.with_row_id:
+            definitions.append(("RowId", ROW_ID_TYPE))
+        if self.load_mode is SmartsheetEnums.LoadMode.DIFF:
+            definitions.append(("RowHash", ROW_HASH_TYPE))
+        definitions.extend((column.title, pg_type) for column, pg_type in types)
+
+        target = f"{self.postgres_schema}.{self.table_name}"
+        statements = [
+            f"CREATE TABLE IF NOT EXISTS {target} ("
+            + ", ".join(f"{quote_ident(name)} {pg_type}" for name, pg_type in definitions)
+            + ");"]
+        statements.extend(
+            f"ALTER TABLE {target} ADD COLUMN IF NOT EXISTS {quote_ident(name)} {pg_type};"
+            for name, pg_type in definitions)
+
+        # Diff loads look up every row by row ID
+        if self.load_mode is SmartsheetEnums.LoadMode.DIFF:
+            statements.append(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS {quote_ident(self.table_name + '_rowid')} "
+                f"ON {target} (\"RowId\");")
+        with self._stage("prepare_table"):
+            self.postgres.run(statements)
+
+    def _iter_row_index(self, columns):
+        """Iterates over the IDs and numbers of every row, fetching as few cells as possible.
+
+        Arguments:
+            columns {list} -- The sheet columns, in order.
+
+        Returns:
+            SheetRowIterator -- Iterable of SheetRow records with at most one value.
+        """
+
+        return self._iter_rows(
+            column_ids=[columns[0].id],
+            exclude="nonexistentCells")
+
+    def _sheet_rows(self, rows):
+        """Builds CSV rows with row numbers and cell values from sheet rows.
+        Values of numeric columns that are not numbers are loaded as nulls.
+
+        Arguments:
+            rows {SheetRowIterator} -- The sheet rows.
+
+        Returns:
+            tuple -- The header row and a generator of data rows.
+        """
+
+        with_hash = self.load_mode is SmartsheetEnums.LoadMode.DIFF
+
+        header = ["RowNumber"]
+        if self.with_row_id:
+            header.append("RowId")
+        if with_hash:
+            header.append("RowHash")
+        header.extend(column.title for column in rows.columns)
+
+        numeric = [
+            (index, pg_type) for index, pg_type in enumerate(self._column_type(column) for column in rows.columns)
+            if pg_type in NUMERIC_TYPES]
+        invalid = 0
+
+        def values(row):
+            nonlocal invalid
+            if not numeric:
+                return row.values
+            converted = list(row.values)
+            for index, pg_type in numeric:
+                if converted[index] is None:
+                    continue
+                try:
+                    converted[index] = to_number(converted[index], pg_type)
+                except ValueError:
+                    converted[index] = None
+                    invalid += 1
+            return tuple(converted)
+
+        def records():
+            for row in rows:
+                if with_hash:
+                    yield (row.row_number, row.id, _row_hash(row)) + values(row)
+                elif self.with_row_id:
+                    yield (row.row_number, row.id) + values(row)
+                else:
+                    yield (row.row_number,) + values(row)
+            if invalid:
+                logging.warning(
+                    f"Loaded {invalid} values of numeric columns that are not numbers as nulls.")
+
+        return header, records()
+
+    def _iter_csv_row_index(self):
+        """Iterates over the IDs and numbers of every row for the CSV export, listing the columns first.
+
+        Raises:
+            AirflowException: Raised when the API returns an error.
+
+        Returns:
+            SheetRowIterator -- Iterable of SheetRow records with at most one value.
+        """
+
+        import smartsheet
+
+        result = self.smartsheet.Sheets.get_columns(self.sheet_id, include_all=True)
+        if isinstance(result, smartsheet.models.Error):
+            raise AirflowException(
+                f"Listing columns of sheet {self.sheet_id} was unsuccessful; message is {result.result.message}.")
+
+        return self._iter_row_index(sorted(result.data, key=lambda column: column.index))
+
+    def _enrich_csv(self, row_index, version=None):
+        """Enriches Smartsheet export CSV with Smartsheet API row numbers, and row IDs if specified.
+        Rows are streamed from the export as they are consumed, paired with the row index in order.
+
+        Arguments:
+            row_index {SheetRowIterator} -- The sheet rows providing row numbers and IDs.
+
+        Keyword Arguments:
+            version {int} -- The sheet version before the export was downloaded, if fetched. (default: {None})
+
+        Raises:
+            AirflowException: Raised when the sheet changed between the export and the row index.
+            AirflowException: Raised when the export and the row index have different numbers of rows.
+
+        Returns:
+            tuple -- The header row and a generator of data rows.
+        """
+
+        # Rows added or removed between the two fetches would be paired with the wrong keys
+        index_version = getattr(row_index.sheet, "version", None)
+        if version is not None and index_version != version:
+            row_index.close()
+            raise AirflowException(
+                f"Sheet {self.sheet_id} changed from version {version} to {index_version} "
+                "between the CSV export and the row index.")
+
+        # Get row numbers and IDs from query API
+        if self.with_row_id:
+            row_keys = ([row.row_number, row.id] for row in row_index)
+            key_header = ["RowNumber", "RowId"]
+        else:
+            row_keys = ([row.row_number] for row in row_index)
+            key_header = ["RowNumber"]
+
+        import csv
+
+        source = open(self.file_path, newline="")
+        csv_sheet = csv.reader(source)
+
+        # Header row gains a row number column
+        header = next(csv_sheet, None)
+        if header is None:
+            source.close()
+            return key_header, iter(())
+
+        def rows():
+            # Insert row number and ID in front of each row
+            with source:
+                for keys, row in itertools.zip_longest(row_keys, csv_sheet):
+                    if keys is None or row is None:
+                        raise AirflowException(
+                            f"CSV export and row index of sheet {self.sheet_id} have different numbers of rows.")
+                    yield keys + row
+
+        return key_header + header, rows()
+
+    def _ensure_state_table(self, cursor):
+        """Ensures the sync state table exists in the target schema.
+
+        Arguments:
+            cursor {cursor} -- The psycopg2 cursor to execute on.
+        """
+
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.postgres_schema}.{self.state_table} ("
+            "sheet_id bigint NOT NULL, "
+            "table_name text NOT NULL, "
+            "watermark timestamptz, "
+            "layout text, "
+            "version bigint, "
+            "PRIMARY KEY (sheet_id, table_name));")
+
+    def _get_state(self, cursor):
+        """Reads the stored sync state of the sheet and target table.
+
+        Arguments:
+            cursor {cursor} -- The psycopg2 cursor to execute on.
+
+        Returns:
+            tuple -- The stored watermark, column layout and version, or None if the sheet was never synced.
+        """
+
+        self._ensure_state_table(cursor)
+        cursor.execute(
+            f"SELECT watermark, layout, version FROM {self.postgres_schema}.{self.state_table} "
+            "WHERE sheet_id = %s AND table_name = %s;",
+            (self.sheet_id, self.table_name))
+        return cursor.fetchone()
+
+    def _set_state(self, cursor, sheet):
+        """Stores the sync state of the sheet and target table.
+
+        Arguments:
+            cursor {cursor} -- The psycopg2 cursor to execute on.
+            sheet {Sheet} -- The sheet covered by this sync.
+        """
+
+        self._ensure_state_table(cursor)
+        cursor.execute(
+            f"INSERT INTO {self.postgres_schema}.{self.state_table} (sheet_id, table_name, watermark, layout, version) "
+            "VALUES (%s, %s, %s, %s, %s) "
+            "ON CONFLICT (sheet_id, table_name) DO UPDATE "
+            "SET watermark = EXCLUDED.watermark, layout = EXCLUDED.layout, version = EXCLUDED.version;",
+            (self.sheet_id, self.table_name, sheet.modified_at, _column_layout(sheet), sheet.version))
+
+    def _load_state(self):
+        """Reads the stored sync state on a new connection.
+
+        Returns:
+            tuple -- The stored watermark, column layout and version, or None if the sheet was never synced.
+        """
+
+        with closing(self.postgres.get_conn()) as conn:
+            with closing(conn.cursor()) as cursor:
+                state = self._get_state(cursor)
+            conn.commit()
+
+        return state
+
+    def _save_state(self, sheet):
+        """Stores the sync state on a new connection when it is tracked.
+
+        Arguments:
+            sheet {Sheet} -- The sheet covered by this sync.
+        """
+
+        if self.load_mode is not SmartsheetEnums.LoadMode.INCREMENTAL and not self.skip_unchanged:
+            return
+
+        with self._stage("save_state"), closing(self.postgres.get_conn()) as conn:
+            with closing(conn.cursor()) as cursor:
+                self._set_state(cursor, sheet)
+            conn.commit()
+
+    def _sync_incremental(self, state):
+        """Upserts rows modified since the stored watermark and removes deleted rows.
+        Falls back to a full refresh when the sheet was never synced or its column layout changed.
+
+        Arguments:
+            state {tuple} -- The stored sync state, or None if the sheet was never synced.
+        """
+
+        target = f"{self.postgres_schema}.{self.table_name}"
+
+        if state is None or state[0] is None:
+            self._sync_full()
+            return
+
+        # Modification times have one second resolution, so rows modified just before the watermark
+        # are fetched again in case they were saved in its second; upserting them twice is harmless
+        watermark, layout, _ = state
+        with self._stage("fetch_first_page"):
+            modified_rows = self._iter_rows(
+                rows_modified_since=(watermark - timedelta(seconds=INCREMENTAL_OVERLAP)).isoformat())
+        sheet = modified_rows.sheet
+        if _column_layout(sheet) != layout:
+            logging.info(
+                f"Column layout of sheet {self.sheet_id} changed; falling back to a full refresh.")
+            modified_rows.close()
+            self._sync_full()
+            return
+
+        self._prepare_columns(modified_rows)
+        header, rows = self._sheet_rows(modified_rows)
+        with closing(self.postgres.get_conn()) as conn:
+            with closing(conn.cursor()) as cursor:
+                # Stage modified rows, then replace their current versions
+                with self._stage("stage_rows") as metrics:
+                    cursor.execute(
+                        f"CREATE TEMP TABLE smartsheet_stage (LIKE {target} INCLUDING DEFAULTS) ON COMMIT DROP;")
+                    stream = CsvRowStream(rows, header=header)
+                    cursor.copy_expert(_copy_sql("smartsheet_stage", header), stream)
+                    metrics.update(rows=stream.rows_read, bytes=stream.bytes_read)
+                with self._stage("apply_changes"):
+                    upserted = self._apply_staged_rows(cursor, header)
+
+                deleted = self._apply_row_index(cursor, modified_rows.columns)
+
+                self._set_state(cursor, sheet)
+            with self._stage("commit"):
+                conn.commit()
+
+        logging.info(
+            f"Incrementally synced sheet {self.sheet_id}; upserted {upserted} rows, deleted {deleted} rows.")
+
+    def _apply_staged_rows(self, cursor, header):
+        """Replaces the current versions of the rows in the smartsheet_stage table by row ID.
+
+        Arguments:
+            cursor {cursor} -- The psycopg2 cursor to execute on.
+            header {list} -- The staged columns.
+
+        Returns:
+            int -- Number of upserted rows.
+        """
+
+        target = f"{self.postgres_schema}.{self.table_name}"
+
+        cursor.execute(
+            f"DELETE FROM {target} t USING smartsheet_stage s WHERE t.\"RowId\" = s.\"RowId\";")
+        column_list = ", ".join(quote_ident(column) for column in header)
+        cursor.execute(
+            f"INSERT INTO {target} ({column_list}) SELECT {column_list} FROM smartsheet_stage;")
+
+        return cursor.rowcount
+
+    def _apply_row_index(self, cursor, columns):
+        """Removes rows deleted from the sheet and renumbers moved rows, fetching only the row index.
+
+        Arguments:
+            cursor {cursor} -- The psycopg2 cursor to execute on.
+            columns {list} -- The sheet columns, in order.
+
+        Returns:
+            int -- Number of deleted rows.
+        """
+
+        target = f"{self.postgres_schema}.{self.table_name}"
+
+        with self._stage("row_index") as metrics:
+            cursor.execute(
+                f"CREATE TEMP TABLE smartsheet_rows ON COMMIT DROP AS "
+                f"SELECT \"RowId\", \"RowNumber\" FROM {target} WITH NO DATA;")
+            row_index = self._iter_row_index(columns)
+            stream = CsvRowStream(
+                ([row.id, row.row_number] for row in row_index),
+                header=["RowId", "RowNumber"])
+            cursor.copy_expert(_copy_sql("smartsheet_rows", ["RowId", "RowNumber"]), stream)
+            metrics.update(rows=stream.rows_read, bytes=stream.bytes_read)
+        with self._stage("apply_deletes"):
+            cursor.execute(
+                f"DELETE FROM {target} t WHERE NOT EXISTS "
+                f"(SELECT 1 FROM smartsheet_rows r WHERE r.\"RowId\" = t.\"RowId\");")
+            deleted = cursor.rowcount
+            cursor.execute(
+                f"UPDATE {target} t SET \"RowNumber\" = r.\"RowNumber\" FROM smartsheet_rows r "
+                f"WHERE t.\"RowId\" = r.\"RowId\" AND t.\"RowNumber\" IS DISTINCT FROM r.\"RowNumber\";")
+
+        return deleted
+
+    def _sync_diff(self):
+        """Stages every row of the sheet and applies only inserted, updated, moved and deleted rows.
+        Rows are compared by row ID, row hash and row number in a single transaction.
+        Moved rows only changed their row number and are not counted as updated.
+
+        Returns:
+            dict -- Numbers of inserted, updated, moved, deleted and unchanged rows.
+        """
+
+        target = f"{self.postgres_schema}.{self.table_name}"
+
+        with self._fetch_rows() as rows:
+            self._prepare_columns(rows)
+            header, records = self._sheet_rows(rows)
+            with closing(self.postgres.get_conn()) as conn:
+                with closing(conn.cursor()) as cursor:
+                    # Rows are fetched while they are staged, so this stage includes paging through the API
+                    with self._stage("stage_rows") as metrics:
+                        cursor.execute(
+                            f"CREATE TEMP TABLE smartsheet_stage (LIKE {target} INCLUDING DEFAULTS) ON COMMIT DROP;")
+                        stream = CsvRowStream(records, header=header)
+                        cursor.copy_expert(_copy_sql("smartsheet_stage", header), stream)
+                        cursor.execute("ANALYZE smartsheet_stage;")
+                        metrics.update(rows=stream.rows_read, bytes=stream.bytes_read)
+
+                    with self._stage("apply_changes"):
+                        cursor.execute(
+                            f"DELETE FROM {target} t WHERE NOT EXISTS "
+                            f"(SELECT 1 FROM smartsheet_stage s WHERE s.\"RowId\" = t.\"RowId\");")
+                        deleted = cursor.rowcount
+
+                        assignments = ", ".join(
+                            f"{quote_ident(column)} = s.{quote_ident(column)}" for column in header if column != "RowId")
+                        cursor.execute(
+                            f"UPDATE {target} t SET {assignments} FROM smartsheet_stage s "
+                            f"WHERE t.\"RowId\" = s.\"RowId\" "
+                            f"AND t.\"RowHash\" IS DISTINCT FROM s.\"RowHash\";")
+                        updated = cursor.rowcount
+
+                        # Moved rows only need their row number updated
+                        cursor.execute(
+                            f"UPDATE {target} t SET \"RowNumber\" = s.\"RowNumber\" FROM smartsheet_stage s "
+                            f"WHERE t.\"RowId\" = s.\"RowId\" "
+                            f"AND t.\"RowNumber\" IS DISTINCT FROM s.\"RowNumber\";")
+                        moved = cursor.rowcount
+
+                        column_list = ", ".join(quote_ident(column) for column in header)
+                        cursor.execute(
+                            f"INSERT INTO {target} ({column_list}) SELECT {column_list} FROM smartsheet_stage s "
+                            f"WHERE NOT EXISTS (SELECT 1 FROM {target} t WHERE t.\"RowId\" = s.\"RowId\");")
+                        inserted = cursor.rowcount
+
+                    if self.skip_unchanged:
+                        self._set_state(cursor, rows.sheet)
+                with self._stage("commit"):
+                    conn.commit()
+
+        counts = {
+            "inserted": inserted,
+            "updated": updated,
+            "moved": moved,
+            "deleted": deleted,
+            "unchanged": stream.rows_read - inserted - updated - moved}
+        logging.info(
+            f"Diff synced sheet {self.sheet_id}; inserted {inserted} rows, updated {updated} rows, "
+            f"moved {moved} rows, deleted {deleted} rows, left {counts['unchanged']} rows unchanged.")
+
+        return counts
+
+    def _sync_full(self):
+        """Reloads every row of the sheet and stores the new sync state when it is tracked.
+        """
+
+        with self._fetch_rows() as rows:
+            self._prepare_columns(rows)
+            header, records = self._sheet_rows(rows)
+            if self.load_mode is SmartsheetEnums.LoadMode.SHADOW:
+                self._load_shadow(header, records, header)
+            else:
+                self._purge_table()
+                self._load_rows(header, records, header)
+
+        self._save_state(rows.sheet)
 
     def execute(self, context):
-        # Initialize PostgreSQL hook
-        # Schema is actually database name.
-        self.postgres = PostgresHook(
-            postgres_conn_id=self.postgres_conn_id,
-            schema=self.postgres_database)
+        """Loads the specified sheet to the target table.
+
+        Arguments:
+            context {dict} -- The task context.
+
+        Returns:
+            object -- SKIPPED_UNCHANGED when the sheet was skipped, row counts of diff loads, otherwise None.
+        """
+
+        with self._instrument(context):
+            self._connect_postgres()
+
+            # Initialize the Smartsheet hook
+            self._ensure_paths()
+            SmartsheetOperator.execute(self)
+
+            return self._sync()
+
+    def execute_complete(self, context, event=None, version=None):
+        """Resumes a deferred run once the triggerer fetched the sheet payload, and loads it.
+
+        Arguments:
+            context {dict} -- The task context.
+
+        Keyword Arguments:
+            event {dict} -- The payload of the trigger event. (default: {None})
+            version {int} -- Unused; the payload holds the sheet version. (default: {None})
+
+        Raises:
+            AirflowException: Raised when the deferred fetch failed.
+
+        Returns:
+            object -- SKIPPED_UNCHANGED when the sheet was skipped, row counts of diff loads, otherwise None.
+        """
+
+        with self._instrument(context):
+            self._connect_postgres()
+            self._set_paths()
+            SmartsheetOperator.execute(self)
+            self._complete_download(event)
+            self.deferred_event = event
+
+            return self._sync()
 
-        # Fetch Smartsheet as file
-        super().execute()
+    def _sync(self):
+        """Loads the sheet with the PostgreSQL and Smartsheet hooks already initialized.
+
+        Returns:
+            object -- SKIPPED_UNCHANGED when the sheet was skipped, row counts of diff loads, otherwise None.
+        """
+
+        # Compare the sheet version against the version of the last load
+        state, version = None, None
+        with self._stage("check_version"):
+            if self.load_mode is SmartsheetEnums.LoadMode.INCREMENTAL or self.skip_unchanged:
+                state = self._load_state()
+            if self.skip_unchanged and state is not None:
+                version = self._get_version()
+        if version is not None:
+            if state[2] == version:
+                logging.info(
+                    f"Sheet {self.sheet_id} is unchanged at version {version}; skipping load.")
+                return SKIPPED_UNCHANGED
+
+        if self.fetch_mode is SmartsheetEnums.FetchMode.CSV:
+            # Fetch Smartsheet as file, at a version the row index is checked against
+            if version is None:
+                with self._stage("check_version"):
+                    version = self._get_version()
+            self._download(version)
+
+            with self._stage("fetch_first_page"):
+                row_index = self._iter_csv_row_index()
+            header, rows = self._enrich_csv(row_index, version)
+            if self.load_mode is SmartsheetEnums.LoadMode.SHADOW:
+                self._load_shadow(header, rows)
+            else:
+                self._purge_table()
+                self._load_rows(header, rows)
+            self._save_state(row_index.sheet)
+
+            if not self.keep_files:
+                self._ensure_removed(self.file_path)
+        elif self.load_mode is SmartsheetEnums.LoadMode.INCREMENTAL:
+            # Fetch changed rows through the JSON API
+            self._sync_incremental(state)
+        elif self.load_mode is SmartsheetEnums.LoadMode.DIFF:
+            # Fetch the sheet once and apply changed rows only
+            return self._sync_diff()
+        else:
+            # Fetch the sheet once through the JSON API
+            self._sync_full()
+
+
+def _copy_sql(table, columns=None):
+    """Builds a COPY FROM STDIN statement for CSV data with a header row.
+
+    Arguments:
+        table {str} -- The target table.
+
+    Keyword Arguments:
+        columns {list} -- Optional target column names, in CSV order. (default: {None})
+
+    Returns:
+        str -- The COPY statement.
+    """
+
+    column_list = ""
+    if columns is not None:
+        column_list = " (" + ", ".join(quote_ident(column) for column in columns) + ")"
+
+    return f"COPY {table}{column_list} FROM STDIN WITH (FORMAT csv, HEADER true);"
+
+
+def _row_hash(row):
+    """Computes a stable content hash of a sheet row.
+
+    Arguments:
+        row {SheetRow} -- The sheet row.
+
+    Returns:
+        str -- A digest of the row ID and cell values.
+    """
+
+    content = [row.id, list(row.values)]
+    return hashlib.sha1(json.dumps(content, default=str).encode("utf-8")).hexdigest()
+
+
+def _column_layout(sheet):
+    """Computes a signature of the sheet's column layout.
+
+    Arguments:
+        sheet {Sheet} -- The sheet fetched through the Smartsheet API.
+
+    Returns:
+        str -- A digest of column IDs, titles and positions.
+    """
 
-        self._enrich_csv()
-        self._purge_table()
-        self._copy_table()
-        
+    layout = [[column.id, column.title, column.index] for column in sheet.columns]
+    return hashlib.sha1(json.dumps(layout).encode("utf-8")).hexdigest()
@@ -0,0 +1,121 @@
+# File-like adapters used to stream sheet data into PostgreSQL.
+
+import io
+import json
+
+
+class CsvRowStream:
+    """A read-only file-like object that serves rows as CSV text on demand.
+    Rows are only pulled from the source iterator when a reader asks for more data,
+    so psycopg2 copy_expert can consume a sheet without it ever touching disk.
+    """
+
+    def __init__(self, rows, header=None):
+        """Initializes a CSV row stream.
+
+        Arguments:
+            rows {iterable} -- Rows to be served, each an iterable of cell values.
+
+        Keyword Arguments:
+            header {list} -- Optional header row served before all other rows. (default: {None})
+        """
+
+        import csv
+
+        self.rows_read = 0
+        self.bytes_read = 0
+
+        self._rows = iter(rows)
+        self._exhausted = False
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+
+        if header is not None:
+            self._writer.writerow(header)
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        """Reads CSV text, encoding more rows as needed.
+
+        Keyword Arguments:
+            size {int} -- Maximum number of characters to read; negative reads everything. (default: {-1})
+
+        Returns:
+            str -- CSV text; empty when all rows have been served.
+        """
+
+        # Encode rows until the buffer can satisfy the request
+        while not self._exhausted and (size < 0 or self._buffer.tell() < size):
+            try:
+                row = next(self._rows)
+            except StopIteration:
+                self._exhausted = True
+                break
+            self._writer.writerow(row)
+            self.rows_read += 1
+
+        data = self._buffer.getvalue()
+        if size < 0 or size >= len(data):
+            chunk, rest = data, ""
+        else:
+            chunk, rest = data[:size], data[size:]
+
+        # Keep the unread remainder at the start of the buffer
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._buffer.write(rest)
+
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+class JsonSheetWriter:
+    """Writes a sheet JSON dump one page at a time.
+    Rows of every page are appended to the rows array of the first page's sheet.
+    """
+
+    def __init__(self, path):
+        """Initializes a sheet JSON writer.
+
+        Arguments:
+            path {str} -- Path to the JSON dump file.
+        """
+
+        self.path = path
+
+        self._file = None
+        self._first_row = True
+
+    def write_page(self, sheet):
+        """Appends the rows of a page, writing the sheet metadata with the first page.
+
+        Arguments:
+            sheet {Sheet} -- The sheet with the rows of the page.
+        """
+
+        data = sheet.to_dict()
+        rows = data.pop("rows", None) or []
+
+        if self._file is None:
+            self._file = open(self.path, "w")
+            prefix = json.dumps(data)[:-1]
+            self._file.write(prefix + (", " if data else "") + '"rows": [')
+
+        for row in rows:
+            if not self._first_row:
+                self._file.write(", ")
+            self._file.write(json.dumps(row))
+            self._first_row = False
+
+    def close(self):
+        """Closes the rows array and the file.
+        """
+
+        if self._file is None:
+            return
+
+        self._file.write("]}")
+        self._file.close()
+        self._file = None
@@ -0,0 +1,58 @@
+# Operators used to store the watermarks of Smartsheet change sensors once their changes are loaded.
+
+import logging
+
+from airflow.exceptions import AirflowException
+from airflow.models import BaseOperator
+from airflow.models import Variable
+
+
+class SmartsheetWatermarkOperator(BaseOperator):
+    """The Smartsheet operator to store the watermark reported by a change sensor.
+    """
+
+    def __init__(
+            self,
+            sensor_task_id,
+            *args, **kwargs):
+        """Initializes a Smartsheet Watermark operator.
+        This operator stores the watermark a SmartsheetChangeSensor pushed to XCom. Placed downstream
+        of the tasks loading the changed sheets, it only runs once they succeeded, so a failed load
+        is reported as changed again by the next poke.
+
+        Arguments:
+            sensor_task_id {str} -- Task ID of the change sensor.
+
+        Raises:
+            AirflowException: Raised when no sensor task ID is specified.
+        """
+
+        if not sensor_task_id:
+            raise AirflowException(
+                "Sensor task ID must be specified.")
+
+        self.sensor_task_id = sensor_task_id
+
+        super().__init__(*args, **kwargs)
+
+    def execute(self, context):
+        """Stores the watermark of the sensor run.
+
+        Arguments:
+            context {dict} -- The task context.
+
+        Returns:
+            bool -- Whether a watermark was stored.
+        """
+
+        watermark = context["ti"].xcom_pull(task_ids=self.sensor_task_id, key="watermark")
+        if watermark is None:
+            logging.info(
+                f"Task {self.sensor_task_id} reported no watermark; nothing to store.")
+            return False
+
+        Variable.set(watermark["key"], watermark["value"])
+        logging.info(
+            f"Stored the watermark of task {self.sensor_task_id} in {watermark['key']}.")
+
+        return True
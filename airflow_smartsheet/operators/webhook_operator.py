@@ -0,0 +1,212 @@
+# Operators used to sync the rows reported by Smartsheet webhooks.
+
+import logging
+import uuid
+
+from contextlib import closing
+
+from airflow.exceptions import AirflowException
+
+from airflow_smartsheet.operators.smartsheet_operator import SmartsheetToPostgresOperator, _column_layout, _copy_sql
+from airflow_smartsheet.operators.streams import CsvRowStream
+from airflow_smartsheet.webhooks.queue import claim_events, ensure_queue, release_events, remove_events, \
+    LAYOUT_OBJECT_TYPES, ROW_OBJECT_TYPES
+from airflow_smartsheet.consts import *
+
+
+class SmartsheetWebhookToPostgresOperator(SmartsheetToPostgresOperator):
+    """The Smartsheet operator to sync the sheet rows reported by webhook events to database.
+    """
+
+    def __init__(
+            self,
+            sheet_id,
+            table_name,
+            queue_table=None,
+            max_rows=None,
+            *args, **kwargs):
+        """Initializes a Smartsheet Webhook To Postgres operator.
+        This operator claims the webhook events queued for the sheet, fetches only the rows they report
+        by row ID and upserts them. The row index is only fetched when rows were deleted, moved or inserted
+        above the last row. The claim is committed before any rows are fetched, so the queue stays unlocked
+        while the sheet syncs; claimed events are removed in the transaction that applies their rows,
+        and returned to the queue when the sync fails.
+
+        Other keyword arguments are passed on to SmartsheetToPostgresOperator; rows are loaded incrementally.
+        The sheet is synced incrementally instead when it was never synced, its columns changed
+        or more rows changed than fetching by row ID is worth.
+
+        Arguments:
+            sheet_id {int} -- Sheet ID to fetch.
+            table_name {str} -- Name of the target table.
+
+        Keyword Arguments:
+            queue_table {str} -- Optional name of the queue table in the target schema. (default: {None})
+            max_rows {int} -- Optional number of changed rows above which the sheet is synced incrementally. (default: {None})
+
+        Raises:
+            AirflowException: Raised when rows are filtered by row IDs or a sheet filter.
+        """
+
+        self.queue_table = queue_table
+        self.max_rows = max_rows
+
+        if queue_table is None:
+            self.queue_table = DEFAULT_WEBHOOK_TABLE
+
+        if max_rows is None:
+            self.max_rows = WEBHOOK_MAX_ROWS
+
+        super().__init__(
+            sheet_id,
+            table_name,
+            load_mode="INCREMENTAL",
+            *args, **kwargs
+        )
+
+        if self.row_ids is not None or self.filter_id is not None:
+            raise AirflowException(
+                "Webhook syncs fetch the rows reported by events; row IDs and sheet filters cannot be specified.")
+
+    def _sync_rows(self, cursor, state, row_ids):
+        """Fetches rows by row ID in batches and applies them on the given transaction.
+
+        Arguments:
+            cursor {cursor} -- The psycopg2 cursor to execute on.
+            state {tuple} -- The stored sync state.
+            row_ids {list} -- IDs of the changed rows.
+
+        Returns:
+            dict -- Numbers of upserted and deleted rows and whether rows were renumbered,
+                or None if the column layout changed since the last sync.
+        """
+
+        target = f"{self.postgres_schema}.{self.table_name}"
+        batches = [row_ids[start:start + WEBHOOK_ROW_BATCH] for start in range(0, len(row_ids), WEBHOOK_ROW_BATCH)]
+
+        with self._stage("fetch_first_page"):
+            first = self._iter_rows(row_ids=batches[0])
+        if _column_layout(first.sheet) != state[1]:
+            first.close()
+            return None
+
+        # Runs before the target table is locked by this transaction
+        self._prepare_columns(first)
+
+        with self._stage("stage_rows") as metrics:
+            cursor.execute(
+                f"CREATE TEMP TABLE smartsheet_stage (LIKE {target} INCLUDING DEFAULTS) ON COMMIT DROP;")
+            staged, staged_bytes = 0, 0
+            for number, batch in enumerate(batches):
+                rows = first
+                if number > 0:
+                    rows = self._iter_rows(row_ids=batch)
+                    rows.raw_column_ids = first.raw_column_ids
+                header, records = self._sheet_rows(rows)
+                stream = CsvRowStream(records, header=header)
+                cursor.copy_expert(_copy_sql("smartsheet_stage", header), stream)
+                staged += stream.rows_read
+                staged_bytes += stream.bytes_read
+            metrics.update(rows=staged, bytes=staged_bytes)
+
+        with self._stage("apply_changes"):
+            # Rows missing from the sheet were deleted; moved rows and rows inserted above
+            # the last row change the numbers of rows without events
+            cursor.execute(
+                f"SELECT EXISTS (SELECT 1 FROM smartsheet_stage s LEFT JOIN {target} t ON t.\"RowId\" = s.\"RowId\" "
+                f"WHERE CASE WHEN t.\"RowId\" IS NULL "
+                f"THEN s.\"RowNumber\" <= (SELECT max(\"RowNumber\") FROM {target}) "
+                f"ELSE t.\"RowNumber\" IS DISTINCT FROM s.\"RowNumber\" END);")
+            renumber = staged < len(row_ids) or cursor.fetchone()[0]
+            upserted = self._apply_staged_rows(cursor, header)
+
+        deleted = 0
+        if renumber:
+            deleted = self._apply_row_index(cursor, first.columns)
+
+        self._set_state(cursor, first.sheet)
+
+        return {"upserted": upserted, "deleted": deleted, "renumbered": bool(renumber)}
+
+    def _release_events(self, conn, claim):
+        """Returns the claimed events of a failed sync to the queue, keeping the original error if that fails too.
+
+        Arguments:
+            conn {connection} -- The psycopg2 connection the events were claimed on.
+            claim {str} -- The claim of the sync.
+        """
+
+        try:
+            conn.rollback()
+            with closing(conn.cursor()) as cursor:
+                release_events(cursor, self.postgres_schema, self.queue_table, claim)
+            conn.commit()
+        except Exception:
+            logging.exception(
+                f"Releasing the webhook events of sheet {self.sheet_id} failed; "
+                f"they are claimed again after {WEBHOOK_CLAIM_TIMEOUT} seconds.")
+
+    def _sync(self):
+        """Claims the queued events of the sheet and syncs the rows they report.
+
+        Returns:
+            dict -- Numbers of claimed events and changed rows, and the upserted and deleted rows
+                of row-targeted syncs.
+        """
+
+        with self._stage("check_version"):
+            state = self._load_state()
+
+        claim = uuid.uuid4().hex
+        with closing(self.postgres.get_conn()) as conn:
+            with closing(conn.cursor()) as cursor:
+                with self._stage("claim_events") as metrics:
+                    ensure_queue(cursor, self.postgres_schema, self.queue_table)
+                    events = claim_events(cursor, self.postgres_schema, self.queue_table, self.sheet_id, claim)
+                    metrics.update(rows=len(events))
+                conn.commit()
+
+                row_ids = list(dict.fromkeys(
+                    row_id for row_id, object_type, _ in events
+                    if object_type in ROW_OBJECT_TYPES and row_id is not None))
+                counts = {"events": len(events), "rows": len(row_ids), "upserted": 0, "deleted": 0}
+                if not events:
+                    logging.info(
+                        f"No webhook events of sheet {self.sheet_id} are queued.")
+                    return counts
+
+                try:
+                    reason = None
+                    if state is None or state[0] is None:
+                        reason = "it was never synced"
+                    elif any(object_type in LAYOUT_OBJECT_TYPES for _, object_type, _ in events):
+                        reason = "its columns changed"
+                    elif len(row_ids) > self.max_rows:
+                        reason = f"{len(row_ids)} rows changed"
+                    elif row_ids:
+                        synced = self._sync_rows(cursor, state, row_ids)
+                        if synced is None:
+                            conn.rollback()
+                            reason = "its column layout changed"
+                        else:
+                            counts.update(synced)
+
+                    # The incremental sync commits on its own connection; claimed events are removed after it
+                    if reason is not None:
+                        logging.info(
+                            f"Syncing sheet {self.sheet_id} incrementally since {reason}.")
+                        self._sync_incremental(state)
+                        counts.update(upserted=None, deleted=None)
+
+                    with self._stage("commit"):
+                        remove_events(cursor, self.postgres_schema, self.queue_table, claim)
+                        conn.commit()
+                except Exception:
+                    self._release_events(conn, claim)
+                    raise
+
+        logging.info(
+            f"Synced {counts['rows']} rows of sheet {self.sheet_id} reported by {counts['events']} webhook events; "
+            f"upserted {counts['upserted']} rows, deleted {counts['deleted']} rows.")
+
+        return counts
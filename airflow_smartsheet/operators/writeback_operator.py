@@ -0,0 +1,425 @@
+# Operators used to write PostgreSQL query results back to Smartsheet sheets.
+
+import datetime
+import decimal
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+from airflow.exceptions import AirflowException
+
+from airflow_smartsheet.operators.columns import SYSTEM_COLUMN_TYPES
+from airflow_smartsheet.operators.smartsheet_operator import SmartsheetOperator
+from airflow_smartsheet.consts import *
+
+
+class PostgresToSmartsheetOperator(SmartsheetOperator):
+    """The Smartsheet operator to write a PostgreSQL query result to a sheet.
+    """
+
+    def __init__(
+            self,
+            sheet_id,
+            sql,
+            key_column,
+            parameters=None,
+            columns=None,
+            delete_missing=False,
+            batch_size=None,
+            max_workers=None,
+            fetch_size=None,
+            postgres_conn_id=None,
+            postgres_database=None,
+            *args, **kwargs):
+        """Initializes a Postgres To Smartsheet operator.
+        This operator streams a query result, compares it with the sheet rows by a key column
+        and only sends added, changed and deleted rows, in bulk requests. The query result is read twice:
+        its keys are checked before anything is written, then its rows are compared and sent.
+        Writes are not atomic; when a request fails, the requests sent before it stay applied.
+        Naive timestamps are written as UTC.
+
+        Arguments:
+            sheet_id {int} -- Sheet ID to write to.
+            sql {str} -- The query whose rows are written.
+            key_column {str} -- Query column identifying rows; its sheet column must hold unique values.
+
+        Keyword Arguments:
+            parameters {object} -- Optional query parameters. (default: {None})
+            columns {dict} -- Optional sheet column titles by query column; query columns are written
+                to sheet columns of the same title if unspecified. (default: {None})
+            delete_missing {bool} -- Whether to delete sheet rows whose key is missing from the query result. (default: {False})
+            batch_size {int} -- Optional maximum number of rows per add or update request. (default: {None})
+            max_workers {int} -- Optional maximum number of concurrent write requests. (default: {None})
+            fetch_size {int} -- Optional number of query rows fetched from the server-side cursor at a time. (default: {None})
+            postgres_conn_id {str} -- Optional PG connection ID. (default: {None})
+            postgres_database {str} -- Optional PG database. (default: {None})
+        """
+
+        self.sheet_id = sheet_id
+        self.sql = sql
+        self.key_column = key_column
+        self.parameters = parameters
+        self.columns = columns
+        self.delete_missing = delete_missing
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.fetch_size = fetch_size
+        self.postgres_conn_id = postgres_conn_id
+        self.postgres_database = postgres_database
+
+        if columns is None:
+            self.columns = {}
+
+        if batch_size is None or batch_size > MAX_WRITE_ROWS:
+            self.batch_size = MAX_WRITE_ROWS
+
+        if max_workers is None:
+            self.max_workers = DEFAULT_WRITEBACK_WORKERS
+
+        if fetch_size is None:
+            self.fetch_size = DEFAULT_FETCH_SIZE
+
+        if postgres_conn_id is None:
+            self.postgres_conn_id = DEFAULT_PG_CONN
+
+        if postgres_database is None:
+            self.postgres_database = DEFAULT_PG_DB
+
+        super().__init__(*args, **kwargs)
+
+    def _map_columns(self, names):
+        """Maps the query columns to writable sheet columns.
+
+        Arguments:
+            names {list} -- The query column names.
+
+        Raises:
+            AirflowException: Raised when the API returns an error.
+            AirflowException: Raised when the key column is missing from the query result.
+            AirflowException: Raised when a sheet column does not exist or is computed by Smartsheet.
+
+        Returns:
+            list -- (query column position, sheet column) of every query column.
+        """
+
+        import smartsheet
+
+        if self.key_column not in names:
+            raise AirflowException(
+                f"Query result has no key column {self.key_column}.")
+
+        result = self.smartsheet.Sheets.get_columns(self.sheet_id, include_all=True)
+        if isinstance(result, smartsheet.models.Error):
+            raise AirflowException(
+                f"Listing columns of sheet {self.sheet_id} was unsuccessful; message is {result.result.message}.")
+
+        sheet_columns = {column.title: column for column in result.data}
+        pairs = []
+        for position, name in enumerate(names):
+            title = self.columns.get(name, name)
+            column = sheet_columns.get(title)
+            if column is None:
+                raise AirflowException(
+                    f"Sheet {self.sheet_id} has no column titled {title}.")
+            if column.formula or str(column.system_column_type) in SYSTEM_COLUMN_TYPES:
+                raise AirflowException(
+                    f"Column {title} of sheet {self.sheet_id} is computed and cannot be written.")
+            pairs.append((position, column))
+
+        return pairs
+
+    def _index_rows(self, pairs, key_position):
+        """Indexes the current sheet rows by key, fetching only the written columns.
+
+        Arguments:
+            pairs {list} -- (query column position, sheet column) of every query column.
+            key_position {int} -- Query column position of the key.
+
+        Returns:
+            tuple -- Row ID and comparable values by key, and the sheet value position of every query column.
+        """
+
+        rows = self.smartsheet_hook.iter_rows(
+            self.sheet_id,
+            display_values=False,
+            column_ids=[column.id for _, column in pairs])
+        positions = {rows.column_key(column): index for index, column in enumerate(rows.columns)}
+        value_positions = [positions[column.id] for _, column in pairs]
+        key_value = value_positions[key_position]
+
+        index, duplicates = {}, 0
+        for row in rows:
+            key = _comparable(row.values[key_value])
+            if key is None:
+                continue
+            if key in index:
+                duplicates += 1
+                continue
+            index[key] = (row.id, [_comparable(value) for value in row.values])
+
+        if duplicates:
+            logging.warning(
+                f"Sheet {self.sheet_id} has {duplicates} rows with duplicate keys; only the first of each is written.")
+
+        return index, value_positions
+
+    def _send(self, kind, batch):
+        """Sends one bulk write request.
+
+        Arguments:
+            kind {str} -- add, update or delete.
+            batch {list} -- Rows to add or update, or row IDs to delete.
+
+        Raises:
+            AirflowException: Raised when the API returns an error.
+
+        Returns:
+            int -- The number of rows written.
+        """
+
+        import smartsheet
+
+        with self._stage(f"{kind}_rows") as metrics:
+            if kind == "add":
+                result = self.smartsheet.Sheets.add_rows(self.sheet_id, batch)
+            elif kind == "update":
+                result = self.smartsheet.Sheets.update_rows(self.sheet_id, batch)
+            else:
+                result = self.smartsheet.Sheets.delete_rows(self.sheet_id, batch, ignore_rows_not_found=True)
+            metrics["rows"] = len(batch)
+
+        if isinstance(result, smartsheet.models.Error):
+            raise AirflowException(
+                f"Bulk {kind} of {len(batch)} rows in sheet {self.sheet_id} was unsuccessful; "
+                f"message is {result.result.message}.")
+
+        return len(batch)
+
+    def execute(self, context=None):
+        """Writes the query result to the sheet.
+
+        Arguments:
+            context {dict} -- The task context.
+
+        Raises:
+            AirflowException: Raised when the key column is missing, empty or duplicated in the query result.
+            AirflowException: Raised when any write request failed.
+
+        Returns:
+            dict -- Counts of inserted, updated, deleted and unchanged rows.
+        """
+
+        from airflow.hooks.postgres_hook import PostgresHook
+
+        with self._instrument(context):
+            super().execute()
+
+            # Schema is actually database name.
+            self.postgres = PostgresHook(
+                postgres_conn_id=self.postgres_conn_id,
+                schema=self.postgres_database)
+
+            counts = dict.fromkeys(("inserted", "updated", "deleted", "unchanged"), 0)
+            errors = []
+            lock = threading.Lock()
+            # Batches waiting for a worker are bounded, so the query result is never held in memory
+            slots = threading.BoundedSemaphore(self.max_workers * 2)
+
+            def done(kind, future):
+                slots.release()
+                try:
+                    written = future.result()
+                except Exception as ex:
+                    logging.exception(f"Bulk {kind} failed.")
+                    with lock:
+                        errors.append(str(ex))
+                else:
+                    with lock:
+                        counts[_COUNTS[kind]] += written
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                def submit(kind, batch):
+                    slots.acquire()
+                    future = executor.submit(self._send, kind, batch)
+                    future.add_done_callback(lambda future: done(kind, future))
+
+                with closing(self.postgres.get_conn()) as conn:
+                    # A named cursor streams the result from the server; scrolling back reads it again
+                    with closing(conn.cursor(name=f"smartsheet_{self.sheet_id}", scrollable=True)) as cursor:
+                        cursor.itersize = self.fetch_size
+                        with self._stage("query") as metrics:
+                            cursor.execute(self.sql, self.parameters)
+                            records = cursor.fetchmany(self.fetch_size)
+                            metrics["rows"] = len(records)
+                        names = [description[0] for description in cursor.description]
+
+                        with self._stage("list_columns"):
+                            pairs = self._map_columns(names)
+                        key_position = names.index(self.key_column)
+
+                        # Bad keys fail the task before the first write
+                        with self._stage("check_keys") as metrics:
+                            seen = set()
+                            while records:
+                                for record in records:
+                                    key = _comparable(_cell_value(record[key_position]))
+                                    if key is None:
+                                        raise AirflowException(
+                                            f"Query result has a row without a {self.key_column} key.")
+                                    if key in seen:
+                                        raise AirflowException(
+                                            f"Key {key} appears more than once in the query result.")
+                                    seen.add(key)
+                                records = cursor.fetchmany(self.fetch_size)
+                            metrics["rows"] = len(seen)
+                            cursor.scroll(0, mode="absolute")
+
+                        with self._stage("fetch_sheet") as metrics:
+                            index, value_positions = self._index_rows(pairs, key_position)
+                            metrics["rows"] = len(index)
+
+                        with self._stage("query") as metrics:
+                            records = cursor.fetchmany(self.fetch_size)
+                            metrics["rows"] = len(records)
+                        adds, updates = [], []
+                        while records:
+                            for record in records:
+                                key = _comparable(_cell_value(record[key_position]))
+
+                                existing = index.get(key)
+                                if existing is None:
+                                    adds.append(_row(cells=[
+                                        (column.id, _cell_value(record[position]))
+                                        for position, column in pairs
+                                        if record[position] is not None]))
+                                else:
+                                    row_id, values = existing
+                                    cells = [
+                                        (column.id, _cell_value(record[position]))
+                                        for (position, column), value_position in zip(pairs, value_positions)
+                                        if _comparable(_cell_value(record[position])) != values[value_position]]
+                                    if cells:
+                                        updates.append(_row(row_id=row_id, cells=cells))
+                                    else:
+                                        counts["unchanged"] += 1
+
+                                if len(adds) >= self.batch_size:
+                                    submit("add", adds)
+                                    adds = []
+                                if len(updates) >= self.batch_size:
+                                    submit("update", updates)
+                                    updates = []
+
+                            with self._stage("query") as metrics:
+                                records = cursor.fetchmany(self.fetch_size)
+                                metrics["rows"] = len(records)
+
+                if adds:
+                    submit("add", adds)
+                if updates:
+                    submit("update", updates)
+
+                if self.delete_missing:
+                    missing = [row_id for key, (row_id, _) in index.items() if key not in seen]
+                    for start in range(0, len(missing), MAX_DELETE_ROWS):
+                        submit("delete", missing[start:start + MAX_DELETE_ROWS])
+
+            logging.info(
+                f"Wrote query result to sheet {self.sheet_id}: {counts}; {len(errors)} requests failed.")
+
+            if errors:
+                raise AirflowException(
+                    f"Writing to sheet {self.sheet_id} had {len(errors)} failed requests: {errors}.")
+
+            return counts
+
+
+# Result counts of every kind of write request
+_COUNTS = {"add": "inserted", "update": "updated", "delete": "deleted"}
+
+
+def _row(row_id=None, cells=None):
+    """Builds a row to add or update.
+
+    Keyword Arguments:
+        row_id {int} -- The ID of the updated row; added rows go to the bottom of the sheet. (default: {None})
+        cells {list} -- (column ID, value) of every written cell. (default: {None})
+
+    Returns:
+        Row -- The row.
+    """
+
+    import smartsheet
+
+    row = smartsheet.models.Row()
+    if row_id is None:
+        row.to_bottom = True
+    else:
+        row.id = row_id
+    for column_id, value in cells or []:
+        # Empty strings clear cells
+        row.cells.append(smartsheet.models.Cell({
+            "columnId": column_id,
+            "value": "" if value is None else value}))
+
+    return row
+
+
+def _cell_value(value):
+    """Converts a query value to a value Smartsheet accepts.
+
+    Arguments:
+        value {object} -- The query value.
+
+    Returns:
+        object -- A string, number, boolean or None; decimals a float cannot hold exactly are sent as text.
+    """
+
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, decimal.Decimal):
+        if value == value.to_integral_value():
+            return int(value)
+        number = float(value)
+        return number if decimal.Decimal(str(number)) == value else str(value)
+    if isinstance(value, datetime.datetime):
+        # Naive timestamps are taken as UTC, like the timestamps Smartsheet stores
+        if value.tzinfo is not None:
+            value = value.astimezone(datetime.timezone.utc)
+        return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return str(value)
+
+
+def _comparable(value):
+    """Normalizes a cell value for comparison, so that equal values compare equal whatever their source.
+    Numbers compare as their exact decimal text, since text number columns may hold either,
+    and timestamps compare as UTC seconds.
+
+    Arguments:
+        value {object} -- A sheet value or converted query value.
+
+    Returns:
+        object -- The normalized value; empty values are None.
+    """
+
+    if value == "":
+        return None
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float, decimal.Decimal)):
+        # Floats go through their shortest text, so 0.1 compares equal to Decimal("0.1") but not to 0.1000000000000000001
+        number = value if isinstance(value, decimal.Decimal) else decimal.Decimal(str(value))
+        return format(number.normalize(), "f")
+    if isinstance(value, str) and len(value) >= 19 and value[10] == "T":
+        try:
+            timestamp = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return value
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(datetime.timezone.utc)
+        return timestamp.strftime("%Y-%m-%dT%H:%M:%SZ")
+    return value
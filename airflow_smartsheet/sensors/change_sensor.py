@@ -0,0 +1,214 @@
+# Sensors used to wait for changes across many Smartsheet sheets.
+
+import json
+import logging
+
+from datetime import datetime, timedelta
+
+from airflow.exceptions import AirflowException
+from airflow.models import Variable
+from airflow.models.xcom import XCOM_RETURN_KEY
+
+try:
+    from airflow.sensors.base import BaseSensorOperator
+except ImportError:
+    # Airflow before 2.0
+    from airflow.sensors.base_sensor_operator import BaseSensorOperator
+
+from airflow_smartsheet.hooks.smartsheet_hook import SmartsheetHook
+from airflow_smartsheet.operators.bulk_operator import _table_name, _walk_sheets
+from airflow_smartsheet.consts import *
+
+
+class SmartsheetChangeSensor(BaseSensorOperator):
+    """The Smartsheet sensor to wait until any of a set of sheets changed.
+    """
+
+    def __init__(
+            self,
+            sheet_ids=None,
+            workspace_id=None,
+            folder_id=None,
+            watermark_key=None,
+            token=None,
+            *args, **kwargs):
+        """Initializes a Smartsheet Change sensor.
+        Every poke lists the versions of all accessible sheets in one API call, plus one call per
+        workspace and per folder nested in it, and compares the watched sheets against the watermark of the last change.
+        Pokes keep no state of their own, so the sensor can run in reschedule mode.
+
+        The changed sheet IDs are pushed to XCom as the return value, and {sheet_id, table_name} dicts
+        of the changed sheets under the sheets key. Watched sheets without a watermark count as changed.
+        The new watermark is pushed under the watermark key and only stored by a SmartsheetWatermarkOperator
+        downstream of the loads, so changes are reported again until the loads succeed.
+
+        Keyword Arguments:
+            sheet_ids {list} -- Optional IDs of the watched sheets. (default: {None})
+            workspace_id {int} -- Optional workspace whose sheets are watched. (default: {None})
+            folder_id {int} -- Optional folder whose sheets are watched. (default: {None})
+            watermark_key {str} -- Optional Airflow variable storing the watermark;
+                named after the DAG and task if unspecified. (default: {None})
+            token {str} -- Optional token that overrrides the token stored in Airflow variables. (default: {None})
+
+        Raises:
+            AirflowException: Raised when no sheets, workspace or folder is specified.
+        """
+
+        if sheet_ids is None and workspace_id is None and folder_id is None:
+            raise AirflowException(
+                "Either sheet IDs or workspace ID or folder ID must be specified.")
+
+        self.sheet_ids = sheet_ids
+        self.workspace_id = workspace_id
+        self.folder_id = folder_id
+        self.watermark_key = watermark_key
+        self.token = token
+
+        if sheet_ids is None:
+            self.sheet_ids = []
+
+        super().__init__(*args, **kwargs)
+
+    def _watched_sheets(self, client):
+        """Collects the watched sheets from the sheet IDs, workspace and folder.
+
+        Arguments:
+            client {Smartsheet} -- The Smartsheet API session.
+
+        Raises:
+            AirflowException: Raised when listing a workspace or folder returns an error.
+
+        Returns:
+            dict -- Sheet names by sheet ID; names of listed sheet IDs are None.
+        """
+
+        watched = dict.fromkeys(self.sheet_ids)
+
+        containers = []
+        if self.workspace_id is not None:
+            containers.append(client.Workspaces.get_workspace(self.workspace_id))
+        if self.folder_id is not None:
+            containers.append(client.Folders.get_folder(self.folder_id))
+
+        for container in containers:
+            watched.update((sheet.id, sheet.name) for sheet in _walk_sheets(container, client))
+
+        return watched
+
+    def _list_versions(self, client, modified_since=None):
+        """Lists the version and modification time of every accessible sheet in one API call.
+
+        Arguments:
+            client {Smartsheet} -- The Smartsheet API session.
+
+        Keyword Arguments:
+            modified_since {datetime} -- Optional time before which unmodified sheets are left out. (default: {None})
+
+        Raises:
+            AirflowException: Raised when the API returns an error.
+
+        Returns:
+            dict -- Sheets by sheet ID.
+        """
+
+        import smartsheet
+
+        result = client.Sheets.list_sheets(
+            include="sheetVersion",
+            include_all=True,
+            modified_since=modified_since)
+        if isinstance(result, smartsheet.models.Error):
+            raise AirflowException(
+                f"Listing sheets was unsuccessful; message is {result.result.message}.")
+
+        return {sheet.id: sheet for sheet in result.data}
+
+    def _get_watermark_key(self):
+        """Names the Airflow variable storing the watermark.
+
+        Returns:
+            str -- The variable key.
+        """
+
+        if self.watermark_key is not None:
+            return self.watermark_key
+
+        return f"{WATERMARK_VARIABLE_PREFIX}{self.dag_id}_{self.task_id}"
+
+    def poke(self, context):
+        """Checks the watched sheets for changes since the watermark.
+
+        Arguments:
+            context {dict} -- The task context.
+
+        Returns:
+            bool -- Whether any watched sheet changed.
+        """
+
+        client = SmartsheetHook(self.token).get_conn()
+        watched = self._watched_sheets(client)
+
+        watermark = json.loads(Variable.get(self._get_watermark_key(), default_var="null") or "null")
+        if watermark is None:
+            watermark = {"modified_at": None, "versions": {}}
+        versions = watermark["versions"]
+
+        # Sheets modified before the watermark are unchanged and left out of the listing;
+        # the overlap covers sheets modified while the last listing ran
+        modified_since = None
+        if watermark["modified_at"] is not None:
+            modified_since = datetime.fromisoformat(watermark["modified_at"]) - timedelta(seconds=WATERMARK_OVERLAP)
+        listed = self._list_versions(client, modified_since)
+
+        changed = []
+        for sheet_id, name in watched.items():
+            sheet = listed.get(sheet_id)
+            key = str(sheet_id)
+            if key in versions and (sheet is None or _version(sheet) == versions[key]):
+                continue
+
+            if sheet is None and modified_since is None:
+                logging.warning(
+                    f"Sheet {sheet_id} is not accessible with the token; reporting it as changed once.")
+            changed.append(sheet_id)
+            versions[key] = _version(sheet) if sheet is not None else None
+            if name is None and sheet is not None:
+                watched[sheet_id] = sheet.name
+
+        if not changed:
+            logging.info(
+                f"None of {len(watched)} sheets changed since {watermark['modified_at']}.")
+            return False
+
+        modified = [
+            sheet.modified_at for sheet_id, sheet in listed.items()
+            if sheet_id in watched and sheet.modified_at is not None]
+        if modified and (modified_since is None or max(modified) > datetime.fromisoformat(watermark["modified_at"])):
+            watermark["modified_at"] = max(modified).isoformat()
+
+        logging.info(
+            f"{len(changed)} of {len(watched)} sheets changed: {changed}.")
+        ti = context["ti"]
+        ti.xcom_push(key="watermark", value={"key": self._get_watermark_key(), "value": json.dumps(watermark)})
+        ti.xcom_push(key="sheets", value=[
+            {"sheet_id": sheet_id, "table_name": _table_name(watched[sheet_id] or str(sheet_id))}
+            for sheet_id in changed])
+        ti.xcom_push(key=XCOM_RETURN_KEY, value=changed)
+
+        return True
+
+
+def _version(sheet):
+    """Gets the marker telling sheet versions apart.
+
+    Arguments:
+        sheet {Sheet} -- The listed sheet.
+
+    Returns:
+        object -- The sheet version, or the modification time if the listing has no versions.
+    """
+
+    if sheet.version is not None:
+        return sheet.version
+
+    return sheet.modified_at.isoformat() if sheet.modified_at is not None else None
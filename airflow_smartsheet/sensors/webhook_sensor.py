@@ -0,0 +1,128 @@
+# Sensors used to wait for debounced bursts of Smartsheet webhook events.
+
+import logging
+
+from contextlib import closing
+
+from airflow.exceptions import AirflowException
+from airflow.models.xcom import XCOM_RETURN_KEY
+
+try:
+    from airflow.sensors.base import BaseSensorOperator
+except ImportError:
+    # Airflow before 2.0
+    from airflow.sensors.base_sensor_operator import BaseSensorOperator
+
+from airflow_smartsheet.webhooks.queue import ensure_queue, ready_sheets
+from airflow_smartsheet.consts import *
+
+
+class SmartsheetWebhookSensor(BaseSensorOperator):
+    """The Smartsheet sensor to wait until webhook events of any of a set of sheets are ready to sync.
+    """
+
+    def __init__(
+            self,
+            sheets,
+            debounce=None,
+            max_delay=None,
+            queue_table=None,
+            postgres_conn_id=None,
+            postgres_database=None,
+            postgres_schema=None,
+            *args, **kwargs):
+        """Initializes a Smartsheet Webhook sensor.
+        Every poke runs one query against the queue table filled by the webhook receiver; the Smartsheet API
+        is not called. Events of a sheet are ready once no event arrived for the debounce period,
+        so a burst of edits is synced once, or once the first event waited the maximum delay.
+
+        The ready sheet IDs are pushed to XCom as the return value, and {sheet_id, table_name} dicts
+        of the ready sheets under the sheets key.
+
+        Arguments:
+            sheets {list} -- (sheet ID, table name) pairs to watch.
+
+        Keyword Arguments:
+            debounce {float} -- Optional seconds without new events after which a sheet is ready. (default: {None})
+            max_delay {float} -- Optional seconds after which a sheet with queued events is always ready. (default: {None})
+            queue_table {str} -- Optional name of the queue table. (default: {None})
+            postgres_conn_id {str} -- Optional PG connection ID. (default: {None})
+            postgres_database {str} -- Optional PG database. (default: {None})
+            postgres_schema {str} -- Optional PG schema of the queue table. (default: {None})
+
+        Raises:
+            AirflowException: Raised when no sheets are specified.
+        """
+
+        if not sheets:
+            raise AirflowException(
+                "Sheets to watch must be specified.")
+
+        self.sheets = sheets
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.queue_table = queue_table
+        self.postgres_conn_id = postgres_conn_id
+        self.postgres_database = postgres_database
+        self.postgres_schema = postgres_schema
+
+        if debounce is None:
+            self.debounce = WEBHOOK_DEBOUNCE
+
+        if max_delay is None:
+            self.max_delay = WEBHOOK_MAX_DELAY
+
+        if queue_table is None:
+            self.queue_table = DEFAULT_WEBHOOK_TABLE
+
+        if postgres_conn_id is None:
+            self.postgres_conn_id = DEFAULT_PG_CONN
+
+        if postgres_database is None:
+            self.postgres_database = DEFAULT_PG_DB
+
+        if postgres_schema is None:
+            self.postgres_schema = DEFAULT_PG_SCHEMA
+
+        super().__init__(*args, **kwargs)
+
+    def poke(self, context):
+        """Checks the queue for sheets whose events are ready to sync.
+
+        Arguments:
+            context {dict} -- The task context.
+
+        Returns:
+            bool -- Whether any watched sheet is ready.
+        """
+
+        from airflow.hooks.postgres_hook import PostgresHook
+
+        tables = {sheet_id: table_name for sheet_id, table_name in self.sheets}
+
+        # Schema is actually database name.
+        postgres = PostgresHook(
+            postgres_conn_id=self.postgres_conn_id,
+            schema=self.postgres_database)
+        with closing(postgres.get_conn()) as conn:
+            with closing(conn.cursor()) as cursor:
+                ensure_queue(cursor, self.postgres_schema, self.queue_table)
+                ready = ready_sheets(
+                    cursor, self.postgres_schema, self.queue_table, self.debounce, self.max_delay, list(tables))
+            conn.commit()
+
+        if not ready:
+            logging.info(
+                f"No webhook events of {len(tables)} sheets are ready to sync.")
+            return False
+
+        changed = [sheet_id for sheet_id in tables if sheet_id in ready]
+        logging.info(
+            f"Webhook events of {len(changed)} of {len(tables)} sheets are ready to sync: "
+            f"{', '.join(f'{sheet_id} ({ready[sheet_id]} events)' for sheet_id in changed)}.")
+        ti = context["ti"]
+        ti.xcom_push(key="sheets", value=[
+            {"sheet_id": sheet_id, "table_name": tables[sheet_id]} for sheet_id in changed])
+        ti.xcom_push(key=XCOM_RETURN_KEY, value=changed)
+
+        return True
@@ -3,13 +3,35 @@ from airflow.plugins_manager import AirflowPlugin
 from airflow.models import BaseOperator
 from airflow.hooks.base_hook import BaseHook
 from airflow_smartsheet.operators.smartsheet_operator import SmartsheetToFileOperator, SmartsheetToPostgresOperator
+from airflow_smartsheet.operators.bulk_operator import SmartsheetBulkToPostgresOperator
+from airflow_smartsheet.operators.export_operator import SmartsheetExportOperator
+from airflow_smartsheet.operators.extras import SmartsheetDbPrepOperator
+from airflow_smartsheet.operators.writeback_operator import PostgresToSmartsheetOperator
+from airflow_smartsheet.operators.webhook_operator import SmartsheetWebhookToPostgresOperator
+from airflow_smartsheet.operators.watermark_operator import SmartsheetWatermarkOperator
+from airflow_smartsheet.sensors.change_sensor import SmartsheetChangeSensor
+from airflow_smartsheet.sensors.webhook_sensor import SmartsheetWebhookSensor
 from airflow_smartsheet.hooks.smartsheet_hook import SmartsheetHook
 
 
+class _WebhookBlueprints:
+    """Loads the webhook receiver when the webserver reads the blueprints, so other processes never import Flask.
+    """
+
+    def __get__(self, instance, owner):
+        from airflow_smartsheet.webhooks.receiver import webhook_blueprint
+
+        return [webhook_blueprint]
+
+
 class SmartsheetPlugin(AirflowPlugin):
     name = 'airflow_smartsheet'
-    operators = [SmartsheetToFileOperator, SmartsheetToPostgresOperator]
+    operators = [SmartsheetToFileOperator, SmartsheetToPostgresOperator, SmartsheetBulkToPostgresOperator,
+                 SmartsheetExportOperator, SmartsheetDbPrepOperator, PostgresToSmartsheetOperator,
+                 SmartsheetWebhookToPostgresOperator, SmartsheetWatermarkOperator]
+    # PooledPostgresHook is left out; it would load the PostgreSQL hook with the plugin
     hooks = [SmartsheetHook]
+    sensors = [SmartsheetChangeSensor, SmartsheetWebhookSensor]
 
     # A list of class(es) derived from BaseExecutor
     executors = []
@@ -19,6 +41,6 @@ class SmartsheetPlugin(AirflowPlugin):
     # from flask_admin.BaseView
     admin_views = []
     # A list of Blueprint object created from flask.Blueprint
-    flask_blueprints = []
+    flask_blueprints = _WebhookBlueprints()
     # A list of menu links (flask_admin.base.MenuLink)
     menu_links = []
@@ -0,0 +1,377 @@
+# Triggers used to download Smartsheet sheets in the triggerer while deferred operators wait.
+
+import asyncio
+import json
+import logging
+import os
+import time
+
+from airflow.exceptions import AirflowException
+
+from airflow_smartsheet.hooks.retry import backoff_delay, retry_after, should_retry
+from airflow_smartsheet.hooks.smartsheet_hook import SmartsheetHook
+from airflow_smartsheet.consts import *
+
+try:
+    from airflow.triggers.base import BaseTrigger, TriggerEvent
+except ImportError:
+    # Airflow before 2.2 cannot defer tasks
+    BaseTrigger, TriggerEvent = object, None
+
+
+# Accept headers of the sheet exports
+EXPORT_TYPES = {
+    "CSV": "text/csv",
+    "EXCEL": "application/vnd.ms-excel",
+    "PDF": "application/pdf"}
+
+# Sheet type of the JSON sheet payload
+JSON_PAYLOAD = "JSON"
+
+
+def triggers_supported():
+    """Determines whether the installed Airflow can defer tasks to triggers.
+
+    Returns:
+        bool -- Whether Airflow 2.2 or later is installed.
+    """
+
+    return TriggerEvent is not None
+
+
+def _remove_partial(path):
+    """Removes a partial download, if it exists.
+
+    Arguments:
+        path {str} -- Path to the partial file.
+    """
+
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _write_rows(file, rows, written):
+    """Serializes rows of the JSON sheet payload and appends them to the rows array.
+
+    Arguments:
+        file {file} -- The open payload file.
+        rows {list} -- The rows of one page.
+        written {int} -- Number of rows written before.
+
+    Returns:
+        int -- Number of rows written, including these rows.
+    """
+
+    for row in rows:
+        if written:
+            file.write(", ")
+        file.write(json.dumps(row))
+        written += 1
+
+    return written
+
+
+def _resolve_hook(token_variable, api_base):
+    """Creates a Smartsheet hook with the token stored in an Airflow variable, or the default token.
+
+    Arguments:
+        token_variable {str} -- Name of the Airflow variable holding an override token, or None.
+        api_base {str} -- The API base URL, or None.
+
+    Returns:
+        SmartsheetHook -- The hook.
+    """
+
+    token = None
+    if token_variable is not None:
+        from airflow.models import Variable
+
+        token = Variable.get(token_variable)
+
+    return SmartsheetHook(token, api_base=api_base)
+
+
+class SmartsheetDownloadTrigger(BaseTrigger):
+    """Downloads a sheet export or the JSON payload of every sheet row without blocking the triggerer.
+    Requests share the rate limiter, circuit breaker and counters of the token in the triggerer process
+    and are retried like SmartsheetClient requests. File writes, serialization and token lookups
+    run in the default executor, so a large sheet does not stall other triggers.
+    """
+
+    def __init__(
+            self, sheet_id, path, sheet_type, paper_size=None, page_size=None, token_variable=None, api_base=None):
+        """Initializes a Smartsheet download trigger.
+
+        Arguments:
+            sheet_id {int} -- Sheet ID to download.
+            path {str} -- Path to the downloaded file.
+            sheet_type {str} -- CSV, EXCEL or PDF to download an export, or JSON to download the sheet payload.
+
+        Keyword Arguments:
+            paper_size {str} -- Optional paper size for PDF file type. (default: {None})
+            page_size {int} -- Optional number of rows fetched per API call of the JSON payload. (default: {None})
+            token_variable {str} -- Optional name of the Airflow variable holding an override token;
+                only the name is stored with the trigger and the token is read in the triggerer. (default: {None})
+            api_base {str} -- Optional API base URL. (default: {None})
+        """
+
+        super().__init__()
+
+        self.sheet_id = sheet_id
+        self.path = path
+        self.sheet_type = sheet_type
+        self.paper_size = paper_size
+        self.page_size = page_size
+        self.token_variable = token_variable
+        self.api_base = api_base
+
+        if page_size is None:
+            self.page_size = DEFAULT_PAGE_SIZE
+
+    def serialize(self):
+        """Serializes the trigger to be recreated in the triggerer.
+
+        Returns:
+            tuple -- The class path and keyword arguments of the trigger.
+        """
+
+        return (
+            "airflow_smartsheet.triggers.smartsheet_trigger.SmartsheetDownloadTrigger",
+            {
+                "sheet_id": self.sheet_id,
+                "path": self.path,
+                "sheet_type": self.sheet_type,
+                "paper_size": self.paper_size,
+                "page_size": self.page_size,
+                "token_variable": self.token_variable,
+                "api_base": self.api_base})
+
+    async def run(self):
+        """Downloads the sheet, then fires a single event.
+
+        Yields:
+            TriggerEvent -- The status, with the path, bytes, rows, version, seconds and API activity
+                of successful downloads or the message of failed ones.
+        """
+
+        started = time.monotonic()
+        try:
+            result = await self._download()
+        except Exception as ex:
+            logging.exception(f"Deferred download of sheet {self.sheet_id} failed.")
+            yield TriggerEvent({"status": "error", "message": str(ex)})
+            return
+
+        result.update(status="success", path=self.path, seconds=time.monotonic() - started)
+        yield TriggerEvent(result)
+
+    async def _download(self):
+        """Downloads the sheet to a partial file and moves it to the path once complete.
+
+        Raises:
+            AirflowException: Raised when aiohttp is not installed.
+
+        Returns:
+            dict -- Bytes, rows, version and API activity of the download.
+        """
+
+        try:
+            import aiohttp
+        except ImportError:
+            raise AirflowException(
+                "Deferrable operators need aiohttp; install it with pip install aiohttp.")
+
+        import smartsheet
+
+        # Resolving the token may read an Airflow variable
+        loop = asyncio.get_running_loop()
+        hook = await loop.run_in_executor(None, _resolve_hook, self.token_variable, self.api_base)
+        self._limiter, self._circuit_breaker, self._counters = hook._get_api_state()
+        before = self._counters.snapshot()
+
+        self._base = (hook.api_base or smartsheet.__api_base__).rstrip("/")
+        self._headers = {"Authorization": f"Bearer {hook.token}"}
+
+        part_path = self.path + ".part"
+        timeout = aiohttp.ClientTimeout(
+            total=None, sock_connect=TRIGGER_CONNECT_TIMEOUT, sock_read=TRIGGER_READ_TIMEOUT)
+        try:
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                if self.sheet_type == JSON_PAYLOAD:
+                    result = await self._download_payload(session, part_path)
+                else:
+                    result = await self._download_export(session, part_path)
+            await loop.run_in_executor(None, os.replace, part_path, self.path)
+        finally:
+            await loop.run_in_executor(None, _remove_partial, part_path)
+
+        current = self._counters.snapshot()
+        result["api"] = {name: current[name] - before.get(name, 0) for name in current}
+
+        return result
+
+    async def _download_export(self, session, part_path):
+        """Streams the sheet export to the partial file.
+
+        Arguments:
+            session {ClientSession} -- The HTTP session.
+            part_path {str} -- Path to the partial file.
+
+        Returns:
+            dict -- Bytes of the download.
+        """
+
+        params = {}
+        if self.sheet_type == "PDF":
+            params["paperSize"] = self.paper_size
+
+        loop = asyncio.get_running_loop()
+
+        async def write(response):
+            written = 0
+            file = await loop.run_in_executor(None, open, part_path, "wb")
+            try:
+                async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    await loop.run_in_executor(None, file.write, chunk)
+                    written += len(chunk)
+            finally:
+                await loop.run_in_executor(None, file.close)
+            return written
+
+        written = await self._request(
+            session, f"/sheets/{self.sheet_id}", params, EXPORT_TYPES[self.sheet_type], write)
+
+        return {"bytes": written, "rows": None, "version": None}
+
+    async def _download_payload(self, session, part_path):
+        """Fetches every page of the sheet and writes one JSON sheet payload with every row.
+
+        Arguments:
+            session {ClientSession} -- The HTTP session.
+            part_path {str} -- Path to the partial file.
+
+        Raises:
+            AirflowException: Raised when the sheet changed since the first page was fetched.
+
+        Returns:
+            dict -- Bytes, rows and version of the payload.
+        """
+
+        loop = asyncio.get_running_loop()
+
+        async def read(response):
+            return await loop.run_in_executor(None, json.loads, await response.read())
+
+        version, rows = None, 0
+        file = await loop.run_in_executor(None, open, part_path, "w")
+        try:
+            page = 1
+            while True:
+                sheet = await self._request(
+                    session, f"/sheets/{self.sheet_id}",
+                    {"pageSize": self.page_size, "page": page}, "application/json", read)
+                page_rows = sheet.pop("rows", None) or []
+
+                if page == 1:
+                    version = sheet.get("version")
+                    # Same layout as JsonSheetWriter: the first page's sheet with the rows of every page
+                    header = json.dumps(sheet)[:-1] + (", " if sheet else "") + '"rows": ['
+                    await loop.run_in_executor(None, file.write, header)
+                elif sheet.get("version") != version:
+                    raise AirflowException(
+                        f"Sheet {self.sheet_id} changed from version {version} to {sheet.get('version')} while paging.")
+
+                rows = await loop.run_in_executor(None, _write_rows, file, page_rows, rows)
+
+                if len(page_rows) < self.page_size or page * self.page_size >= (sheet.get("totalRowCount") or 0):
+                    break
+                page += 1
+
+            await loop.run_in_executor(None, file.write, "]}")
+        finally:
+            await loop.run_in_executor(None, file.close)
+
+        size = await loop.run_in_executor(None, os.path.getsize, part_path)
+        return {"bytes": size, "rows": rows, "version": version}
+
+    async def _request(self, session, path, params, accept, handle):
+        """Sends a GET request once the rate limiter allows it,
+        retrying throttled requests, server errors and connection errors.
+
+        Arguments:
+            session {ClientSession} -- The HTTP session.
+            path {str} -- The API path.
+            params {dict} -- The query parameters.
+            accept {str} -- The Accept header.
+            handle {callable} -- Coroutine function reading a successful response.
+
+        Raises:
+            AirflowException: Raised when the circuit breaker is open.
+            AirflowException: Raised when the API returns an error not worth retrying or retries run out.
+
+        Returns:
+            object -- The result of handle.
+        """
+
+        import aiohttp
+
+        attempt = 0
+        while True:
+            if not self._circuit_breaker.allow():
+                raise AirflowException(
+                    "Smartsheet API circuit is open after repeated failures; not sending request.")
+
+            self._counters.increment("limiter_wait", await self._limiter.acquire_async())
+            self._counters.increment("calls")
+
+            error, wait = None, None
+            started = time.monotonic()
+            try:
+                async with session.get(
+                        self._base + path,
+                        params=params,
+                        headers={**self._headers, "Accept": accept}) as response:
+                    if response.status < 400:
+                        result = await handle(response)
+                        self._counters.increment("bytes", response.content.total_bytes)
+                        self._circuit_breaker.record_success()
+                        self._limiter.reward()
+                        return result
+
+                    body = await response.text()
+                    try:
+                        error_code = json.loads(body).get("errorCode")
+                    except (AttributeError, ValueError):
+                        error_code = None
+                    if not should_retry(response.status, error_code):
+                        # Not worth retrying; the service itself is healthy
+                        self._circuit_breaker.record_success()
+                        raise AirflowException(
+                            f"Smartsheet API request {path} failed with status {response.status}; body is {body[:500]}.")
+
+                    error = response.status
+                    wait = retry_after(response)
+                    if response.status == 429:
+                        self._counters.increment("throttles")
+                        self._limiter.penalize(wait or 0.0)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as ex:
+                error = ex
+            finally:
+                self._counters.increment("api_time", time.monotonic() - started)
+
+            self._circuit_breaker.record_failure()
+
+            attempt += 1
+            if attempt > MAX_RETRIES:
+                self._counters.increment("failures")
+                raise AirflowException(
+                    f"Smartsheet API request {path} failed after {MAX_RETRIES} retries; last error is {error}.")
+
+            if wait is None:
+                wait = backoff_delay(attempt)
+            self._counters.increment("retries")
+            self._counters.increment("retry_wait", wait)
+
+            logging.info(
+                f"Smartsheet API request failed ({error}); retry {attempt} of {MAX_RETRIES} in {wait:.1f} seconds.")
+            await asyncio.sleep(wait)
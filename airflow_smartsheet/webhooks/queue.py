@@ -0,0 +1,211 @@
+# Queue table helpers used to hand Smartsheet webhook events from the receiver to sync tasks.
+
+import hashlib
+import hmac
+
+from airflow_smartsheet.operators.columns import quote_ident
+from airflow_smartsheet.consts import *
+
+
+# Events of these objects change the cells of one row
+ROW_OBJECT_TYPES = ("row", "cell")
+
+# Events of these objects change the column layout of the sheet
+LAYOUT_OBJECT_TYPES = ("column",)
+
+# Events not claimed by a sync, or claimed by a sync that never finished
+CLAIMABLE = f"(claimed_at IS NULL OR claimed_at <= now() - make_interval(secs => {WEBHOOK_CLAIM_TIMEOUT}))"
+
+
+def verify_signature(secret, body, signature):
+    """Verifies the HMAC-SHA256 signature Smartsheet sends with every callback.
+
+    Arguments:
+        secret {str} -- The shared secret of the webhook.
+        body {bytes} -- The raw callback body.
+        signature {str} -- The hex digest in the Smartsheet-Hmac-SHA256 header.
+
+    Returns:
+        bool -- Whether the signature matches the body.
+    """
+
+    if not signature:
+        return False
+
+    expected = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature.strip().lower())
+
+
+def callback_events(payload):
+    """Extracts the queued events of a webhook callback.
+    Cell events are reduced to their row, and events of comments, attachments and the sheet itself are left out.
+
+    Arguments:
+        payload {dict} -- The callback payload.
+
+    Returns:
+        tuple -- The sheet ID, or None if the callback is not scoped to a sheet,
+            and distinct (row ID, object type, event type) of the events; row IDs of column events are None.
+    """
+
+    if payload.get("scope") != "sheet" or payload.get("scopeObjectId") is None:
+        return None, []
+
+    events = {}
+    for event in payload.get("events") or []:
+        object_type = event.get("objectType")
+        if object_type == "row":
+            row_id = event.get("id")
+        elif object_type == "cell":
+            row_id = event.get("rowId")
+        elif object_type in LAYOUT_OBJECT_TYPES:
+            row_id = None
+        else:
+            continue
+        events.setdefault((row_id, object_type, event.get("eventType")), None)
+
+    return int(payload["scopeObjectId"]), list(events)
+
+
+def ensure_queue(cursor, schema, table):
+    """Ensures the queue table and its index exist.
+    Nothing is locked when they already do, so callers need not commit before enqueueing or claiming events.
+
+    Arguments:
+        cursor {cursor} -- The psycopg2 cursor to execute on.
+        schema {str} -- The schema of the queue table.
+        table {str} -- The queue table name.
+    """
+
+    # CREATE INDEX IF NOT EXISTS locks out inserts until the transaction ends, even for an existing index
+    cursor.execute(
+        "SELECT EXISTS (SELECT 1 FROM pg_attribute WHERE attrelid = to_regclass(%s) "
+        "AND attname = 'claimed_at' AND NOT attisdropped);",
+        (f"{schema}.{table}",))
+    if cursor.fetchone()[0]:
+        return
+
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {schema}.{table} ("
+        "id bigserial PRIMARY KEY, "
+        "sheet_id bigint NOT NULL, "
+        "row_id bigint, "
+        "object_type text NOT NULL, "
+        "event_type text, "
+        "received_at timestamptz NOT NULL DEFAULT now(), "
+        "claim text, "
+        "claimed_at timestamptz);")
+    # Queue tables created before claims were committed
+    cursor.execute(
+        f"ALTER TABLE {schema}.{table} ADD COLUMN IF NOT EXISTS claim text, "
+        "ADD COLUMN IF NOT EXISTS claimed_at timestamptz;")
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS {quote_ident(table[:55] + '_sheet')} ON {schema}.{table} (sheet_id, received_at);")
+
+
+def enqueue_events(cursor, schema, table, sheet_id, events):
+    """Appends the events of one callback to the queue.
+
+    Arguments:
+        cursor {cursor} -- The psycopg2 cursor to execute on.
+        schema {str} -- The schema of the queue table.
+        table {str} -- The queue table name.
+        sheet_id {int} -- The sheet ID.
+        events {list} -- (row ID, object type, event type) of every event.
+    """
+
+    from psycopg2.extras import execute_values
+
+    execute_values(
+        cursor,
+        f"INSERT INTO {schema}.{table} (sheet_id, row_id, object_type, event_type) VALUES %s;",
+        [(sheet_id,) + tuple(event) for event in events])
+
+
+def ready_sheets(cursor, schema, table, debounce, max_delay, sheet_ids=None):
+    """Finds sheets whose queued events are ready to sync.
+    A burst of events is ready once no event arrived for the debounce period,
+    or once its first event waited the maximum delay. Events claimed by a running sync are left out.
+
+    Arguments:
+        cursor {cursor} -- The psycopg2 cursor to execute on.
+        schema {str} -- The schema of the queue table.
+        table {str} -- The queue table name.
+        debounce {float} -- Seconds without new events after which a sheet is ready.
+        max_delay {float} -- Seconds after which a sheet with queued events is always ready.
+
+    Keyword Arguments:
+        sheet_ids {list} -- Optional IDs of the only sheets to check. (default: {None})
+
+    Returns:
+        dict -- Numbers of queued events by sheet ID of the ready sheets.
+    """
+
+    condition, parameters = "", [debounce, max_delay]
+    if sheet_ids is not None:
+        condition = "AND sheet_id = ANY(%s) "
+        parameters.insert(0, list(sheet_ids))
+
+    cursor.execute(
+        f"SELECT sheet_id, count(*) FROM {schema}.{table} WHERE {CLAIMABLE} {condition}"
+        "GROUP BY sheet_id "
+        "HAVING max(received_at) <= now() - make_interval(secs => %s) "
+        "OR min(received_at) <= now() - make_interval(secs => %s);",
+        parameters)
+
+    return dict(cursor.fetchall())
+
+
+def claim_events(cursor, schema, table, sheet_id, claim):
+    """Claims the queued events of a sheet for one sync; the claim holds once committed.
+    Events claimed by other syncs are skipped, unless their claim is older than WEBHOOK_CLAIM_TIMEOUT
+    because the sync that claimed them never finished. Claimed events stay queued until removed.
+
+    Arguments:
+        cursor {cursor} -- The psycopg2 cursor to execute on.
+        schema {str} -- The schema of the queue table.
+        table {str} -- The queue table name.
+        sheet_id {int} -- The sheet ID.
+        claim {str} -- The unique claim of the sync.
+
+    Returns:
+        list -- (row ID, object type, event type) of the claimed events, in order of arrival.
+    """
+
+    cursor.execute(
+        f"UPDATE {schema}.{table} SET claim = %s, claimed_at = now() WHERE id IN "
+        f"(SELECT id FROM {schema}.{table} WHERE sheet_id = %s AND {CLAIMABLE} FOR UPDATE SKIP LOCKED) "
+        "RETURNING id, row_id, object_type, event_type;",
+        (claim, sheet_id))
+
+    return [event[1:] for event in sorted(cursor.fetchall())]
+
+
+def remove_events(cursor, schema, table, claim):
+    """Removes the events of a claim, in the transaction that applies their changes.
+
+    Arguments:
+        cursor {cursor} -- The psycopg2 cursor to execute on.
+        schema {str} -- The schema of the queue table.
+        table {str} -- The queue table name.
+        claim {str} -- The claim of the sync.
+    """
+
+    cursor.execute(
+        f"DELETE FROM {schema}.{table} WHERE claim = %s;",
+        (claim,))
+
+
+def release_events(cursor, schema, table, claim):
+    """Returns the events of a failed sync's claim to the queue.
+
+    Arguments:
+        cursor {cursor} -- The psycopg2 cursor to execute on.
+        schema {str} -- The schema of the queue table.
+        table {str} -- The queue table name.
+        claim {str} -- The claim of the sync.
+    """
+
+    cursor.execute(
+        f"UPDATE {schema}.{table} SET claim = NULL, claimed_at = NULL WHERE claim = %s;",
+        (claim,))
@@ -0,0 +1,149 @@
+# Flask blueprint receiving Smartsheet webhook callbacks into the queue table.
+
+import json
+import logging
+
+from contextlib import closing
+
+from flask import Blueprint, jsonify, request
+
+from airflow.models import Variable
+
+from airflow_smartsheet.webhooks.queue import callback_events, enqueue_events, ensure_queue, verify_signature
+from airflow_smartsheet.consts import *
+
+
+def create_webhook_blueprint(
+        name="smartsheet_webhooks",
+        url_prefix="/smartsheet",
+        postgres_conn_id=None,
+        postgres_database=None,
+        postgres_schema=None,
+        queue_table=None,
+        secret_variable=None):
+    """Creates a blueprint serving the webhook callback URL at {url_prefix}/webhooks.
+    Verification challenges are answered, and callbacks are authenticated by their HMAC-SHA256 signature
+    before their row events are appended to the queue table.
+
+    Keyword Arguments:
+        name {str} -- The blueprint name. (default: {"smartsheet_webhooks"})
+        url_prefix {str} -- The URL prefix of the callback URL. (default: {"/smartsheet"})
+        postgres_conn_id {str} -- Optional PG connection ID. (default: {None})
+        postgres_database {str} -- Optional PG database. (default: {None})
+        postgres_schema {str} -- Optional PG schema of the queue table. (default: {None})
+        queue_table {str} -- Optional name of the queue table. (default: {None})
+        secret_variable {str} -- Optional Airflow variable holding the shared secret, or a JSON object
+            of shared secrets by webhook ID. (default: {None})
+
+    Returns:
+        Blueprint -- The blueprint.
+    """
+
+    if postgres_conn_id is None:
+        postgres_conn_id = DEFAULT_PG_CONN
+
+    if postgres_database is None:
+        postgres_database = DEFAULT_PG_DB
+
+    if postgres_schema is None:
+        postgres_schema = DEFAULT_PG_SCHEMA
+
+    if queue_table is None:
+        queue_table = DEFAULT_WEBHOOK_TABLE
+
+    if secret_variable is None:
+        secret_variable = WEBHOOK_SECRET_VARIABLE
+
+    blueprint = Blueprint(name, __name__, url_prefix=url_prefix)
+    state = {"postgres": None, "queue_ready": False}
+
+    @blueprint.record_once
+    def exempt_csrf(setup):
+        # Callbacks carry no CSRF token; their signature authenticates them
+        csrf = setup.app.extensions.get("csrf")
+        if csrf is not None:
+            csrf.exempt(blueprint)
+
+    def connect():
+        if state["postgres"] is None:
+            from airflow.hooks.postgres_hook import PostgresHook
+
+            # Schema is actually database name.
+            state["postgres"] = PostgresHook(
+                postgres_conn_id=postgres_conn_id,
+                schema=postgres_database)
+
+        return state["postgres"].get_conn()
+
+    @blueprint.route("/webhooks", methods=["POST"])
+    def receive():
+        # Smartsheet verifies new webhooks, and periodically enabled ones, by a challenge to echo
+        challenge = request.headers.get("Smartsheet-Hook-Challenge")
+        if challenge is not None:
+            return jsonify(smartsheetHookResponse=challenge), 200, {"Smartsheet-Hook-Response": challenge}
+
+        body = request.get_data()
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return jsonify(message="Callback body is not JSON."), 400
+        if not isinstance(payload, dict):
+            return jsonify(message="Callback body is not a JSON object."), 400
+
+        secret = _shared_secret(secret_variable, payload.get("webhookId"))
+        if secret is None:
+            logging.error(
+                f"No shared secret of webhook {payload.get('webhookId')} is stored in {secret_variable}; rejecting callback.")
+            return jsonify(message="Webhook secret is not configured."), 503
+        if not verify_signature(secret, body, request.headers.get("Smartsheet-Hmac-SHA256")):
+            return jsonify(message="Callback signature is invalid."), 401
+
+        # Disabled webhooks report their new status instead of events
+        if "newWebhookStatus" in payload:
+            logging.warning(
+                f"Webhook {payload.get('webhookId')} of sheet {payload.get('scopeObjectId')} is now "
+                f"{payload['newWebhookStatus']}; re-enable it to resume callbacks.")
+            return jsonify(message="OK", queued=0)
+
+        sheet_id, events = callback_events(payload)
+        if events:
+            with closing(connect()) as conn:
+                with closing(conn.cursor()) as cursor:
+                    if not state["queue_ready"]:
+                        ensure_queue(cursor, postgres_schema, queue_table)
+                    enqueue_events(cursor, postgres_schema, queue_table, sheet_id, events)
+                conn.commit()
+            state["queue_ready"] = True
+
+        return jsonify(message="OK", queued=len(events))
+
+    return blueprint
+
+
+def _shared_secret(variable, webhook_id):
+    """Reads the shared secret of a webhook.
+
+    Arguments:
+        variable {str} -- The Airflow variable holding the secret or secrets.
+        webhook_id {int} -- The webhook ID of the callback.
+
+    Returns:
+        str -- The shared secret, or None if none is stored.
+    """
+
+    value = Variable.get(variable, default_var=None)
+    if value is None:
+        return None
+
+    try:
+        secrets = json.loads(value)
+    except ValueError:
+        return value
+    if not isinstance(secrets, dict):
+        return value
+
+    return secrets.get(str(webhook_id))
+
+
+# Registered by the plugin in the webserver
+webhook_blueprint = create_webhook_blueprint()
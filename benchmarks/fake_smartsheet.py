@@ -0,0 +1,621 @@
+# Local stand-in for the Smartsheet API serving synthetic sheets to benchmarks.
+#
+# Run it on its own to point a development Airflow at it:
+#     python benchmarks/fake_smartsheet.py --rows 10000 --port 8765
+#     export SMARTSHEET_API_BASE=http://127.0.0.1:8765/2.0
+
+import argparse
+import bisect
+import csv
+import datetime
+import io
+import json
+import re
+import threading
+import time
+import zipfile
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+
+# Column types of synthetic sheets, as TYPE:COUNT pairs
+DEFAULT_COLUMN_MIX = "TEXT_NUMBER:6,DATE:1,DATETIME:1,CHECKBOX:1,PICKLIST:1,CONTACT_LIST:1"
+COLUMN_TYPES = ("TEXT_NUMBER", "DATE", "DATETIME", "ABSTRACT_DATETIME", "CHECKBOX", "PICKLIST", "CONTACT_LIST")
+PICKLIST_OPTIONS = ["Red", "Green", "Blue", "Yellow"]
+
+# Every nth cell of a column is left empty
+EMPTY_CELL_EVERY = 11
+
+CONTENT_TYPES = {
+    "application/json": "json",
+    "text/csv": "csv",
+    "application/vnd.ms-excel": "xlsx",
+    "application/pdf": "pdf",
+}
+
+_EPOCH = datetime.datetime(2024, 1, 1, 8, 0, tzinfo=datetime.timezone.utc)
+
+
+def parse_column_mix(mix):
+    """Expands a column mix into column types.
+
+    Arguments:
+        mix {str} -- Comma-separated TYPE:COUNT pairs; a missing count is 1.
+
+    Raises:
+        ValueError: Raised when a column type is unknown.
+
+    Returns:
+        list -- The column types in sheet order.
+    """
+
+    types = []
+    for part in mix.split(","):
+        name, _, count = part.strip().partition(":")
+        name = name.upper()
+        if name not in COLUMN_TYPES:
+            raise ValueError(f"Unknown column type {name}; use one of {', '.join(COLUMN_TYPES)}.")
+        types.extend([name] * int(count or 1))
+
+    return types
+
+
+class SyntheticSheet:
+    """A deterministic sheet generated on demand, so large sheets cost no server memory.
+    Exports are rendered once and kept.
+    """
+
+    def __init__(self, sheet_id, row_count, column_types, name=None, version=1):
+        """Initializes a synthetic sheet.
+
+        Arguments:
+            sheet_id {int} -- The sheet ID.
+            row_count {int} -- Number of rows.
+            column_types {list} -- Smartsheet type of every column.
+
+        Keyword Arguments:
+            name {str} -- Optional sheet name. (default: {None})
+            version {int} -- The sheet version. (default: {1})
+        """
+
+        self.id = sheet_id
+        self.row_count = row_count
+        self.name = name or f"Benchmark {sheet_id}"
+        self.version = version
+        self.modified_at = _EPOCH.isoformat().replace("+00:00", "Z")
+        self.columns = [
+            _column(sheet_id, index, column_type) for index, column_type in enumerate(column_types)]
+
+        # Cells edited and rows deleted by applied webhook events
+        self.edits = {}
+        self.deleted = []
+
+        self._exports = {}
+        self._lock = threading.RLock()
+
+    def row_id(self, index):
+        return self.id * 1000000 + index + 1
+
+    def row_number(self, index):
+        return index + 1 - bisect.bisect_left(self.deleted, index)
+
+    def apply_event(self, event):
+        """Applies a webhook event to the sheet, so replayed callbacks describe the rows the stand-in serves.
+        Text cells get an edited value, rows are deleted, and created rows are appended when they are the next row.
+
+        Arguments:
+            event {dict} -- The callback event.
+
+        Returns:
+            bool -- Whether the sheet changed.
+        """
+
+        object_type, event_type = event.get("objectType"), event.get("eventType")
+        row_id = event.get("rowId") if object_type == "cell" else event.get("id")
+        index = (row_id or 0) - self.id * 1000000 - 1
+
+        with self._lock:
+            if object_type == "row" and event_type == "created" and index == self.row_count:
+                self.row_count += 1
+            elif not 0 <= index < self.row_count or index in self.deleted:
+                return False
+            elif object_type == "row" and event_type == "deleted":
+                bisect.insort(self.deleted, index)
+            elif object_type == "cell" and event_type in ("created", "updated"):
+                column = next((column for column in self.columns if column["id"] == event.get("columnId")), None)
+                if column is None or column["type"] != "TEXT_NUMBER":
+                    return False
+                self.edits.setdefault(index, {})[column["index"]] = f"Edited {index}-{column['index']} v{self.version + 1}"
+            else:
+                return False
+
+            self.version += 1
+            self.modified_at = (_EPOCH + datetime.timedelta(seconds=self.version)).isoformat().replace("+00:00", "Z")
+            self._exports = {}
+
+        return True
+
+    def cell(self, index, column):
+        """Generates the value and display value of a cell.
+
+        Arguments:
+            index {int} -- The zero-based row index.
+            column {dict} -- The column.
+
+        Returns:
+            tuple -- The value and display value, both None for empty cells.
+        """
+
+        position = column["index"]
+        edited = self.edits.get(index, {}).get(position)
+        if edited is not None:
+            return edited, edited
+        if (index + position) % EMPTY_CELL_EVERY == 0:
+            return None, None
+
+        column_type = column["type"]
+        if column_type == "TEXT_NUMBER":
+            if position % 2:
+                value = ((index * 7919 + position * 104729) % 1000000) / 100
+                return value, f"{value:,.2f}"
+            if index % 7 == 0:
+                # Exercise CSV quoting
+                text = f'Note "{index}", with comma\nand newline'
+            else:
+                text = f"Item {index}-{position}"
+            return text, text
+        if column_type == "DATE":
+            day = (_EPOCH + datetime.timedelta(days=index % 730)).date()
+            return day.isoformat(), day.strftime("%m/%d/%y")
+        if column_type in ("DATETIME", "ABSTRACT_DATETIME"):
+            moment = _EPOCH + datetime.timedelta(minutes=index * 37 + position)
+            if column_type == "ABSTRACT_DATETIME":
+                return moment.strftime("%Y-%m-%dT%H:%M:%S"), moment.strftime("%m/%d/%y %I:%M %p")
+            return moment.strftime("%Y-%m-%dT%H:%M:%SZ"), moment.strftime("%m/%d/%y %I:%M %p")
+        if column_type == "CHECKBOX":
+            return index % 3 == 0, None
+        if column_type == "PICKLIST":
+            option = PICKLIST_OPTIONS[(index + position) % len(PICKLIST_OPTIONS)]
+            return option, option
+        # CONTACT_LIST
+        user = (index * 13 + position) % 500
+        return f"user{user}@example.com", f"User {user}"
+
+    def row(self, index, column_ids=None):
+        """Builds a row as the API returns it.
+
+        Arguments:
+            index {int} -- The zero-based row index.
+
+        Keyword Arguments:
+            column_ids {set} -- Optional IDs of the only columns to include. (default: {None})
+
+        Returns:
+            dict -- The row.
+        """
+
+        cells = []
+        for column in self.columns:
+            if column_ids is not None and column["id"] not in column_ids:
+                continue
+            value, display_value = self.cell(index, column)
+            cell = {"columnId": column["id"]}
+            if value is not None:
+                cell["value"] = value
+            if display_value is not None:
+                cell["displayValue"] = display_value
+            cells.append(cell)
+
+        return {
+            "id": self.row_id(index),
+            "rowNumber": self.row_number(index),
+            "version": self.version,
+            "modifiedAt": self.modified_at,
+            "cells": cells}
+
+    def page(self, page=None, page_size=None, column_ids=None, row_ids=None):
+        """Builds one page of the sheet as the API returns it.
+
+        Keyword Arguments:
+            page {int} -- The page number, starting at 1. (default: {None})
+            page_size {int} -- Rows per page; every row if unspecified. (default: {None})
+            column_ids {set} -- Optional IDs of the only columns to include. (default: {None})
+            row_ids {set} -- Optional IDs of the only rows to include. (default: {None})
+
+        Returns:
+            dict -- The sheet.
+        """
+
+        if row_ids is not None:
+            indexes = sorted(
+                row_id - self.id * 1000000 - 1 for row_id in row_ids
+                if 0 < row_id - self.id * 1000000 <= self.row_count)
+        else:
+            indexes = range(self.row_count)
+        if self.deleted:
+            indexes = [index for index in indexes if index not in self.deleted]
+        total = len(indexes)
+
+        if page_size is not None:
+            start = (max(page or 1, 1) - 1) * page_size
+            indexes = indexes[start:start + page_size]
+
+        return {
+            "id": self.id,
+            "name": self.name,
+            "version": self.version,
+            "totalRowCount": total,
+            "accessLevel": "OWNER",
+            "permalink": f"https://app.smartsheet.com/sheets/{self.id}",
+            "createdAt": self.modified_at,
+            "modifiedAt": self.modified_at,
+            "columns": [
+                column for column in self.columns
+                if column_ids is None or column["id"] in column_ids],
+            "rows": [self.row(index, column_ids) for index in indexes]}
+
+    def export(self, fmt):
+        """Renders the sheet as a CSV, XLSX or PDF export, once.
+
+        Arguments:
+            fmt {str} -- csv, xlsx or pdf.
+
+        Returns:
+            bytes -- The export.
+        """
+
+        with self._lock:
+            if fmt not in self._exports:
+                self._exports[fmt] = {
+                    "csv": self._render_csv,
+                    "xlsx": self._render_xlsx,
+                    "pdf": self._render_pdf,
+                }[fmt]()
+            return self._exports[fmt]
+
+    def _display_rows(self):
+        for index in range(self.row_count):
+            if index in self.deleted:
+                continue
+            values = []
+            for column in self.columns:
+                value, display_value = self.cell(index, column)
+                if display_value is None and isinstance(value, bool):
+                    display_value = "true" if value else "false"
+                values.append("" if display_value is None else display_value)
+            yield values
+
+    def _render_csv(self):
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow([column["title"] for column in self.columns])
+        writer.writerows(self._display_rows())
+        return output.getvalue().encode("utf-8")
+
+    def _render_xlsx(self):
+        # A minimal workbook with inline strings
+        lines = []
+        titles = [column["title"] for column in self.columns]
+        for number, values in enumerate([titles] + list(self._display_rows()), start=1):
+            cells = "".join(
+                f'<c t="inlineStr"><is><t>{escape(value)}</t></is></c>' for value in values)
+            lines.append(f'<row r="{number}">{cells}</row>')
+
+        output = io.BytesIO()
+        with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as workbook:
+            workbook.writestr("[Content_Types].xml", _XLSX_CONTENT_TYPES)
+            workbook.writestr("_rels/.rels", _XLSX_RELS)
+            workbook.writestr("xl/workbook.xml", _XLSX_WORKBOOK)
+            workbook.writestr("xl/_rels/workbook.xml.rels", _XLSX_WORKBOOK_RELS)
+            workbook.writestr(
+                "xl/worksheets/sheet1.xml",
+                '<?xml version="1.0" encoding="UTF-8"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                + "".join(lines) + "</sheetData></worksheet>")
+        return output.getvalue()
+
+    def _render_pdf(self):
+        # A single-page PDF listing the CSV export as text
+        text = self.export("csv").decode("utf-8", "replace")
+        lines = [
+            "(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") Tj T*"
+            for line in text.splitlines()]
+        stream = "BT /F1 6 Tf 8 TL 20 780 Td " + " ".join(lines) + " ET"
+
+        objects = [
+            "<< /Type /Catalog /Pages 2 0 R >>",
+            "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            "/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+            "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+            f"<< /Length {len(stream.encode('latin-1', 'replace'))} >>\nstream\n{stream}\nendstream",
+        ]
+        output = io.BytesIO()
+        output.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(output.tell())
+            output.write(f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1", "replace"))
+        xref = output.tell()
+        output.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+        for offset in offsets:
+            output.write(f"{offset:010d} 00000 n \n".encode())
+        output.write(
+            f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+        return output.getvalue()
+
+
+def _column(sheet_id, index, column_type):
+    column = {
+        "id": sheet_id * 1000 + index + 1,
+        "index": index,
+        "title": "Primary" if index == 0 else f"{column_type.title().replace('_', ' ')} {index}",
+        "type": "TEXT_NUMBER" if index == 0 else column_type,
+        "primary": index == 0,
+        "width": 150,
+        "version": 0,
+    }
+    if column["type"] == "PICKLIST":
+        column["options"] = PICKLIST_OPTIONS
+    return column
+
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>')
+_XLSX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/></Relationships>')
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>')
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/></Relationships>')
+
+
+class FakeSmartsheetServer(ThreadingHTTPServer):
+    """A threaded HTTP server answering the Smartsheet API calls made by the operators.
+    Every request can be delayed, and every nth request is throttled with a 429 response.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, sheets, latency=0.0, throttle_every=0, retry_after=0.1, host="127.0.0.1", port=0):
+        """Initializes a fake Smartsheet API server.
+
+        Arguments:
+            sheets {list} -- The served SyntheticSheet instances.
+
+        Keyword Arguments:
+            latency {float} -- Seconds every request is delayed. (default: {0.0})
+            throttle_every {int} -- Throttle every nth request; never if 0. (default: {0})
+            retry_after {float} -- Retry-After seconds of throttled responses. (default: {0.1})
+            host {str} -- The listening address. (default: {"127.0.0.1"})
+            port {int} -- The listening port; any free port if 0. (default: {0})
+        """
+
+        super().__init__((host, port), _Handler)
+        self.sheets = {sheet.id: sheet for sheet in sheets}
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+
+        self.requests = 0
+        self.throttled = 0
+        self.written_rows = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        """The API base URL to pass to the hook or the SMARTSHEET_API_BASE environment variable."""
+
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/2.0"
+
+    def start(self):
+        """Serves requests on a background thread.
+        """
+
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops serving requests and closes the socket.
+        """
+
+        self.shutdown()
+        self.server_close()
+
+    def admit(self):
+        """Counts a request and decides whether it is throttled.
+
+        Returns:
+            bool -- Whether the request is answered normally.
+        """
+
+        with self._lock:
+            self.requests += 1
+            throttle = self.throttle_every > 0 and self.requests % self.throttle_every == 0
+            if throttle:
+                self.throttled += 1
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        return not throttle
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if not self.server.admit():
+            self._send_error(429, 4003, "Rate limit exceeded.", {"Retry-After": str(self.server.retry_after)})
+            return
+
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        match = re.fullmatch(r"/2\.0/sheets(?:/(\d+)(?:/(version|columns|attachments))?)?/?", url.path)
+        if match is None:
+            self._send_error(404, 1006, "Not Found")
+            return
+
+        if match.group(1) is None:
+            self._send_json({
+                "pageNumber": 1,
+                "pageSize": len(self.server.sheets),
+                "totalPages": 1,
+                "totalCount": len(self.server.sheets),
+                "data": [
+                    {"id": sheet.id, "name": sheet.name, "version": sheet.version,
+                     "accessLevel": "OWNER", "modifiedAt": sheet.modified_at}
+                    for sheet in self.server.sheets.values()]})
+            return
+
+        sheet = self.server.sheets.get(int(match.group(1)))
+        if sheet is None:
+            self._send_error(404, 1006, "Not Found")
+            return
+
+        resource = match.group(2)
+        if resource == "version":
+            self._send_json({"version": sheet.version})
+        elif resource == "columns":
+            self._send_json(_index_result(sheet.columns))
+        elif resource == "attachments":
+            self._send_json(_index_result([]))
+        else:
+            fmt = CONTENT_TYPES.get(self.headers.get("Accept", "application/json"), "json")
+            if fmt == "json":
+                self._send_json(sheet.page(
+                    page=_int_param(query, "page"),
+                    page_size=_int_param(query, "pageSize"),
+                    column_ids=_ids_param(query, "columnIds"),
+                    row_ids=_ids_param(query, "rowIds")))
+            else:
+                self._send(
+                    200, sheet.export(fmt), self.headers["Accept"],
+                    {"Content-Disposition": f'attachment; filename="{sheet.name}.{fmt}";'})
+
+    def do_POST(self):
+        self._write_rows()
+
+    def do_PUT(self):
+        self._write_rows()
+
+    def do_DELETE(self):
+        self._write_rows()
+
+    def _write_rows(self):
+        # Writes are acknowledged but not applied, so repeated runs do the same work
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not self.server.admit():
+            self._send_error(429, 4003, "Rate limit exceeded.", {"Retry-After": str(self.server.retry_after)})
+            return
+
+        url = urlsplit(self.path)
+        match = re.fullmatch(r"/2\.0/sheets/(\d+)/rows/?", url.path)
+        sheet = self.server.sheets.get(int(match.group(1))) if match is not None else None
+        if sheet is None:
+            self._send_error(404, 1006, "Not Found")
+            return
+
+        if self.command == "DELETE":
+            result = sorted(_ids_param(parse_qs(url.query), "ids") or [])
+        else:
+            result = json.loads(body or b"[]")
+            if isinstance(result, dict):
+                result = [result]
+            for number, row in enumerate(result):
+                row.setdefault("id", sheet.row_id(sheet.row_count + number))
+        with self.server._lock:
+            self.server.written_rows += len(result)
+
+        self._send_json({"message": "SUCCESS", "resultCode": 0, "version": sheet.version, "result": result})
+
+    def _send_json(self, payload, status=200, headers=None):
+        self._send(status, json.dumps(payload).encode("utf-8"), "application/json;charset=UTF-8", headers)
+
+    def _send_error(self, status, code, message, headers=None):
+        self._send_json({"errorCode": code, "message": message, "refId": "benchmark"}, status, headers)
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _index_result(data):
+    return {
+        "pageNumber": 1,
+        "pageSize": len(data),
+        "totalPages": 1,
+        "totalCount": len(data),
+        "data": data}
+
+
+def _int_param(query, name):
+    values = query.get(name)
+    return int(values[0]) if values else None
+
+
+def _ids_param(query, name):
+    values = query.get(name)
+    if not values:
+        return None
+    return {int(value) for value in values[0].split(",") if value}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve synthetic sheets through a local Smartsheet API stand-in.")
+    parser.add_argument("--rows", type=int, default=10000, help="rows per sheet")
+    parser.add_argument("--columns", default=DEFAULT_COLUMN_MIX, help="column mix as TYPE:COUNT pairs")
+    parser.add_argument("--sheets", type=int, default=1, help="number of sheets, with IDs counting up from 1")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds every request is delayed")
+    parser.add_argument("--throttle-every", type=int, default=0, help="throttle every nth request")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="Retry-After seconds of throttled requests")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    column_types = parse_column_mix(args.columns)
+    server = FakeSmartsheetServer(
+        [SyntheticSheet(sheet_id, args.rows, column_types) for sheet_id in range(1, args.sheets + 1)],
+        latency=args.latency,
+        throttle_every=args.throttle_every,
+        retry_after=args.retry_after,
+        port=args.port)
+    print(f"Serving {args.sheets} sheets of {args.rows} rows at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
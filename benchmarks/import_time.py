@@ -0,0 +1,139 @@
+# Benchmark of the module-load cost the plugin adds to every DAG parse and task start.
+#
+# Airflow modules the scheduler has loaded anyway are imported first; the plugin import is timed
+# with python -X importtime in a fresh interpreter per run:
+#     python benchmarks/import_time.py --repeat 5 --budget-ms 50
+#     python benchmarks/import_time.py --module airflow_smartsheet.operators.extras --output import_time.json
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULE = "airflow_smartsheet.smartsheet_plugin"
+
+# Loaded by Airflow itself before plugins and DAG files
+PRELOADED_MODULES = (
+    "airflow.exceptions",
+    "airflow.models",
+    "airflow.hooks.base_hook",
+    "airflow.plugins_manager",
+    "airflow.stats")
+
+# Dependencies that must only load when a task runs
+HEAVY_MODULES = (
+    "smartsheet",
+    "requests",
+    "psycopg2",
+    "airflow.hooks.postgres_hook",
+    "yaml",
+    "pyarrow",
+    "aiohttp",
+    "asyncio",
+    "flask")
+
+MARKER = "-- timed import --"
+
+
+def measure(module):
+    """Imports a module in a fresh interpreter and reads its import times.
+
+    Arguments:
+        module {str} -- The module to import.
+
+    Raises:
+        RuntimeError: Raised when the import fails.
+
+    Returns:
+        dict -- Self microseconds of every module loaded by the import, and the heavy modules loaded.
+    """
+
+    script = "\n".join((
+        "import importlib, json, sys",
+        # Older Airflow versions lack some of the preloaded modules
+        f"for name in {PRELOADED_MODULES!r}:",
+        "    try:",
+        "        importlib.import_module(name)",
+        "    except ImportError:",
+        "        pass",
+        f"sys.stderr.write({MARKER!r} + '\\n')",
+        f"importlib.import_module({module!r})",
+        f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))"))
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, (ROOT, env.get("PYTHONPATH"))))
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        capture_output=True, text=True, env=env, cwd=ROOT)
+    if process.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{process.stderr[-2000:]}")
+
+    modules = {}
+    timed = process.stderr.split(MARKER + "\n", 1)[-1]
+    for line in timed.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            modules[fields[2].strip()] = int(fields[0])
+        except (IndexError, ValueError):
+            # Column header
+            continue
+
+    return {"modules": modules, "heavy": json.loads(process.stdout.strip().splitlines()[-1])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the module-load cost of the Smartsheet plugin.")
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="module to import")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters to time")
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="fail when the median load exceeds this")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    # The first run compiles bytecode, so it is not timed
+    measure(args.module)
+    runs = [measure(args.module) for _ in range(args.repeat)]
+
+    totals = [sum(run["modules"].values()) / 1000 for run in runs]
+    median = statistics.median(totals)
+    names = {name for run in runs for name in run["modules"]}
+    slowest = sorted(
+        ((statistics.median(run["modules"].get(name, 0) for run in runs) / 1000, name) for name in names),
+        reverse=True)[:args.top]
+    heavy = sorted({name for run in runs for name in run["heavy"]})
+
+    print(f"{args.module}: median {median:.1f} ms over {len(runs)} runs, {len(names)} modules loaded")
+    for milliseconds, name in slowest:
+        print(f"  {milliseconds:7.2f} ms  {name}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({
+                "module": args.module,
+                "python": sys.version.split()[0],
+                "median_ms": median,
+                "runs_ms": totals,
+                "slowest": [{"module": name, "ms": milliseconds} for milliseconds, name in slowest],
+                "heavy_modules": heavy}, file, indent=2)
+
+    failures = []
+    if median > args.budget_ms:
+        failures.append(f"median load {median:.1f} ms exceeds the {args.budget_ms:.1f} ms budget")
+    if heavy:
+        failures.append(f"loads {', '.join(heavy)} at import time")
+    for failure in failures:
+        print(f"REGRESSION {args.module} {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
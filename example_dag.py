@@ -6,7 +6,10 @@ import sys
 from datetime import datetime
 
 from airflow import DAG
-from airflow.operators.airflow_smartsheet import SmartsheetToFileOperator, SmartsheetToPostgresOperator
+from airflow.operators.airflow_smartsheet import SmartsheetToFileOperator, SmartsheetToPostgresOperator, \
+    SmartsheetBulkToPostgresOperator, SmartsheetExportOperator, SmartsheetDbPrepOperator, PostgresToSmartsheetOperator, \
+    SmartsheetWebhookToPostgresOperator, SmartsheetWatermarkOperator
+from airflow.sensors.airflow_smartsheet import SmartsheetChangeSensor, SmartsheetWebhookSensor
 
 
 default_args = {
@@ -27,6 +30,16 @@ to_file_task = SmartsheetToFileOperator(
     output_dir=None,                # Optional: export path (default: OS temp)
     with_json=False,                # Optional: save a JSON sheet dump (default: False)
     no_overwrite=False,             # Optional: whether to disallow file overwrite (default: False)
+    skip_unchanged=False,           # Optional: skip the download when the sheet version is unchanged (default: False)
+    cache_dir=None,                 # Optional: content cache serving downloads of unchanged sheet versions (default: no cache)
+    cache_max_bytes=None,           # Optional: content cache size limit (default: see consts)
+    row_group_size=None,            # Optional: rows per row group of PARQUET and FEATHER files (default: see consts)
+    column_types=None,              # Optional: PG types by column title typing PARQUET and FEATHER columns (default: None)
+    columns=None,                   # Optional: IDs or titles of the only columns to fetch (default: all columns)
+    row_ids=None,                   # Optional: IDs of the only rows to fetch (default: all rows)
+    filter_id=None,                 # Optional: saved sheet filter the fetched rows must match (default: None)
+    report_id=None,                 # Optional: report fetched instead of the sheet (default: None)
+    deferrable=False,               # Optional: free the worker while the triggerer downloads the sheet (default: False)
     dag=dag
 )
 
@@ -35,8 +48,149 @@ to_pg_task = SmartsheetToPostgresOperator(
     task_id="sync_sheet",
     sheet_id=3541639814768516,      # Mandatory: Smartsheet sheet ID to be exported
     table_name="newtable",          # Mandatory: PostgreSQL table ID to be imported to
+    fetch_mode="JSON",              # Optional: JSON for a single API fetch, CSV to also download the export (default: JSON)
+    with_row_id=False,              # Optional: load Smartsheet row IDs into a RowId column (default: False)
+    load_mode="TRUNCATE",           # Optional: TRUNCATE to reload all rows, INCREMENTAL to upsert changed rows by row ID,
+                                    #   SHADOW to reload all rows into a shadow table and swap it in,
+                                    #   DIFF to apply only changed rows by comparing a RowHash column (default: TRUNCATE)
+    state_table=None,               # Optional: sync state table in the target schema (default: see consts)
+    skip_unchanged=False,           # Optional: skip the load when the sheet version is unchanged (default: False)
+    cache_dir=None,                 # Optional: content cache serving sheet payloads of unchanged sheet versions (default: no cache)
+    columns=None,                   # Optional: IDs or titles of the only columns to fetch (default: all columns)
+    row_ids=None,                   # Optional: IDs of the only rows to fetch (default: all rows)
+    filter_id=None,                 # Optional: saved sheet filter the fetched rows must match (default: None)
+    report_id=None,                 # Optional: report fetched instead of the sheet (default: None)
+    page_size=None,                 # Optional: rows fetched per API call (default: see consts)
+    prefetch_pages=False,           # Optional: fetch the next page while the current one is loaded (default: False)
+    typed_columns=False,            # Optional: load dates, times and checkboxes as native PG types (default: False)
+    column_types=None,              # Optional: PG types by column title overriding the type mapping (default: None)
+    create_table=False,             # Optional: create the target table and add missing columns (default: False)
+    shadow_unlogged=False,          # Optional: load SHADOW mode tables unlogged, made logged before the swap (default: False)
+    analyze=True,                   # Optional: analyze SHADOW mode tables before the swap (default: True)
+    deferrable=False,               # Optional: free the worker while the triggerer fetches the sheet (default: False)
+    profile=False,                  # Optional: profile the run with cProfile and dump the statistics (default: False)
+    trace_memory=False,             # Optional: trace Python allocations of the run with tracemalloc (default: False)
     postgres_conn_id=None,          # Optional: override PG connection ID (default: see consts)
     postgres_database=None,         # Optional: override PG database (default: see consts)
     postgres_schema=None,           # Optional: override PG schema (default: see consts)
     dag=dag
 )
+
+# This operator imports many sheets concurrently, each to its own table
+bulk_pg_task = SmartsheetBulkToPostgresOperator(
+    task_id="sync_sheets",
+    sheets=[(3541639814768516, "newtable")],    # Optional: (sheet ID, table name) pairs to be imported
+    workspace_id=None,              # Optional: import every sheet in a workspace to tables named after the sheets
+    folder_id=None,                 # Optional: import every sheet in a folder to tables named after the sheets
+    max_workers=None,               # Optional: number of sheets imported at once (default: see consts)
+    rate_limit=None,                # Optional: API requests per minute across all workers (default: limit shared by the token)
+    fail_on_error=True,             # Optional: fail the task after all sheets ran if any sheet failed (default: True)
+    load_options=None,              # Optional: SmartsheetToPostgresOperator arguments for every sheet (default: None)
+    postgres_conn_id=None,          # Optional: override PG connection ID (default: see consts)
+    postgres_database=None,         # Optional: override PG database (default: see consts)
+    postgres_schema=None,           # Optional: override PG schema (default: see consts)
+    dag=dag
+)
+
+# This operator archives the specified sheet in several formats with its attachments
+export_task = SmartsheetExportOperator(
+    task_id="archive_sheet",
+    sheet_id=3541639814768516,      # Mandatory: Smartsheet sheet ID to be exported
+    sheet_types=["CSV", "EXCEL"],   # Optional: sheet types in enums to be exported (default: CSV, EXCEL and PDF)
+    paper_size=None,                # Mandatory for PDF sheet type: one of paper sizes in enums
+    with_attachments=True,          # Optional: download sheet, row and comment attachments (default: True)
+    output_dir=None,                # Optional: export path (default: OS temp)
+    max_workers=None,               # Optional: number of concurrent downloads (default: see consts)
+    row_group_size=None,            # Optional: rows per row group of PARQUET and FEATHER files (default: see consts)
+    column_types=None,              # Optional: PG types by column title typing PARQUET and FEATHER columns (default: None)
+    dag=dag
+)
+
+# This operator creates views and runs transform statements from YML specs
+prep_task = SmartsheetDbPrepOperator(
+    task_id="prep_views",
+    yml_path="/path/to/views",      # Optional: directory of YML specs with view_name, as, statements, depends_on,
+                                    #   materialized and unique_indexes
+    yml_file=None,                  # Optional: a single YML spec, used when yml_path is unspecified
+    view_name=None,                 # Optional: view name, used when no YML is specified
+    view_as=None,                   # Optional: view SELECT statement, used when no YML is specified
+    transforms=None,                # Optional: statements run after the view given by parameters (default: None)
+    materialized=False,             # Optional: create the view given by parameters as a materialized view (default: False)
+    unique_indexes=None,            # Optional: unique index columns of that materialized view, for concurrent refreshes (default: None)
+    upstream_task_ids=["sync_sheet"],           # Optional: refresh materialized views only when these loads changed rows
+                                                #   (default: always refresh)
+    batches=None,                   # Optional: number of transactions the views are split into (default: see consts)
+    dry_run=False,                  # Optional: only log and return the planned statements (default: False)
+    postgres_conn_id=None,          # Optional: override PG connection ID (default: see consts)
+    postgres_database=None,         # Optional: override PG database (default: see consts)
+    dag=dag
+)
+
+# This operator writes a query result back to a sheet, only sending changed rows
+writeback_task = PostgresToSmartsheetOperator(
+    task_id="write_statuses",
+    sheet_id=3541639814768516,      # Mandatory: Smartsheet sheet ID to be written to
+    sql="SELECT project AS \"Project\", status AS \"Status\" FROM project_status",
+                                    # Mandatory: query whose rows are written
+    key_column="Project",           # Mandatory: query column identifying rows; its sheet column must hold unique values
+    parameters=None,                # Optional: query parameters (default: None)
+    columns=None,                   # Optional: sheet column titles by query column (default: same titles)
+    delete_missing=False,           # Optional: delete sheet rows whose key is missing from the query result (default: False)
+    batch_size=None,                # Optional: rows per add or update request (default: see consts)
+    max_workers=None,               # Optional: number of concurrent write requests (default: see consts)
+    fetch_size=None,                # Optional: query rows fetched from the server-side cursor at a time (default: see consts)
+    postgres_conn_id=None,          # Optional: override PG connection ID (default: see consts)
+    postgres_database=None,         # Optional: override PG database (default: see consts)
+    dag=dag
+)
+
+# This sensor waits until any of many sheets changed, checking them all with one API call per poke
+change_sensor = SmartsheetChangeSensor(
+    task_id="watch_sheets",
+    sheet_ids=[3541639814768516],   # Optional: IDs of the watched sheets
+    workspace_id=None,              # Optional: watch every sheet in a workspace
+    folder_id=None,                 # Optional: watch every sheet in a folder
+    watermark_key=None,             # Optional: Airflow variable storing the last seen versions (default: named after the task)
+    mode="reschedule",              # Optional: free the worker slot between pokes (default: poke)
+    poke_interval=300,              # Optional: seconds between pokes (default: 60)
+    dag=dag
+)
+
+# This operator stores the watermark of the change sensor once the changed sheets are loaded
+watermark_task = SmartsheetWatermarkOperator(
+    task_id="store_watermark",
+    sensor_task_id="watch_sheets",  # Mandatory: task ID of the change sensor
+    dag=dag
+)
+
+# This sensor waits until a burst of webhook events of any of the sheets settled, querying only the queue table
+webhook_sensor = SmartsheetWebhookSensor(
+    task_id="wait_for_events",
+    sheets=[(3541639814768516, "newtable")],    # Mandatory: (sheet ID, table name) pairs to watch
+    debounce=None,                  # Optional: seconds without new events before a sheet is synced (default: see consts)
+    max_delay=None,                 # Optional: seconds after which queued events are synced regardless (default: see consts)
+    queue_table=None,               # Optional: override the webhook event queue table (default: see consts)
+    postgres_conn_id=None,          # Optional: override PG connection ID (default: see consts)
+    postgres_database=None,         # Optional: override PG database (default: see consts)
+    postgres_schema=None,           # Optional: override PG schema (default: see consts)
+    mode="reschedule",              # Optional: free the worker slot between pokes (default: poke)
+    poke_interval=30,               # Optional: seconds between pokes (default: 60)
+    dag=dag
+)
+
+# This operator syncs only the rows reported by queued webhook events
+webhook_sync_task = SmartsheetWebhookToPostgresOperator(
+    task_id="sync_events",
+    sheet_id=3541639814768516,      # Mandatory: Smartsheet sheet ID to be synced
+    table_name="newtable",          # Mandatory: PostgreSQL table ID to be synced
+    queue_table=None,               # Optional: override the webhook event queue table (default: see consts)
+    max_rows=None,                  # Optional: changed rows above which the sheet is synced incrementally (default: see consts)
+    create_table=False,             # Optional: create the target table and add missing columns (default: False)
+    postgres_conn_id=None,          # Optional: override PG connection ID (default: see consts)
+    postgres_database=None,         # Optional: override PG database (default: see consts)
+    postgres_schema=None,           # Optional: override PG schema (default: see consts)
+    dag=dag
+)
+
+change_sensor >> watermark_task
+webhook_sensor >> webhook_sync_task
@@ -0,0 +1,52 @@
+# Tests of the view spec ordering of SmartsheetDbPrepOperator.
+
+import pytest
+
+pytest.importorskip("airflow")
+
+from airflow.exceptions import AirflowException
+
+from airflow_smartsheet.operators.extras import _order_specs
+
+
+def _spec(name, select, depends_on=None):
+    return {"view_name": name, "as": select, "depends_on": depends_on}
+
+
+def _names(specs):
+    return [spec["view_name"] for spec in specs]
+
+
+def test_independent_specs_keep_their_order():
+    specs = [_spec("b", "SELECT 1"), _spec("a", "SELECT 2")]
+    assert _names(_order_specs(specs)) == ["b", "a"]
+
+
+def test_views_follow_the_views_they_select_from():
+    specs = [
+        _spec("public.totals", "SELECT sum(x) FROM public.items_clean"),
+        _spec("public.items_clean", "SELECT x FROM public.items"),
+    ]
+    assert _names(_order_specs(specs)) == ["public.items_clean", "public.totals"]
+
+
+def test_views_follow_their_declared_dependencies():
+    specs = [_spec("report", "SELECT 1", depends_on=["base"]), _spec("base", "SELECT 2")]
+    assert _names(_order_specs(specs)) == ["base", "report"]
+
+
+def test_names_only_match_whole_identifiers():
+    # items_archive is not a reference to items
+    specs = [_spec("items_report", "SELECT * FROM items_archive"), _spec("items", "SELECT 1")]
+    assert _names(_order_specs(specs)) == ["items_report", "items"]
+
+
+def test_dependencies_on_unknown_views_are_ignored():
+    specs = [_spec("a", "SELECT 1", depends_on=["missing"])]
+    assert _names(_order_specs(specs)) == ["a"]
+
+
+def test_cycles_are_refused():
+    specs = [_spec("a", "SELECT * FROM b"), _spec("b", "SELECT * FROM a")]
+    with pytest.raises(AirflowException, match="cycle"):
+        _order_specs(specs)
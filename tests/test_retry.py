@@ -0,0 +1,121 @@
+# Tests of the rate limiter and circuit breaker guarding Smartsheet API requests.
+
+import pytest
+
+pytest.importorskip("airflow")
+
+from airflow_smartsheet.hooks import rate_limiter, retry
+from airflow_smartsheet.hooks.rate_limiter import RateLimiter
+from airflow_smartsheet.hooks.retry import CircuitBreaker
+
+
+class Clock:
+    """A monotonic clock advanced by hand.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock)
+    monkeypatch.setattr(retry.time, "monotonic", clock)
+    return clock
+
+
+class TestRateLimiter:
+
+    def test_full_bucket_allows_a_burst_of_the_rate(self, clock):
+        limiter = RateLimiter(rate=3, period=60)
+        assert [limiter.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert limiter.try_acquire() == pytest.approx(20.0)
+
+    def test_tokens_refill_over_the_period(self, clock):
+        limiter = RateLimiter(rate=3, period=60)
+        for _ in range(3):
+            limiter.try_acquire()
+        clock.advance(20)
+        assert limiter.try_acquire() == 0.0
+        assert limiter.try_acquire() > 0
+
+    def test_bucket_never_holds_more_than_the_rate(self, clock):
+        limiter = RateLimiter(rate=2, period=60)
+        clock.advance(3600)
+        assert [limiter.try_acquire() for _ in range(3)][-1] > 0
+
+    def test_throttling_pauses_and_halves_the_rate(self, clock):
+        limiter = RateLimiter(rate=4, period=60)
+        limiter.penalize(pause=5)
+        assert limiter.current_rate == 2
+        assert limiter.try_acquire() == pytest.approx(5.0)
+        clock.advance(5)
+        # The bucket was emptied and refills at the halved rate
+        assert limiter.try_acquire() == pytest.approx(30.0 - 5 * 2 / 60 * 30, rel=0.01)
+
+    def test_rate_recovers_with_successful_requests(self, clock):
+        limiter = RateLimiter(rate=4, period=60)
+        limiter.penalize()
+        for _ in range(1000):
+            limiter.reward()
+        assert limiter.current_rate == 4
+
+    def test_acquire_waits_for_a_token(self, clock, monkeypatch):
+        limiter = RateLimiter(rate=1, period=10)
+        limiter.acquire()
+        monkeypatch.setattr(rate_limiter.time, "sleep", clock.advance)
+        assert limiter.acquire() == pytest.approx(10.0)
+
+
+class TestCircuitBreaker:
+
+    def test_circuit_opens_at_the_failure_threshold(self, clock):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+        for _ in range(2):
+            breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert not breaker.allow()
+
+    def test_successes_reset_the_failure_count(self, clock):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.allow()
+
+    def test_one_trial_request_is_let_through_after_the_cooldown(self, clock):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        breaker.record_failure()
+        clock.advance(29)
+        assert not breaker.allow()
+        clock.advance(1)
+        assert breaker.allow()
+        assert not breaker.allow()
+
+    def test_successful_trial_closes_the_circuit(self, clock):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        breaker.record_failure()
+        clock.advance(30)
+        breaker.allow()
+        breaker.record_success()
+        assert breaker.allow()
+        assert breaker.allow()
+
+    def test_failed_trial_reopens_the_circuit(self, clock):
+        breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+        for _ in range(5):
+            breaker.record_failure()
+        clock.advance(30)
+        assert breaker.allow()
+        breaker.record_failure()
+        assert not breaker.allow()
+        clock.advance(30)
+        assert breaker.allow()
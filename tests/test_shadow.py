@@ -0,0 +1,34 @@
+# Tests of the shadow table naming used by SHADOW mode loads.
+
+import pytest
+
+pytest.importorskip("airflow")
+
+from airflow_smartsheet.operators.shadow import shadow_index_name, shadow_name, MAX_IDENTIFIER_LENGTH
+
+
+def test_short_names_are_suffixed():
+    assert shadow_name("sheet") == "sheet_shadow"
+    assert shadow_index_name("sheet_pkey") == "sheet_pkey_shadow_idx"
+
+
+@pytest.mark.parametrize("length", [50, 56, 57, 60, 63])
+def test_long_names_fit_the_identifier_limit(length):
+    table = "t" * length
+    assert len(shadow_name(table)) <= MAX_IDENTIFIER_LENGTH
+    assert len(shadow_index_name(table + "_pkey")) <= MAX_IDENTIFIER_LENGTH
+
+
+@pytest.mark.parametrize("length", [50, 56, 57, 60, 63])
+def test_index_names_never_take_the_shadow_table_name(length):
+    # PostgreSQL truncates the default primary key index name of long tables to the table name's length
+    table = "t" * length
+    index = (table + "_pkey")[:MAX_IDENTIFIER_LENGTH]
+    assert shadow_index_name(index) != shadow_name(table)
+    assert shadow_index_name(table) != shadow_name(table)
+
+
+def test_long_names_sharing_a_prefix_stay_distinct():
+    prefix = "p" * 60
+    assert shadow_name(prefix + "a") != shadow_name(prefix + "b")
+    assert shadow_index_name(prefix + "_pkey") != shadow_index_name(prefix + "_idx")
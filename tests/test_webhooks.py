@@ -0,0 +1,97 @@
+# Tests of the HMAC verification of Smartsheet webhook callbacks.
+
+import hashlib
+import hmac
+import json
+
+import pytest
+
+pytest.importorskip("airflow")
+
+from airflow_smartsheet.webhooks.queue import callback_events, verify_signature
+
+
+SECRET = "shared-secret"
+
+
+def _sign(body, secret=SECRET):
+    return hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+def test_signature_of_the_body_is_accepted():
+    body = b'{"webhookId": 1}'
+    assert verify_signature(SECRET, body, _sign(body))
+
+
+def test_signature_is_accepted_in_any_case_and_padded():
+    body = b'{"webhookId": 1}'
+    assert verify_signature(SECRET, body, " " + _sign(body).upper() + "\n")
+
+
+@pytest.mark.parametrize("signature", [None, "", "0" * 64, _sign(b'{"webhookId": 2}')])
+def test_wrong_or_missing_signatures_are_refused(signature):
+    assert not verify_signature(SECRET, b'{"webhookId": 1}', signature)
+
+
+def test_signature_of_another_secret_is_refused():
+    body = b'{"webhookId": 1}'
+    assert not verify_signature(SECRET, body, _sign(body, "other-secret"))
+
+
+def test_cell_events_are_reduced_to_their_row():
+    payload = {
+        "scope": "sheet",
+        "scopeObjectId": 7,
+        "events": [
+            {"objectType": "cell", "eventType": "updated", "rowId": 11},
+            {"objectType": "cell", "eventType": "updated", "rowId": 11},
+            {"objectType": "row", "eventType": "created", "id": 12},
+            {"objectType": "comment", "eventType": "created", "id": 13},
+            {"objectType": "column", "eventType": "updated", "id": 14},
+        ]}
+    sheet_id, events = callback_events(payload)
+    assert sheet_id == 7
+    assert events == [(11, "cell", "updated"), (12, "row", "created"), (None, "column", "updated")]
+
+
+class TestReceiver:
+    """Callbacks posted to the receiver blueprint, which must authenticate them before queueing anything.
+    """
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        flask = pytest.importorskip("flask")
+
+        from airflow_smartsheet.webhooks import receiver
+
+        monkeypatch.setattr(receiver.Variable, "get", classmethod(lambda cls, key, default_var=None: SECRET))
+        app = flask.Flask(__name__)
+        app.register_blueprint(receiver.create_webhook_blueprint())
+        return app.test_client()
+
+    def test_challenges_are_echoed(self, client):
+        response = client.post("/smartsheet/webhooks", headers={"Smartsheet-Hook-Challenge": "abc"})
+        assert response.status_code == 200
+        assert response.headers["Smartsheet-Hook-Response"] == "abc"
+
+    def test_unsigned_callbacks_are_refused(self, client):
+        body = json.dumps({"webhookId": 1, "scope": "sheet", "scopeObjectId": 7, "events": []})
+        response = client.post("/smartsheet/webhooks", data=body)
+        assert response.status_code == 401
+
+    def test_callbacks_signed_with_another_secret_are_refused(self, client):
+        body = json.dumps({"webhookId": 1, "scope": "sheet", "scopeObjectId": 7, "events": []}).encode("utf-8")
+        response = client.post(
+            "/smartsheet/webhooks", data=body, headers={"Smartsheet-Hmac-SHA256": _sign(body, "other-secret")})
+        assert response.status_code == 401
+
+    def test_signed_callbacks_without_events_are_accepted(self, client):
+        body = json.dumps({"webhookId": 1, "scope": "sheet", "scopeObjectId": 7, "events": []}).encode("utf-8")
+        response = client.post("/smartsheet/webhooks", data=body, headers={"Smartsheet-Hmac-SHA256": _sign(body)})
+        assert response.status_code == 200
+        assert response.get_json()["queued"] == 0
+
+    @pytest.mark.parametrize("body", [b"not json", b"[1, 2]"])
+    def test_bodies_that_are_not_json_objects_are_refused(self, client, body):
+        response = client.post("/smartsheet/webhooks", data=body, headers={"Smartsheet-Hmac-SHA256": _sign(body)})
+        assert response.status_code == 400
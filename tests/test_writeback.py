@@ -0,0 +1,50 @@
+# Tests of the value normalization comparing query results with sheet cells.
+
+import datetime
+import decimal
+
+import pytest
+
+pytest.importorskip("airflow")
+pytest.importorskip("smartsheet")
+
+from airflow_smartsheet.operators.writeback_operator import _cell_value, _comparable
+
+
+@pytest.mark.parametrize("sheet_value, query_value", [
+    (3, 3),
+    (3.0, 3),
+    (3, decimal.Decimal("3.00")),
+    (0.1, decimal.Decimal("0.1")),
+    (2.5, decimal.Decimal("2.50")),
+    ("12", 12),
+    ("", None),
+    (True, True),
+    ("2024-01-02T03:04:05Z", datetime.datetime(2024, 1, 2, 3, 4, 5)),
+    ("2024-01-02T03:04:05Z", datetime.datetime(2024, 1, 2, 4, 4, 5, tzinfo=datetime.timezone(datetime.timedelta(hours=1)))),
+])
+def test_equal_values_compare_equal(sheet_value, query_value):
+    assert _comparable(sheet_value) == _comparable(_cell_value(query_value))
+
+
+@pytest.mark.parametrize("sheet_value, query_value", [
+    (0.1, decimal.Decimal("0.1000000000000000001")),
+    (1, decimal.Decimal("1.0000000000000000001")),
+    ("007", 7),
+    (True, 1),
+    ("2024-01-02T03:04:05Z", datetime.datetime(2024, 1, 2, 3, 4, 6)),
+])
+def test_different_values_compare_different(sheet_value, query_value):
+    assert _comparable(sheet_value) != _comparable(_cell_value(query_value))
+
+
+def test_precise_decimals_are_written_as_text_and_then_compare_equal():
+    value = decimal.Decimal("0.1000000000000000001")
+    written = _cell_value(value)
+    assert written == "0.1000000000000000001"
+    assert _comparable(written) == _comparable(_cell_value(value))
+
+
+def test_normalized_numbers_are_hashable_keys():
+    keys = {_comparable(1.5): "row"}
+    assert keys[_comparable(_cell_value(decimal.Decimal("1.50")))] == "row"